@@ -0,0 +1,124 @@
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+# 默认的AI分析结果缓存文件
+AI_CACHE_FILE = os.getenv("AI_CACHE_FILE", os.path.join("cache", "ai_analysis.db"))
+
+# 缓存键基于发送给模型的完整记录计算（含卖家的评价列表和商品列表），只去掉以下字段：
+# 抓取元数据、商品ID和各类链接（图片以内容哈希参与计算），以及浏览量、想要人数、发布时间等随时间变化的字段。
+# 这样同一商品被重新上架、换了链接或在另一个任务中出现时仍能命中缓存，而模型看到的任何其他内容变化都会使缓存失效。
+KEY_EXCLUDED_RECORD_FIELDS = ("爬取时间", "搜索关键字", "任务名称", "ai_analysis")
+KEY_EXCLUDED_ITEM_FIELDS = ("商品ID", "商品链接", "商品主图链接", "商品图片列表", "“想要”人数", "浏览量", "发布时间")
+
+
+def _hash_file(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class AIAnalysisCache:
+    """
+    以内容寻址的AI分析结果缓存。
+
+    缓存键由发送给模型的记录（去掉 KEY_EXCLUDED_* 中的易变字段）、所有图片内容的哈希、最终的 prompt 文本以及模型名共同计算，
+    命中时直接复用之前的分析结果，完全跳过多模态模型调用。
+    """
+
+    def __init__(self, path: str = AI_CACHE_FILE, ttl: int = None, max_entries: int = None):
+        """
+        Args:
+            path: SQLite 缓存文件路径
+            ttl: 缓存有效期（秒），默认读取环境变量 AI_CACHE_TTL (30天)，设为 0 表示禁用缓存
+            max_entries: 最多缓存的结果数，默认读取环境变量 AI_CACHE_MAX_ENTRIES (20000)
+        """
+        self.path = path
+        self.ttl = int(os.getenv("AI_CACHE_TTL", 30 * 86400)) if ttl is None else ttl
+        self.max_entries = max_entries or int(os.getenv("AI_CACHE_MAX_ENTRIES", 20000))
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ai_analysis ("
+            " cache_key TEXT PRIMARY KEY,"
+            " result TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL,"
+            " hit_count INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    @staticmethod
+    def make_key(product_record: dict, image_paths: list, prompt_text: str, model_name: str) -> str:
+        """计算一条商品记录在指定 prompt 和模型下的缓存键（会读取图片文件计算哈希）。"""
+        record = {key: value for key, value in product_record.items() if key not in KEY_EXCLUDED_RECORD_FIELDS}
+        record["商品信息"] = {key: value for key, value in (product_record.get("商品信息") or {}).items()
+                          if key not in KEY_EXCLUDED_ITEM_FIELDS}
+        normalized = {
+            "record": record,
+            "images": [_hash_file(path) for path in (image_paths or []) if os.path.exists(path)],
+            "prompt": hashlib.sha256(prompt_text.encode("utf-8")).hexdigest(),
+            "model": model_name,
+        }
+        payload = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, cache_key: str) -> dict:
+        """读取缓存的分析结果，不存在或已过期时返回 None。"""
+        if not self.enabled:
+            return None
+        row = self._conn.execute(
+            "SELECT result, created_at FROM ai_analysis WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        if not row or time.time() - row[1] > self.ttl:
+            self.misses += 1
+            return None
+        self._conn.execute(
+            "UPDATE ai_analysis SET accessed_at = ?, hit_count = hit_count + 1 WHERE cache_key = ?",
+            (time.time(), cache_key)
+        )
+        self._conn.commit()
+        self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, cache_key: str, result: dict):
+        """写入一条分析结果，并在超过容量时淘汰最久未访问的条目。"""
+        if not self.enabled:
+            return
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO ai_analysis (cache_key, result, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (cache_key, json.dumps(result, ensure_ascii=False), now, now)
+        )
+        count = self._conn.execute("SELECT COUNT(*) FROM ai_analysis").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM ai_analysis WHERE cache_key IN ("
+                " SELECT cache_key FROM ai_analysis ORDER BY accessed_at ASC LIMIT ?)", (count - self.max_entries,)
+            )
+        self._conn.commit()
+
+    def stats(self) -> dict:
+        """返回本次运行的命中统计。"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": f"{(self.hits / lookups * 100):.2f}%" if lookups else "N/A",
+        }
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,141 @@
+import asyncio
+import os
+import time
+from urllib.parse import urlparse
+
+# 未单独配置的模型服务默认允许同时进行的AI分析请求数
+DEFAULT_AI_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", 4))
+
+
+def parse_provider_limits(value: str) -> dict:
+    """
+    解析按模型服务配置的并发上限，格式为逗号分隔的 "主机名=并发数"，
+    如 "api.openai.com=8,dashscope.aliyuncs.com=2"。无法解析的项会被忽略。
+    """
+    limits = {}
+    for part in (value or "").split(","):
+        host, _, limit = part.strip().partition("=")
+        if host and limit.strip().isdigit() and int(limit) > 0:
+            limits[host.strip().lower()] = int(limit)
+    return limits
+
+
+def provider_key(base_url: str) -> str:
+    """用 OPENAI_BASE_URL 的主机名（含端口）标识一个模型服务。"""
+    return (urlparse(base_url or "").netloc or base_url or "default").lower()
+
+
+class AIWorkerPool:
+    """
+    进程级的AI分析 worker 池。
+
+    爬取流程把AI分析作业 submit() 进来后立即返回，浏览器继续处理下一个商品，
+    不再因为模型响应慢或 retry_on_failure 的重试等待而空闲。
+    每个模型服务有独立的队列和固定数量的 worker，同一服务同时进行的请求数不超过其并发上限，
+    所有任务共享这一额度。队列长度、执行中的作业数和排队耗时写入 SpiderMetrics。
+    """
+
+    def __init__(self, default_limit: int = None, provider_limits: dict = None, metrics=None):
+        """
+        Args:
+            default_limit: 未单独配置的模型服务的并发上限，默认读取环境变量 AI_MAX_CONCURRENCY (4)
+            provider_limits: {主机名: 并发上限}，默认读取环境变量 AI_PROVIDER_CONCURRENCY
+            metrics: 可选的 SpiderMetrics，用于记录队列长度、执行中的作业数和排队耗时
+        """
+        self.default_limit = default_limit or DEFAULT_AI_CONCURRENCY
+        self.provider_limits = provider_limits if provider_limits is not None else \
+            parse_provider_limits(os.getenv("AI_PROVIDER_CONCURRENCY", ""))
+        self.metrics = metrics
+        self.completed_count = 0
+        self.failed_count = 0
+
+        self._queues = {}
+        self._workers = {}
+        self._in_flight = {}
+
+    def limit_for(self, provider: str) -> int:
+        return self.provider_limits.get(provider, self.default_limit)
+
+    # --- 对外接口 ---
+
+    def submit(self, provider: str, job, *args) -> asyncio.Future:
+        """
+        提交一个AI作业，立即返回一个 Future。
+
+        Args:
+            provider: 模型服务标识（见 provider_key），决定作业进入哪个队列、受哪个并发上限约束
+            job: 协程函数，由 worker 以 job(*args) 调用
+        Returns:
+            作业完成后得到 job 返回值的 Future；作业抛出的异常会设置到 Future 上。
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue(provider).put_nowait((job, args, future, time.monotonic()))
+        self._update_gauges(provider)
+        return future
+
+    async def close(self, timeout: float = None):
+        """等待所有已提交的作业完成（最多 timeout 秒，None 表示一直等待），然后停止 worker。"""
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues.values())), timeout=timeout)
+        except asyncio.TimeoutError:
+            print(f"   [AI分析] 等待AI作业完成超时，仍有 {sum(self.stats()['queued'].values())} 个作业未处理。")
+        workers = [task for tasks in self._workers.values() for task in tasks]
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for queue in self._queues.values():
+            while not queue.empty():
+                _, _, future, _ = queue.get_nowait()
+                future.cancel()
+        self._queues, self._workers, self._in_flight = {}, {}, {}
+
+    def stats(self) -> dict:
+        return {
+            "queued": {provider: queue.qsize() for provider, queue in self._queues.items()},
+            "in_flight": dict(self._in_flight),
+            "completed": self.completed_count,
+            "failed": self.failed_count,
+        }
+
+    # --- 内部实现 ---
+
+    def _queue(self, provider: str) -> asyncio.Queue:
+        # 每个模型服务的队列和 worker 在第一次提交作业时创建
+        if provider not in self._queues:
+            self._queues[provider] = asyncio.Queue()
+            self._in_flight[provider] = 0
+            self._workers[provider] = [asyncio.create_task(self._worker(provider))
+                                       for _ in range(self.limit_for(provider))]
+            print(f"LOG: AI分析 worker 池已为模型服务 {provider} 启动 {self.limit_for(provider)} 个 worker。")
+        return self._queues[provider]
+
+    def _update_gauges(self, provider: str):
+        if self.metrics:
+            self.metrics.ai_queue_depth.set(self._queues[provider].qsize(), provider)
+            self.metrics.ai_in_flight.set(self._in_flight[provider], provider)
+
+    async def _worker(self, provider: str):
+        queue = self._queues[provider]
+        while True:
+            job, args, future, submitted_at = await queue.get()
+            self._in_flight[provider] += 1
+            self._update_gauges(provider)
+            if self.metrics:
+                self.metrics.ai_queue_wait_seconds.observe(time.monotonic() - submitted_at, provider)
+            try:
+                result = await job(*args)
+                self.completed_count += 1
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                self.failed_count += 1
+                print(f"   [AI分析] 后台AI作业出错: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._in_flight[provider] -= 1
+                self._update_gauges(provider)
+                queue.task_done()
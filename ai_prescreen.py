@@ -0,0 +1,164 @@
+import asyncio
+import json
+import os
+
+# 批量初筛使用的 prompt 模板，其中的 {{CRITERIA_SECTION}} 替换为任务的分析标准
+PRESCREEN_PROMPT_FILE = os.getenv("AI_PRESCREEN_PROMPT_FILE", os.path.join("prompts", "prescreen_prompt.txt"))
+# 每批最多包含的商品数
+DEFAULT_PRESCREEN_BATCH_SIZE = 8
+# 一批未凑满时最多等待的秒数，超时后把已收集的商品作为一批发送
+DEFAULT_PRESCREEN_MAX_WAIT = float(os.getenv("AI_PRESCREEN_MAX_WAIT", 30))
+
+# 关闭后凑批的等待时间（秒）：流水线收尾时初筛阶段 worker 会在很短时间内陆续取出队列中剩余的商品，
+# 稍作等待即可把它们合并为同一批，而不是逐个发送
+CLOSING_FLUSH_DELAY = 0.2
+
+# 商品列表的标题，位于所有批次共享的 prompt 前缀之后
+ITEMS_HEADER = "### 待初筛商品列表"
+
+# 卖家概况中保留的字段
+SELLER_SUMMARY_FIELDS = (
+    "卖家信用等级", "卖家芝麻信用", "卖家注册时长", "作为卖家的好评率", "卖家在售/已售商品数", "卖家收到的评价总数",
+)
+
+
+def build_prescreen_prompt(criteria_text: str, template_path: str = PRESCREEN_PROMPT_FILE) -> str:
+    """读取初筛 prompt 模板并填入分析标准。模板缺失时返回空字符串（调用方应关闭初筛）。"""
+    try:
+        with open(template_path, "r", encoding="utf-8") as f:
+            template = f.read()
+    except IOError as e:
+        print(f"   [警告] 读取初筛 prompt 模板失败: {e}")
+        return ""
+    return template.replace("{{CRITERIA_SECTION}}", criteria_text or "")
+
+
+def summarize_for_prescreen(record: dict) -> dict:
+    """从完整记录中提取初筛需要的精简字段：标题、价格、发货地区、标签和卖家概况。"""
+    item = record.get("商品信息") or {}
+    seller = record.get("卖家信息") or {}
+    seller_summary = {name: seller[name] for name in SELLER_SUMMARY_FIELDS if seller.get(name) not in (None, "")}
+    signature = (seller.get("卖家个性签名") or "").strip()
+    if signature:
+        seller_summary["卖家个性签名"] = signature[:60]
+    return {
+        "id": str(item.get("商品ID", "")),
+        "标题": item.get("商品标题", ""),
+        "价格": item.get("当前售价", ""),
+        "发货地区": item.get("发货地区", ""),
+        "标签": item.get("商品标签", []),
+        "卖家": seller_summary,
+    }
+
+
+def build_prescreen_text(prompt_prefix: str, records: list) -> str:
+    """
+    拼接一批商品的初筛请求文本。
+
+    prompt 前缀在所有批次中逐字节相同，只有末尾的商品列表不同，便于模型服务端复用前缀缓存。
+    """
+    items = [summarize_for_prescreen(record) for record in records]
+    return f"{prompt_prefix}\n\n{ITEMS_HEADER}\n\n```json\n{json.dumps(items, ensure_ascii=False)}\n```\n"
+
+
+def parse_prescreen_response(content: str) -> dict:
+    """
+    解析模型返回的初筛结果。
+
+    Returns:
+        {商品ID: {"pass": bool, "reason": str}}；格式不符的条目会被忽略。
+    Raises:
+        json.JSONDecodeError: 返回内容不是合法的 JSON。
+    """
+    data = json.loads(content)
+    results = data.get("results") if isinstance(data, dict) else data
+    verdicts = {}
+    for entry in results or []:
+        if not isinstance(entry, dict) or "id" not in entry or not isinstance(entry.get("pass"), bool):
+            continue
+        verdicts[str(entry["id"])] = {"pass": entry["pass"], "reason": str(entry.get("reason", ""))}
+    return verdicts
+
+
+class PrescreenBatcher:
+    """
+    把逐个到达的商品攒成批次，一次请求完成多个商品的文本初筛。
+
+    流水线的初筛阶段对每个商品调用 screen() 并等待结论；凑满 batch_size 个商品或等待超过
+    max_wait 秒时发送一批。请求失败或模型漏掉某个商品时该商品默认通过，交给完整的AI分析处理，
+    初筛只会减少调用，不会漏掉商品。
+    """
+
+    def __init__(self, screen_batch, batch_size: int = DEFAULT_PRESCREEN_BATCH_SIZE,
+                 max_wait: float = DEFAULT_PRESCREEN_MAX_WAIT):
+        """
+        Args:
+            screen_batch: 接收一批完整记录、返回可等待对象的函数（如提交到 AIWorkerPool 得到的 Future），
+                其结果为 parse_prescreen_response 格式的结论字典，失败时为 None
+            batch_size: 每批最多包含的商品数
+            max_wait: 一批未凑满时最多等待的秒数
+        """
+        self.screen_batch = screen_batch
+        self.batch_size = max(1, int(batch_size))
+        self.max_wait = max_wait
+        self.batches_sent = 0
+        self.passed_count = 0
+        self.rejected_count = 0
+        self._pending = []
+        self._timer = None
+        self._closed = False
+        self._tasks = set()
+
+    async def screen(self, record: dict) -> dict:
+        """提交一个商品并等待其所在批次的初筛结论，返回 {"pass": bool, "reason": str}。"""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((record, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._schedule_flush(CLOSING_FLUSH_DELAY if self._closed else self.max_wait)
+        return await future
+
+    def close(self):
+        """
+        不会再有新商品进入初筛时调用：不再等待 max_wait，已收集的商品与初筛队列中剩余的商品
+        在 CLOSING_FLUSH_DELAY 内合并为最后一批发送（超过 batch_size 时照常分批）。
+        """
+        self._closed = True
+        if self._pending:
+            self._schedule_flush(CLOSING_FLUSH_DELAY)
+
+    def _schedule_flush(self, delay: float):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._flush)
+
+    def stats(self) -> dict:
+        return {"batches": self.batches_sent, "passed": self.passed_count, "rejected": self.rejected_count}
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list):
+        self.batches_sent += 1
+        try:
+            verdicts = await self.screen_batch([record for record, _ in batch]) or {}
+        except Exception as e:
+            print(f"   [AI初筛] 批量初筛请求出错，本批商品全部进入完整分析: {e}")
+            verdicts = {}
+        for record, future in batch:
+            item_id = str((record.get("商品信息") or {}).get("商品ID", ""))
+            verdict = verdicts.get(item_id) or {"pass": True, "reason": "初筛未返回结论，默认进入完整分析。"}
+            if verdict["pass"]:
+                self.passed_count += 1
+            else:
+                self.rejected_count += 1
+            if not future.done():
+                future.set_result(verdict)
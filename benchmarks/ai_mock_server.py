@@ -0,0 +1,278 @@
+"""
+本地 OpenAI 兼容接口的模拟服务，用于在不依赖真实模型服务的情况下测量AI分析链路自身的开销
+（构建 prompt、图片 base64 编码、JSON 解析、重试）。
+
+支持的接口:
+    POST /v1/chat/completions   请求带 response_format=json_object 时返回符合 base_prompt 输出格式的分析结果
+                                （批量初筛请求返回每个商品的 pass/reason），
+                                否则返回一段分析标准文本（供 prompt_generator.py 使用）
+    GET  /v1/models             模型列表
+    GET  /__stats               请求数、上传字节数、token 用量和各状态码计数（JSON）
+
+延迟按对数正态分布取值（中位数 + sigma），并可按输出 token 数追加生成耗时；
+可按比例注入 429、5xx 和格式错误的 JSON 响应。token 数为按字符数估算的近似值。
+
+用法（在项目根目录）:
+    python benchmarks/ai_mock_server.py --port 8766 --latency-median-ms 1500 --rate-429 0.05
+然后:
+    OPENAI_BASE_URL=http://127.0.0.1:8766/v1 OPENAI_MODEL_NAME=mock python spider_v2.py
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai_prescreen import ITEMS_HEADER  # noqa: E402
+
+# 按 OpenAI 高清模式估算的单张图片 token 数
+IMAGE_TOKENS = 765
+
+
+# 模拟服务的默认配置
+DEFAULT_CONFIG = {
+    "latency_median_ms": 1500.0,    # 基础延迟的中位数
+    "latency_sigma": 0.4,           # 对数正态分布的 sigma，0 表示固定延迟
+    "ms_per_output_token": 0.0,     # 每个输出 token 追加的生成耗时
+    "rate_429": 0.0,                # 返回 429 的比例
+    "rate_5xx": 0.0,                # 返回 500/502/503 的比例
+    "malformed_rate": 0.0,          # 返回无法解析为 JSON 的内容的比例
+    "recommend_rate": 0.3,          # 分析结果中 is_recommended 为 true 的比例
+    "prescreen_pass_rate": 0.5,     # 批量初筛中判定为通过的比例
+}
+# 命令行参数的说明
+CONFIG_HELP = {
+    "latency_median_ms": "基础延迟中位数（毫秒）",
+    "latency_sigma": "对数正态分布的 sigma",
+    "ms_per_output_token": "每个输出 token 追加的耗时（毫秒）",
+    "rate_429": "返回 429 的比例",
+    "rate_5xx": "返回 5xx 的比例",
+    "malformed_rate": "返回格式错误 JSON 的比例",
+    "recommend_rate": "推荐商品的比例",
+    "prescreen_pass_rate": "批量初筛通过的比例",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本 token 数：ASCII 字符约 4 个一个 token，中文等字符约 1.5 个一个 token。"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5)
+
+
+def _analysis_content(prompt_text: str, recommend_rate: float) -> str:
+    # 同一个 prompt 总是得到相同的推荐结论，便于对比多次运行的结果
+    digest = int(hashlib.md5(prompt_text.encode("utf-8")).hexdigest()[:8], 16)
+    recommended = (digest % 1000) / 1000 < recommend_rate
+    criteria = {
+        name: {"status": "PASS" if recommended else "FAIL", "comment": "模拟分析结论。", "evidence": "模拟证据。"}
+        for name in ("model_chip", "battery_health", "condition", "history", "shipping", "seller_credit")
+    }
+    criteria["seller_type"] = {"status": "PASS", "persona": "个人玩家", "comment": "模拟卖家画像。",
+                               "analysis_details": {}}
+    return json.dumps({
+        "prompt_version": "mock",
+        "is_recommended": recommended,
+        "reason": "模拟分析：商品信息完整，卖家信用良好。" if recommended else "模拟分析：关键信息缺失，不推荐。",
+        "risk_tags": [] if recommended else ["信息缺失"],
+        "criteria_analysis": criteria,
+    }, ensure_ascii=False)
+
+
+def _prescreen_content(prompt_text: str, pass_rate: float) -> str:
+    """按 ai_prescreen.build_prescreen_text 的格式取出商品列表，为每个商品返回确定性的初筛结论。"""
+    items_json = prompt_text.split(ITEMS_HEADER, 1)[1].split("```json", 1)[-1].split("```", 1)[0]
+    try:
+        items = json.loads(items_json)
+    except json.JSONDecodeError:
+        items = []
+    results = []
+    for item in items:
+        digest = int(hashlib.md5(str(item.get("id")).encode("utf-8")).hexdigest()[:8], 16)
+        passed = (digest % 1000) / 1000 < pass_rate
+        results.append({"id": item.get("id"), "pass": passed,
+                        "reason": "模拟初筛：标题和价格符合标准。" if passed else "模拟初筛：型号明显不符。"})
+    return json.dumps({"results": results}, ensure_ascii=False)
+
+
+CRITERIA_CONTENT = "### 分析标准（模拟）\n\n1. 型号与配置必须与描述一致。\n2. 成色不低于九成新。\n3. 卖家为个人卖家且信用良好。\n"
+
+
+class MockAIServer:
+    """在后台线程中运行的模拟服务，基准测试可以在同一进程内启动并读取统计数据。"""
+
+    def __init__(self, config: dict, host: str = "127.0.0.1", port: int = 0):
+        self.config = config
+        self.stats = Counter()
+        self._lock = threading.Lock()
+        handler = type("BoundMockAIHandler", (MockAIHandler,), {"mock": self})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def record(self, **counts):
+        with self._lock:
+            self.stats.update(counts)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+    def latency_seconds(self, output_tokens: int) -> float:
+        base = self.config["latency_median_ms"]
+        if self.config["latency_sigma"] > 0 and base > 0:
+            base = base * math.exp(random.gauss(0, self.config["latency_sigma"]))
+        return (base + output_tokens * self.config["ms_per_output_token"]) / 1000
+
+
+class MockAIHandler(BaseHTTPRequestHandler):
+    server_version = "MockOpenAI/1.0"
+    mock: MockAIServer = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.mock.record(**{f"status_{status}": 1})
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": "mock", "object": "model", "owned_by": "mock"}]})
+        elif self.path == "/__stats":
+            self._send_json(200, self.mock.snapshot())
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        started = time.perf_counter()
+        length = int(self.headers.get("Content-Length") or 0)
+        raw_body = self.rfile.read(length)
+        self.mock.record(requests=1, bytes_received=len(raw_body))
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        try:
+            request = json.loads(raw_body)
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "invalid JSON body", "type": "invalid_request_error"}})
+            return
+
+        config = self.mock.config
+        text_parts, images = [], 0
+        for message in request.get("messages", []):
+            content = message.get("content")
+            if isinstance(content, str):
+                text_parts.append(content)
+                continue
+            for part in content or []:
+                if part.get("type") == "text":
+                    text_parts.append(part.get("text", ""))
+                elif part.get("type") == "image_url":
+                    images += 1
+        prompt_text = "\n".join(text_parts)
+        prompt_tokens = estimate_tokens(prompt_text) + images * IMAGE_TOKENS
+        self.mock.record(images=images, prompt_tokens=prompt_tokens)
+
+        roll = random.random()
+        if roll < config["rate_429"]:
+            time.sleep(self.mock.latency_seconds(0) / 10)
+            self._send_json(429, {"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}},
+                            {"retry-after": "1"})
+            self.mock.record(server_seconds=time.perf_counter() - started)
+            return
+        if roll < config["rate_429"] + config["rate_5xx"]:
+            time.sleep(self.mock.latency_seconds(0))
+            status = random.choice([500, 502, 503])
+            self._send_json(status, {"error": {"message": "Upstream error (mock)", "type": "server_error"}})
+            self.mock.record(server_seconds=time.perf_counter() - started)
+            return
+
+        wants_json = (request.get("response_format") or {}).get("type") == "json_object"
+        if wants_json and ITEMS_HEADER in prompt_text:
+            content = _prescreen_content(prompt_text, config["prescreen_pass_rate"])
+            self.mock.record(prescreen_requests=1)
+        elif wants_json:
+            content = _analysis_content(prompt_text, config["recommend_rate"])
+        else:
+            content = CRITERIA_CONTENT
+        if wants_json and random.random() < config["malformed_rate"]:
+            # 模型偶尔输出被截断、带代码块标记的 JSON
+            content = "```json\n" + content[:len(content) // 2]
+            self.mock.record(malformed=1)
+        completion_tokens = estimate_tokens(content)
+        time.sleep(self.mock.latency_seconds(completion_tokens))
+
+        self.mock.record(completion_tokens=completion_tokens)
+        self._send_json(200, {
+            "id": f"chatcmpl-mock-{random.getrandbits(48):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "mock"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens},
+        })
+        self.mock.record(server_seconds=time.perf_counter() - started)
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """把模拟服务的配置项加到命令行参数中（如 --latency-median-ms），供本服务和基准测试共用。"""
+    for name, default in DEFAULT_CONFIG.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=float, default=default, help=CONFIG_HELP[name])
+
+
+def config_from_args(args) -> dict:
+    return {name: getattr(args, name) for name in DEFAULT_CONFIG}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容接口模拟服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = MockAIServer(config_from_args(args), args.host, args.port)
+    print(f"模拟AI服务已启动: OPENAI_BASE_URL={server.base_url}")
+    print(json.dumps(server.config))
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+        print("\n请求统计:")
+        for name, count in sorted(server.snapshot().items()):
+            print(f"  {name:<20}{count:>14,.1f}" if isinstance(count, float) else f"  {name:<20}{count:>12,}")
+
+
+if __name__ == "__main__":
+    main()
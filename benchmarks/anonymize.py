@@ -0,0 +1,68 @@
+"""
+对录制的 mtop 接口返回数据做脱敏，生成可以提交到仓库的基准测试数据。
+
+- 昵称、签名、评价内容等个人信息替换为等长的占位文本（保持数据体积不变）
+- 商品ID、用户ID、评价ID 等长数字按固定映射替换为同样长度的伪ID，同一ID在所有文件中映射一致
+- 图片等链接的域名替换为 img.example.com
+
+用法（在项目根目录）:
+    python benchmarks/anonymize.py recorded_search.json > benchmarks/fixtures/search.json
+"""
+import hashlib
+import json
+import re
+import sys
+
+# 需要整体替换的个人信息字段
+PERSONAL_TEXT_KEYS = {"userNickName", "displayName", "raterUserNick", "introduction", "feedback", "nick", "userNick"}
+# 时间戳等需要原样保留的数字字段
+PRESERVED_KEYS = {"publishTime", "gmtCreate", "gmtModified", "wantNum", "wantCnt", "browseCnt", "userRegDay", "number"}
+
+LONG_NUMBER_PATTERN = re.compile(r"\d{6,}")
+# 只替换 http(s):// 或以 // 开头的链接的域名，保留 fleamarket:// 等应用内链接
+URL_HOST_PATTERN = re.compile(r"(https?:|^)//[^/\s\"'?#]+")
+
+
+def _pseudo_digits(match) -> str:
+    digits = match.group(0)
+    digest = hashlib.sha256(digits.encode("utf-8")).hexdigest()
+    pseudo = str(int(digest, 16))[:len(digits)]
+    # 保持首位非零，避免被当作格式不同的数字
+    return ("1" + pseudo[1:]) if pseudo[0] == "0" else pseudo
+
+
+def _scrub_string(key: str, value: str) -> str:
+    if key in PERSONAL_TEXT_KEYS:
+        return "某" * len(value)
+    if key in PRESERVED_KEYS:
+        return value
+    value = LONG_NUMBER_PATTERN.sub(_pseudo_digits, value)
+    if "//" in value:
+        value = URL_HOST_PATTERN.sub(lambda m: f"{m.group(1)}//img.example.com", value)
+    return value
+
+
+def anonymize(data, key: str = ""):
+    """递归脱敏一个 JSON 对象，返回新的对象。"""
+    if isinstance(data, dict):
+        return {k: anonymize(v, k) for k, v in data.items()}
+    if isinstance(data, list):
+        return [anonymize(v, key) for v in data]
+    if isinstance(data, str):
+        return _scrub_string(key, data)
+    if isinstance(data, int) and not isinstance(data, bool) and key.lower().endswith("id") and data >= 100000:
+        return int(LONG_NUMBER_PATTERN.sub(_pseudo_digits, str(data)))
+    return data
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("用法: python benchmarks/anonymize.py <录制的JSON文件>")
+    with open(sys.argv[1], "r", encoding="utf-8") as f:
+        data = json.load(f)
+    json.dump(anonymize(data), sys.stdout, ensure_ascii=False, indent=1)
+    sys.stdout.write("\n")
+
+
+if __name__ == "__main__":
+    main()
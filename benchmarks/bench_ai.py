@@ -0,0 +1,184 @@
+"""
+AI分析阶段的吞吐量基准测试。
+
+在进程内启动 benchmarks/ai_mock_server.py 的模拟服务，并让 spider_v2.get_ai_analysis 指向它，
+以指定并发数调用AI分析（含构建 prompt、图片 base64 编码、JSON 解析和重试），
+输出每秒调用数、单次调用延迟 p50/p90/p99、每次调用上传的字节数和 token 数。
+
+模拟服务的延迟可以设为 0 来单独测量链路自身的开销。用法（在项目根目录）:
+    python benchmarks/bench_ai.py --calls 200 --concurrency 16 --format table
+    python benchmarks/bench_ai.py --calls 500 --concurrency 1 --latency-median-ms 0 --format table
+    python benchmarks/bench_ai.py --rate-429 0.05 --malformed-rate 0.02 --output ai.json
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import recorded  # noqa: E402
+from benchmarks.ai_mock_server import MockAIServer, add_config_arguments, config_from_args  # noqa: E402
+from benchmarks.run_benchmarks import git_revision  # noqa: E402
+
+
+# spider_v2 在导入时会创建缓存数据库、图片目录、通知发件箱、追踪和指标文件，基准测试把它们全部指向临时目录，
+# 不改动真实工作目录中的数据
+SPIDER_PATH_ENV = {
+    "AI_CACHE_FILE": "ai_analysis.db",
+    "SELLER_CACHE_FILE": "seller_profiles.db",
+    "NOTIFICATION_OUTBOX_FILE": "notification_outbox.json",
+    "TRACE_FILE": "traces.jsonl",
+    "SPIDER_METRICS_FILE": "spider_metrics.prom",
+    "IMAGE_SAVE_DIR": "images",
+    "REPLAY_DATA_DIR": "replay_data",
+}
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def make_images(directory: str, count: int, size_kb: int) -> list:
+    """生成 count 张指定大小的占位图片（内容为随机字节，只用于测量编码和上传的开销）。"""
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"bench_image_{i}.jpg")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size_kb * 1024))
+        paths.append(path)
+    return paths
+
+
+async def drive(get_ai_analysis, records: list, image_paths: list, prompt_text: str, concurrency: int) -> list:
+    """以固定并发调用AI分析，返回每次调用的 (耗时秒数, 是否成功)。"""
+    queue = asyncio.Queue()
+    for record in records:
+        queue.put_nowait(record)
+    results = []
+
+    async def worker():
+        while not queue.empty():
+            record = queue.get_nowait()
+            started = time.perf_counter()
+            analysis = await get_ai_analysis(record, image_paths, prompt_text=prompt_text)
+            results.append((time.perf_counter() - started, analysis is not None))
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI分析阶段的吞吐量基准测试")
+    parser.add_argument("--calls", type=int, default=100, help="调用总次数")
+    parser.add_argument("--concurrency", type=int, default=8, help="同时进行的调用数")
+    parser.add_argument("--images", type=int, default=4, help="每次调用附带的图片数")
+    parser.add_argument("--image-kb", type=int, default=120, help="每张图片的大小 (KB)")
+    parser.add_argument("--prompt-file", default="prompts/base_prompt.txt", help="使用的 prompt 文件")
+    parser.add_argument("--format", choices=["json", "table"], default="json", help="输出格式")
+    parser.add_argument("--output", help="把 JSON 结果写入该文件")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    mock = MockAIServer(config_from_args(args))
+    mock.start()
+    work_dir = tempfile.TemporaryDirectory(prefix="bench_ai_")
+    # spider_v2 在导入时读取这些环境变量并创建 OpenAI 客户端和各类文件，必须在导入前设置（load_dotenv 不会覆盖已有的值）
+    os.environ["OPENAI_BASE_URL"] = mock.base_url
+    os.environ["OPENAI_MODEL_NAME"] = "mock"
+    os.environ["OPENAI_API_KEY"] = "sk-mock"
+    for name, file_name in SPIDER_PATH_ENV.items():
+        os.environ[name] = os.path.join(work_dir.name, file_name)
+    import spider_v2
+
+    with open(args.prompt_file, "r", encoding="utf-8") as f:
+        prompt_text = f.read()
+    # 每条记录的商品ID不同，避免请求内容完全一致
+    base_record = recorded.sample_record()
+    records = []
+    for i in range(args.calls):
+        record = json.loads(json.dumps(base_record))
+        record["商品信息"]["商品ID"] = f"{record['商品信息']['商品ID']}{i}"
+        records.append(record)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_paths = make_images(tmp_dir, args.images, args.image_kb)
+        started = time.perf_counter()
+        # get_ai_analysis 会打印每次调用的日志，计时期间屏蔽输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = asyncio.run(drive(spider_v2.get_ai_analysis, records, image_paths, prompt_text,
+                                        args.concurrency))
+        wall_seconds = time.perf_counter() - started
+    mock.stop()
+    spider_v2.ai_analysis_cache.close()
+    spider_v2.seller_profile_cache.close()
+    work_dir.cleanup()
+
+    server = mock.snapshot()
+    latencies = sorted(seconds for seconds, _ in results)
+    calls = len(results)
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "calls": args.calls,
+            "concurrency": args.concurrency,
+            "images_per_call": args.images,
+            "image_kb": args.image_kb,
+            "mock": mock.config,
+        },
+        "results": {
+            "wall_seconds": round(wall_seconds, 3),
+            "calls_per_sec": round(calls / wall_seconds, 2),
+            "succeeded": sum(1 for _, ok in results if ok),
+            "failed": sum(1 for _, ok in results if not ok),
+            "latency_ms": {
+                "p50": round(percentile(latencies, 0.5) * 1000, 1),
+                "p90": round(percentile(latencies, 0.9) * 1000, 1),
+                "p99": round(percentile(latencies, 0.99) * 1000, 1),
+                "max": round(latencies[-1] * 1000, 1) if latencies else 0,
+            },
+            "http_requests": server.get("requests", 0),
+            "requests_per_call": round(server.get("requests", 0) / calls, 2),
+            "bytes_uploaded_per_call": round(server.get("bytes_received", 0) / calls),
+            "prompt_tokens_per_call": round(server.get("prompt_tokens", 0) / calls),
+            "completion_tokens_per_call": round(server.get("completion_tokens", 0) / calls),
+            # 调用总耗时中不属于模拟服务处理时间的部分：prompt 构建、编码、解析、客户端排队和重试等待
+            "client_overhead_ms_per_call": round((sum(latencies) - server.get("server_seconds", 0)) / calls * 1000, 1),
+            "status_counts": {k.replace("status_", ""): v for k, v in server.items() if k.startswith("status_")},
+            "malformed_responses": server.get("malformed", 0),
+        },
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.format == "json":
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        r = report["results"]
+        print(f"调用 {calls} 次，并发 {args.concurrency}，每次 {args.images} 张图片 ({args.image_kb}KB)")
+        print(f"  每秒调用数          {r['calls_per_sec']:>12,.2f}")
+        print(f"  成功 / 失败         {r['succeeded']:>6} / {r['failed']}")
+        print(f"  延迟 p50/p90/p99    {r['latency_ms']['p50']:>8,.0f} / {r['latency_ms']['p90']:,.0f} / {r['latency_ms']['p99']:,.0f} ms")
+        print(f"  每次调用HTTP请求数  {r['requests_per_call']:>12}")
+        print(f"  每次调用上传字节数  {r['bytes_uploaded_per_call']:>12,}")
+        print(f"  每次调用 token      {r['prompt_tokens_per_call']:>12,} 输入 / {r['completion_tokens_per_call']:,} 输出")
+        print(f"  自身开销            {r['client_overhead_ms_per_call']:>12,.1f} ms/次")
+        print(f"  状态码              {r['status_counts']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+解析函数微基准：对比改写前（逐字段 await safe_get）与改写后（预编译路径的同步解析）每秒可解析的卡片数。
+
+运行方式（在项目根目录）:
+    python benchmarks/bench_parsers.py [--repeat 200]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mtop_parsers  # noqa: E402
+from benchmarks import legacy_parsers, recorded  # noqa: E402
+
+
+def _time_sync(func, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return time.perf_counter() - started
+
+
+def _time_async(coro_factory, repeat: int) -> float:
+    async def run():
+        started = time.perf_counter()
+        for _ in range(repeat):
+            await coro_factory()
+        return time.perf_counter() - started
+    return asyncio.run(run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="mtop 解析函数微基准")
+    parser.add_argument("--repeat", type=int, default=200, help="每个用例重复次数")
+    args = parser.parse_args()
+
+    search = recorded.search_pages(1)[0]
+    ratings = recorded.cards("ratings", 500)
+    items = recorded.cards("user_items", 200)
+    head = recorded.load("user_head")
+
+    cases = [
+        ("search", len(search["data"]["resultList"]),
+         lambda: legacy_parsers._parse_search_results_json(search, "bench"),
+         lambda: mtop_parsers.parse_search_results(search)),
+        ("ratings", len(ratings),
+         lambda: legacy_parsers.parse_ratings_data(ratings),
+         lambda: mtop_parsers.parse_ratings(ratings)),
+        ("reputation", len(ratings),
+         lambda: legacy_parsers.calculate_reputation_from_ratings(ratings),
+         lambda: mtop_parsers.calculate_reputation(ratings)),
+        ("user_items", len(items),
+         lambda: legacy_parsers._parse_user_items_data(items),
+         lambda: mtop_parsers.parse_user_items(items)),
+        ("user_head", 1,
+         lambda: legacy_parsers.parse_user_head_data(head),
+         lambda: mtop_parsers.parse_user_head(head)),
+    ]
+
+    print(f"{'用例':<12}{'卡片数':>8}{'改写前 (卡片/秒)':>20}{'改写后 (卡片/秒)':>20}{'加速比':>10}")
+    for name, cards, legacy, current in cases:
+        # 旧实现的搜索解析会打印日志，计时期间屏蔽输出
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert asyncio.run(legacy()) == current(), f"{name}: 改写前后的解析结果不一致"
+            legacy_seconds = _time_async(legacy, args.repeat)
+        current_seconds = _time_sync(current, args.repeat)
+        legacy_rate = cards * args.repeat / legacy_seconds
+        current_rate = cards * args.repeat / current_seconds
+        print(f"{name:<12}{cards:>8}{legacy_rate:>20,.0f}{current_rate:>20,.0f}{legacy_seconds / current_seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
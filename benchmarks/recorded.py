@@ -0,0 +1,78 @@
+"""
+读取 benchmarks/fixtures/ 下脱敏后的 mtop 接口返回数据，并按需要放大到真实规模。
+
+fixtures 中每个文件对应爬虫使用的一个接口:
+    search.json      mtop.taobao.idlemtopsearch.pc.search
+    detail.json      mtop.taobao.idle.pc.detail
+    user_head.json   mtop.idle.web.user.page.head
+    user_items.json  mtop.idle.web.xyh.item.list
+    ratings.json     mtop.idle.web.trade.rate.list
+新录制的数据需先经过 benchmarks/anonymize.py 脱敏后再放入该目录。
+"""
+import copy
+import json
+import os
+import time
+from datetime import datetime
+
+import mtop_parsers
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load(name: str) -> dict:
+    """读取一个接口的录制数据。"""
+    with open(os.path.join(FIXTURE_DIR, f"{name}.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def cards(name: str, count: int) -> list:
+    """取出 cardList 并循环复制到 count 张卡片（模拟滚动加载多页后累积的列表）。"""
+    card_list = load(name)["data"]["cardList"]
+    return [copy.deepcopy(card_list[i % len(card_list)]) for i in range(count)]
+
+
+def search_pages(pages: int = 1) -> list:
+    """
+    返回 pages 页搜索结果。发布时间整体平移到当前时间附近，使新品筛选的时间窗口有实际意义；
+    每页的商品ID加上页码后缀，避免跨页重复。
+    """
+    payload = load("search")
+    result_list = payload["data"]["resultList"]
+    publish_times = [int(r["data"]["item"]["main"]["clickParam"]["args"]["publishTime"]) for r in result_list]
+    shift = int(time.time() * 1000) - max(publish_times)
+
+    all_pages = []
+    for page in range(pages):
+        page_payload = copy.deepcopy(payload)
+        for result in page_payload["data"]["resultList"]:
+            main = result["data"]["item"]["main"]
+            args = main["clickParam"]["args"]
+            args["publishTime"] = str(int(args["publishTime"]) + shift - page * 3600 * 1000)
+            main["exContent"]["itemId"] = f"{main['exContent']['itemId']}{page}"
+        all_pages.append(page_payload)
+    return all_pages
+
+
+def sample_record(item_suffix: str = "") -> dict:
+    """
+    按爬虫流水线的方式构建一条完整的结果记录（商品信息 + 含商品列表和评价列表的卖家信息），不含AI分析结果。
+    item_suffix 会追加到商品ID后，用于生成内容各不相同的记录。
+    """
+    item_data = dict(mtop_parsers.parse_search_results(load("search"))[0])
+    item_data["商品ID"] = f"{item_data['商品ID']}{item_suffix}"
+    detail_info = mtop_parsers.parse_item_detail(load("detail"), item_data)
+    ratings = cards("ratings", 500)
+    seller_info = mtop_parsers.parse_user_head(load("user_head"))
+    seller_info["卖家发布的商品列表"] = mtop_parsers.parse_user_items(cards("user_items", 200))
+    seller_info["卖家收到的评价列表"] = mtop_parsers.parse_ratings(ratings)
+    seller_info.update(mtop_parsers.calculate_reputation(ratings))
+    seller_info["卖家芝麻信用"] = detail_info["zhima_credit_text"]
+    seller_info["卖家注册时长"] = detail_info["registration_duration_text"]
+    return {
+        "爬取时间": datetime.now().isoformat(),
+        "搜索关键字": "benchmark",
+        "任务名称": "benchmark",
+        "商品信息": item_data,
+        "卖家信息": seller_info,
+    }
@@ -0,0 +1,453 @@
+"""
+闲鱼网页版的本地回放服务，用于在离线环境中端到端运行和压测爬虫。
+
+基于 benchmarks/fixtures/ 中的录制数据提供搜索页、详情页、卖家主页以及它们调用的 mtop 接口:
+    /search?q=...                                   搜索页（含 新发布/最新/个人闲置/价格/翻页 控件）
+    /item?id=...                                    商品详情页
+    /personal?userId=...                            卖家主页（滚动加载商品列表，点击 信用及评价 后滚动加载评价）
+    /h5/mtop.taobao.idlemtopsearch.pc.search/1.0/   搜索接口
+    /h5/mtop.taobao.idle.pc.detail/1.0/             详情接口
+    /h5/mtop.idle.web.user.page.head/1.0/           卖家头部信息接口
+    /h5/mtop.idle.web.xyh.item.list/1.0/            卖家商品列表接口
+    /h5/mtop.idle.web.trade.rate.list/1.0/          卖家评价列表接口
+    /img/<name>                                     商品图片
+    /__stats                                        各接口的请求数和注入的故障数（JSON）
+
+商品按场景中的速率持续"上架"，因此新品监控任务每轮都能看到新商品。
+每个接口的延迟、翻页深度以及 FAIL_SYS_USER_VALIDATE / baxia 验证弹窗等故障都由场景控制。
+
+用法（在项目根目录）:
+    python benchmarks/replay_server.py --scenario default --port 8765
+    python benchmarks/replay_server.py --scenario my_scenario.json
+然后让爬虫指向回放服务（不需要登录状态文件）:
+    GOOFISH_BASE_URL=http://127.0.0.1:8765 python spider_v2.py --config bench_config.json
+"""
+import argparse
+import copy
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import recorded  # noqa: E402
+from mtop_request import sign_mtop  # noqa: E402
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+# 场景默认值。延迟为 [最小, 最大] 毫秒，请求时在区间内均匀取值
+DEFAULT_SCENARIO = {
+    "latency_ms": {
+        "page": [80, 200],
+        "search": [150, 400],
+        "detail": [100, 300],
+        "head": [80, 200],
+        "items": [80, 250],
+        "ratings": [80, 250],
+        "image": [20, 80],
+    },
+    "search_pages": 5,              # 搜索结果的总页数
+    "items_per_page": 30,           # 每页商品数
+    "listing_rate_per_minute": 2,   # 每分钟新上架的商品数（供新品监控使用）
+    "sellers": 20,                  # 卖家数量，商品按顺序轮流分配给卖家
+    "seller_item_pages": 3,         # 卖家商品列表的页数
+    "rating_pages": 5,              # 卖家评价列表的页数
+    "user_validate_rate": 0.0,      # 详情接口返回 FAIL_SYS_USER_VALIDATE 的概率
+    "user_validate_after": None,    # 第 N 次详情请求之后一律返回 FAIL_SYS_USER_VALIDATE
+    "validate_over_rpm": None,      # 所有 mtop 接口在最近 60 秒内超过该请求数时返回 FAIL_SYS_USER_VALIDATE
+    "baxia_rate": 0.0,              # 搜索页出现 baxia 验证弹窗的概率
+    "error_rate": 0.0,              # mtop 接口返回 HTTP 503 的概率
+}
+
+SCENARIOS = {
+    "default": {},
+    "fast": {"latency_ms": {name: [0, 0] for name in DEFAULT_SCENARIO["latency_ms"]}},
+    "slow": {"latency_ms": {"page": [500, 1500], "search": [800, 2500], "detail": [600, 2000], "head": [400, 1200],
+                            "items": [400, 1200], "ratings": [400, 1200], "image": [100, 400]}},
+    "deep": {"search_pages": 50, "seller_item_pages": 20, "rating_pages": 40, "sellers": 200},
+    "flaky": {"error_rate": 0.1, "user_validate_rate": 0.02},
+    "user_validate": {"user_validate_after": 10},
+    "rate_limited": {"validate_over_rpm": 20},
+    "baxia": {"baxia_rate": 1.0},
+}
+
+MTOP_TOKEN = "replaytoken0123456789abcdef"
+MTOP_APIS = {
+    "mtop.taobao.idlemtopsearch.pc.search": "search",
+    "mtop.taobao.idle.pc.detail": "detail",
+    "mtop.idle.web.user.page.head": "head",
+    "mtop.idle.web.xyh.item.list": "items",
+    "mtop.idle.web.trade.rate.list": "ratings",
+}
+ITEM_ID_BASE = 500000000000
+SELLER_ID_BASE = 2200000000000
+
+# 页面内发起 mtop 请求的公共脚本（请求格式与真实页面一致，页面自身的请求不带签名）
+MTOP_SCRIPT = """
+async function mtop(api, data) {
+  const params = new URLSearchParams({jsv: "2.7.2", appKey: "34839810", t: Date.now(), api: api, v: "1.0",
+                                      type: "originaljson", dataType: "json"});
+  const resp = await fetch("/h5/" + api + "/1.0/?" + params, {
+    method: "POST", credentials: "include",
+    headers: {"content-type": "application/x-www-form-urlencoded"},
+    body: new URLSearchParams({data: JSON.stringify(data)}),
+  });
+  return resp.ok ? resp.json() : null;
+}
+"""
+
+
+def load_scenario(name_or_path: str) -> dict:
+    """按名称读取内置场景，或从 JSON 文件读取自定义场景，未指定的字段使用默认值。"""
+    if name_or_path in SCENARIOS:
+        overrides = SCENARIOS[name_or_path]
+    else:
+        with open(name_or_path, "r", encoding="utf-8") as f:
+            overrides = json.load(f)
+    scenario = copy.deepcopy(DEFAULT_SCENARIO)
+    scenario["latency_ms"].update(overrides.get("latency_ms", {}))
+    scenario.update({k: v for k, v in overrides.items() if k != "latency_ms"})
+    return scenario
+
+
+class ReplaySite:
+    """根据场景生成各接口的响应数据，并记录请求统计。与 HTTP 处理无关，便于单独调用。"""
+
+    def __init__(self, scenario: dict, origin: str):
+        self.scenario = scenario
+        self.origin = origin
+        self.started_at = time.time()
+        self.listing_interval = 60 / max(scenario["listing_rate_per_minute"], 1e-6)
+        # 启动时已上架的商品数：刚好填满所有搜索页
+        self.initial_listings = scenario["search_pages"] * scenario["items_per_page"]
+
+        self.search_template = recorded.load("search")
+        self.detail_template = recorded.load("detail")
+        self.head_template = recorded.load("user_head")
+        self.items_template = recorded.load("user_items")
+        self.ratings_template = recorded.load("ratings")
+
+        self.stats = Counter()
+        self.detail_requests = 0
+        self.recent_mtop = deque()
+        self._lock = threading.Lock()
+        self._image_bytes = None
+
+    # --- 故障注入 ---
+
+    def latency(self, kind: str):
+        low, high = self.scenario["latency_ms"].get(kind, [0, 0])
+        if high > 0:
+            time.sleep(random.uniform(low, high) / 1000)
+
+    def check_mtop_failure(self, kind: str, api: str):
+        """返回需要注入的故障响应 (HTTP 状态码, JSON)，没有故障时返回 None。"""
+        now = time.time()
+        with self._lock:
+            self.stats[f"mtop.{kind}"] += 1
+            self.recent_mtop.append(now)
+            while self.recent_mtop and self.recent_mtop[0] < now - 60:
+                self.recent_mtop.popleft()
+            recent_count = len(self.recent_mtop)
+            if kind == "detail":
+                self.detail_requests += 1
+            detail_requests = self.detail_requests
+
+        if random.random() < self.scenario["error_rate"]:
+            self.stats["fault.http_503"] += 1
+            return 503, {"ret": ["FAIL_SYS_SERVICE_UNAVAILABLE::服务不可用"]}
+        over_rpm = self.scenario["validate_over_rpm"]
+        validate_after = self.scenario["user_validate_after"]
+        if ((over_rpm and recent_count > over_rpm)
+                or (kind == "detail" and validate_after is not None and detail_requests > validate_after)
+                or (kind == "detail" and random.random() < self.scenario["user_validate_rate"])):
+            self.stats["fault.user_validate"] += 1
+            return 200, {"api": api, "ret": ["FAIL_SYS_USER_VALIDATE", "RGV587_ERROR::SM::哎哟喂,被挤爆啦,请稍后重试"],
+                         "data": {"url": f"{self.origin}/punish?x5secdata=replay"}}
+        return None
+
+    def show_baxia(self) -> bool:
+        if random.random() < self.scenario["baxia_rate"]:
+            self.stats["fault.baxia"] += 1
+            return True
+        return False
+
+    # --- 商品时间线 ---
+
+    def newest_listing(self) -> int:
+        return self.initial_listings + int((time.time() - self.started_at) / self.listing_interval) - 1
+
+    def listing_time_ms(self, index: int) -> int:
+        return int((self.started_at - (self.initial_listings - 1 - index) * self.listing_interval) * 1000)
+
+    def seller_of(self, index: int) -> str:
+        return str(SELLER_ID_BASE + index % self.scenario["sellers"])
+
+    def search(self, data: dict) -> dict:
+        page_number = int(data.get("pageNumber") or 1)
+        per_page = self.scenario["items_per_page"]
+        results = []
+        if page_number <= self.scenario["search_pages"]:
+            newest = self.newest_listing()
+            templates = self.search_template["data"]["resultList"]
+            for offset in range(per_page):
+                index = newest - (page_number - 1) * per_page - offset
+                if index < 0:
+                    break
+                result = copy.deepcopy(templates[index % len(templates)])
+                main = result["data"]["item"]["main"]
+                item_id = str(ITEM_ID_BASE + index)
+                main["exContent"]["itemId"] = item_id
+                main["exContent"]["title"] = f"{data.get('keyword', '')} 回放商品 {index}"
+                main["exContent"]["picUrl"] = f"{self.origin}/img/{item_id}.jpg"
+                main["clickParam"]["args"]["publishTime"] = str(self.listing_time_ms(index))
+                main["targetUrl"] = f"{self.origin}/item?id={item_id}&categoryId=0"
+                results.append(result)
+        payload = copy.deepcopy(self.search_template)
+        payload["data"]["resultList"] = results
+        return payload
+
+    def detail(self, data: dict) -> dict:
+        item_id = str(data.get("itemId", ITEM_ID_BASE))
+        index = int(item_id) - ITEM_ID_BASE if item_id.isdigit() else 0
+        payload = copy.deepcopy(self.detail_template)
+        item_do = payload["data"]["itemDO"]
+        item_do["itemId"] = int(item_id) if item_id.isdigit() else item_id
+        item_do["title"] = f"回放商品 {index}"
+        for i, image in enumerate(item_do.get("imageInfos", [])):
+            image["url"] = f"{self.origin}/img/{item_id}_{i}.jpg"
+        payload["data"]["sellerDO"]["sellerId"] = int(self.seller_of(index))
+        return payload
+
+    def user_head(self, data: dict) -> dict:
+        return copy.deepcopy(self.head_template)
+
+    def _card_page(self, template: dict, id_key: str, user_id: str, page_number: int, pages: int) -> dict:
+        payload = copy.deepcopy(template)
+        cards = payload["data"]["cardList"]
+        for i, card in enumerate(cards):
+            card["cardData"][id_key] = f"{user_id}{page_number:03d}{i:03d}"
+        payload["data"]["nextPage"] = page_number < pages
+        if page_number > pages:
+            payload["data"]["cardList"] = []
+        return payload
+
+    def user_items(self, data: dict) -> dict:
+        return self._card_page(self.items_template, "id", str(data.get("userId", "")), int(data.get("pageNumber") or 1),
+                               self.scenario["seller_item_pages"])
+
+    def ratings(self, data: dict) -> dict:
+        return self._card_page(self.ratings_template, "rateId", str(data.get("ratedUid", "")),
+                               int(data.get("pageNumber") or 1), self.scenario["rating_pages"])
+
+    def image(self) -> bytes:
+        if self._image_bytes is None:
+            if Image is not None:
+                buffer = io.BytesIO()
+                Image.effect_noise((800, 800), 64).convert("RGB").save(buffer, format="JPEG", quality=85)
+                self._image_bytes = buffer.getvalue()
+            else:
+                # 未安装 Pillow 时返回体积相近的占位数据，只用于测量下载路径
+                self._image_bytes = b"\xff\xd8\xff\xe0" + os.urandom(120 * 1024) + b"\xff\xd9"
+        return self._image_bytes
+
+    # --- 页面 ---
+
+    def search_page(self, keyword: str) -> str:
+        baxia = '<div class="baxia-dialog-mask" style="position:fixed;inset:0;background:#0008">请完成验证</div>' \
+            if self.show_baxia() else ""
+        return f"""<!doctype html><html><head><meta charset="utf-8"><title>{keyword} - 闲鱼回放</title></head><body>
+<div class="search-filter">
+  <div id="sort-new">新发布</div><div id="sort-latest">最新</div><div id="personal">个人闲置</div>
+  <div class="search-price-input-container--replay"><input placeholder="¥" id="min-price"><input placeholder="¥" id="max-price"></div>
+</div>
+<div id="results"></div>
+<button class="search-pagination-arrow-right--replay" id="next">下一页</button>
+{baxia}
+<script>{MTOP_SCRIPT}
+const query = {{keyword: {json.dumps(keyword, ensure_ascii=False)}, pageNumber: 1, rowsPerPage: {self.scenario["items_per_page"]},
+               sortField: "", sortValue: "", propValueStr: {{}}}};
+const filters = {{}};
+async function search() {{
+  query.propValueStr = {{searchFilter: Object.values(filters).join("")}};
+  const json = await mtop("mtop.taobao.idlemtopsearch.pc.search", query);
+  const list = (json && json.data && json.data.resultList) || [];
+  document.getElementById("results").textContent = list.length + " 个商品";
+  document.getElementById("next").disabled = query.pageNumber >= {self.scenario["search_pages"]};
+}}
+document.getElementById("sort-latest").onclick = () => {{ query.sortField = "create"; query.sortValue = "desc"; query.pageNumber = 1; search(); }};
+document.getElementById("personal").onclick = () => {{ filters.personal = "quickFilter:filterPersonal;"; query.pageNumber = 1; search(); }};
+document.getElementById("max-price").onblur = () => {{
+  filters.price = "priceRange:" + (document.getElementById("min-price").value || 0) + "," + document.getElementById("max-price").value + ";";
+  query.pageNumber = 1; search();
+}};
+document.getElementById("next").onclick = () => {{ query.pageNumber += 1; search(); }};
+search();
+</script></body></html>"""
+
+    def item_page(self, item_id: str) -> str:
+        return f"""<!doctype html><html><head><meta charset="utf-8"><title>商品 {item_id} - 闲鱼回放</title></head><body>
+<img src="/img/{item_id}_0.jpg" width="400"><img src="/img/{item_id}_1.jpg" width="400">
+<div id="detail"></div>
+<script>{MTOP_SCRIPT}
+mtop("mtop.taobao.idle.pc.detail", {{itemId: {json.dumps(item_id)}}}).then(json => {{
+  document.getElementById("detail").textContent = JSON.stringify((json || {{}}).ret);
+}});
+</script></body></html>"""
+
+    def personal_page(self, user_id: str) -> str:
+        return f"""<!doctype html><html><head><meta charset="utf-8"><title>卖家 {user_id} - 闲鱼回放</title></head><body>
+<ul class="tabs"><li><div>宝贝</div></li><li id="rate-tab"><div>信用及评价</div></li></ul>
+<div id="list"></div>
+<script>{MTOP_SCRIPT}
+const userId = {json.dumps(user_id)};
+const feeds = {{
+  items: {{api: "mtop.idle.web.xyh.item.list", query: {{userId: userId, pageNumber: 1, pageSize: 20}}, more: true}},
+  ratings: {{api: "mtop.idle.web.trade.rate.list", query: {{ratedUid: userId, pageNumber: 1, pageSize: 20}}, more: true}},
+}};
+let current = "items", loading = false;
+async function loadMore() {{
+  const feed = feeds[current];
+  if (loading || !feed.more) return;
+  loading = true;
+  const json = await mtop(feed.api, feed.query);
+  feed.more = !!(json && json.data && json.data.nextPage);
+  feed.query.pageNumber += 1;
+  // 每加载一页就把页面拉长，保证下一次滚动到底部时仍会触发 scroll 事件
+  const spacer = document.createElement("div");
+  spacer.style.height = "2000px";
+  document.getElementById("list").appendChild(spacer);
+  loading = false;
+}}
+window.addEventListener("scroll", loadMore);
+document.getElementById("rate-tab").onclick = () => {{ current = "ratings"; loadMore(); }};
+mtop("mtop.idle.web.user.page.head", {{self: false, userId: userId}});
+loadMore();
+</script></body></html>"""
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    server_version = "GoofishReplay/1.0"
+    site: ReplaySite = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes, content_type: str, extra_headers: dict = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.site.stats["bytes_sent"] += len(body)
+
+    def _send_json(self, status: int, payload: dict):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json;charset=UTF-8")
+
+    def _send_page(self, html: str):
+        self.site.latency("page")
+        expires = int((time.time() + 86400) * 1000)
+        # 与真实站点一样通过 Cookie 下发 mtop 签名 token，供 replay_mtop_request 重新签名
+        self._send(200, html.encode("utf-8"), "text/html;charset=UTF-8",
+                   {"Set-Cookie": f"_m_h5_tk={MTOP_TOKEN}_{expires}; Path=/"})
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        site = self.site
+        if parsed.path == "/search":
+            site.stats["page.search"] += 1
+            self._send_page(site.search_page(query.get("q", "")))
+        elif parsed.path == "/item":
+            site.stats["page.item"] += 1
+            self._send_page(site.item_page(query.get("id", "")))
+        elif parsed.path == "/personal":
+            site.stats["page.personal"] += 1
+            self._send_page(site.personal_page(query.get("userId", "")))
+        elif parsed.path.startswith("/img/"):
+            site.stats["image"] += 1
+            site.latency("image")
+            self._send(200, site.image(), "image/jpeg")
+        elif parsed.path == "/__stats":
+            self._send_json(200, {"uptime_seconds": round(time.time() - site.started_at, 1),
+                                  "newest_listing": site.newest_listing(), "counts": dict(site.stats)})
+        else:
+            self._send(404, b"not found", "text/plain")
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        parts = parsed.path.strip("/").split("/")
+        api = parts[1] if len(parts) >= 2 and parts[0] == "h5" else ""
+        kind = MTOP_APIS.get(api)
+        if not kind:
+            self._send(404, b"not found", "text/plain")
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8"), keep_blank_values=True).items()}
+        params = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        data_text = form.get("data", "{}")
+
+        self.site.latency(kind)
+        # 页面自身的请求不带签名；重放的请求带签名时必须与 token 对应，用来发现重新签名的错误
+        sign = params.get("sign")
+        if sign and sign != sign_mtop(MTOP_TOKEN, params.get("t", ""), params.get("appKey", ""), data_text):
+            self.site.stats["fault.bad_sign"] += 1
+            self._send_json(200, {"api": api, "ret": ["FAIL_SYS_ILLEGAL_ACCESS::非法请求"]})
+            return
+        failure = self.site.check_mtop_failure(kind, api)
+        if failure:
+            self._send_json(*failure)
+            return
+
+        try:
+            data = json.loads(data_text)
+        except json.JSONDecodeError:
+            data = {}
+        handler = {"search": self.site.search, "detail": self.site.detail, "head": self.site.user_head,
+                   "items": self.site.user_items, "ratings": self.site.ratings}[kind]
+        self._send_json(200, handler(data))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="闲鱼网页版本地回放服务")
+    parser.add_argument("--scenario", default="default",
+                        help=f"内置场景名称 ({', '.join(SCENARIOS)}) 或场景 JSON 文件路径")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    scenario = load_scenario(args.scenario)
+    origin = f"http://{args.host}:{args.port}"
+    ReplayHandler.site = ReplaySite(scenario, origin)
+    server = ThreadingHTTPServer((args.host, args.port), ReplayHandler)
+    server.daemon_threads = True
+
+    print(f"回放服务已启动: {origin} (场景: {args.scenario})")
+    print(json.dumps(scenario, ensure_ascii=False))
+    print(f"让爬虫指向回放服务: GOOFISH_BASE_URL={origin} python spider_v2.py")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print("\n请求统计:")
+        for name, count in sorted(ReplayHandler.site.stats.items()):
+            print(f"  {name:<22}{count:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+解析与记录构建热点路径的基准测试。
+
+基于 benchmarks/fixtures/ 中脱敏后的录制数据，按真实规模测量以下路径的吞吐量和内存分配:
+    search_parse      搜索结果解析 (_parse_search_results_json 的同步实现)
+    detail_extract    详情页数据提取 (scrape_xianyu 中的详情解析)
+    user_head_parse   卖家主页头部解析
+    user_items_parse  卖家商品列表解析
+    ratings_parse     评价列表解析
+    reputation        好评率统计
+    filter_new        新品筛选 (filter_new_products)
+    jsonl_serialize   完整记录序列化并追加写入 JSONL
+
+结果以 JSON 输出，便于保存并与之前的结果比较。用法（在项目根目录）:
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --format table
+    python benchmarks/run_benchmarks.py --compare bench.json   # 比当前结果慢超过阈值时返回非零退出码
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mtop_parsers  # noqa: E402
+from benchmarks import recorded  # noqa: E402
+
+
+def build_cases(jsonl_path: str) -> list:
+    """返回 [(名称, 每次处理的条数, 无参函数)]。"""
+    search = recorded.search_pages(1)[0]
+    search_10_pages = recorded.search_pages(10)
+    detail = recorded.load("detail")
+    head = recorded.load("user_head")
+    items = recorded.cards("user_items", 200)
+    ratings = recorded.cards("ratings", 500)
+
+    basic_items = mtop_parsers.parse_search_results(search)
+    items_10_pages = [item for page in search_10_pages for item in mtop_parsers.parse_search_results(page)]
+
+    # 一条完整的结果记录：商品信息 + 含商品列表和评价列表的卖家信息 + AI分析结果
+    record = recorded.sample_record()
+    record["ai_analysis"] = {"is_recommended": True, "reason": "成色与价格匹配，卖家信用良好。" * 4,
+                             "criteria_analysis": {f"条件{i}": {"status": "pass", "comment": "符合要求"} for i in range(8)}}
+
+    def serialize_records():
+        with open(jsonl_path, "a", encoding="utf-8") as f:
+            for _ in range(10):
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    return [
+        ("search_parse", len(basic_items), lambda: mtop_parsers.parse_search_results(search)),
+        ("detail_extract", 1, lambda: mtop_parsers.parse_item_detail(detail, dict(basic_items[0]))),
+        ("user_head_parse", 1, lambda: mtop_parsers.parse_user_head(head)),
+        ("user_items_parse", len(items), lambda: mtop_parsers.parse_user_items(items)),
+        ("ratings_parse", len(ratings), lambda: mtop_parsers.parse_ratings(ratings)),
+        ("reputation", len(ratings), lambda: mtop_parsers.calculate_reputation(ratings)),
+        ("filter_new", len(items_10_pages), lambda: mtop_parsers.filter_new_products(items_10_pages, 3600, set())),
+        ("jsonl_serialize", 10, serialize_records),
+    ]
+
+
+def measure(func, items_per_call: int, min_time: float) -> dict:
+    """重复调用 func 至少 min_time 秒，另用 tracemalloc 单独测量一次调用的内存分配。"""
+    func()  # 预热
+    iterations, elapsed = 0, 0.0
+    started = time.perf_counter()
+    while elapsed < min_time:
+        func()
+        iterations += 1
+        elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    func()
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total_items = items_per_call * iterations
+    return {
+        "items_per_call": items_per_call,
+        "iterations": iterations,
+        "seconds": round(elapsed, 6),
+        "items_per_sec": round(total_items / elapsed, 1),
+        "ns_per_item": round(elapsed / total_items * 1e9, 1),
+        "peak_alloc_bytes": peak - before,
+        "alloc_bytes_per_item": round((peak - before) / items_per_call, 1),
+        "retained_bytes": after - before,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, baseline_path: str, threshold: float) -> list:
+    """与基线结果比较，返回吞吐量下降超过 threshold 的用例。"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["items_per_sec"] / baseline[name]["items_per_sec"]
+        result["baseline_ratio"] = round(ratio, 3)
+        if ratio < 1 - threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="解析与记录构建热点路径的基准测试")
+    parser.add_argument("--min-time", type=float, default=0.5, help="每个用例至少运行的秒数")
+    parser.add_argument("--filter", default="", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--format", choices=["json", "table"], default="json", help="输出格式")
+    parser.add_argument("--output", help="把 JSON 结果写入该文件")
+    parser.add_argument("--compare", help="与之前保存的 JSON 结果比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="吞吐量下降超过该比例视为性能回退")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cases = build_cases(os.path.join(tmp_dir, "bench_full_data.jsonl"))
+        results = {
+            name: measure(func, items, args.min_time)
+            for name, items, func in cases if args.filter in name
+        }
+
+    regressions = compare(results, args.compare, args.threshold) if args.compare else []
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "min_time": args.min_time,
+        },
+        "results": results,
+        "regressions": regressions,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.format == "json":
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(f"{'用例':<18}{'条数/次':>8}{'条/秒':>14}{'ns/条':>12}{'峰值分配':>12}{'基线比':>8}")
+        for name, r in results.items():
+            print(f"{name:<18}{r['items_per_call']:>8}{r['items_per_sec']:>14,.0f}{r['ns_per_item']:>12,.0f}"
+                  f"{r['peak_alloc_bytes']:>12,}{r.get('baseline_ratio', ''):>8}")
+        if regressions:
+            print(f"性能回退: {', '.join(regressions)}")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
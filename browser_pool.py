@@ -0,0 +1,165 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from playwright.async_api import async_playwright
+
+# 所有任务共享的浏览器上下文默认 User-Agent
+DEFAULT_USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+
+
+class PooledContext:
+    """
+    对 Playwright BrowserContext 的轻量包装，限制单个上下文同时打开的页面数。
+
+    除 new_page 外的属性访问都会直接转发给底层的 BrowserContext，
+    因此可以原样传给 scrape_user_profile 等只需要 context.new_page() 的函数。
+    """
+
+    def __init__(self, context, max_pages: int):
+        self.context = context
+        self.uses = 0
+        self._page_semaphore = asyncio.Semaphore(max_pages)
+
+    async def new_page(self):
+        """在页面配额内打开新页面，页面关闭时自动归还配额。"""
+        await self._page_semaphore.acquire()
+        try:
+            page = await self.context.new_page()
+        except Exception:
+            self._page_semaphore.release()
+            raise
+        page.once("close", lambda _: self._page_semaphore.release())
+        return page
+
+    def __getattr__(self, name):
+        return getattr(self.context, name)
+
+
+class BrowserManager:
+    """
+    进程内共享的浏览器管理器。
+
+    只启动一个 Chromium 实例，按需基于登录状态文件创建 BrowserContext 并放入池中复用，
+    同时限制存活的上下文数量和每个上下文的页面数量，上下文使用达到一定次数后会被回收重建。
+    需要长期占用上下文的调用方（如温页面模式的新品监控）使用 dedicated_context()，不占用池的配额。
+    """
+
+    def __init__(self, state_file: str, headless: bool = True, max_contexts: int = None,
+                 max_pages_per_context: int = None, context_max_uses: int = None,
+                 user_agent: str = DEFAULT_USER_AGENT, context_setup=None):
+        """
+        初始化浏览器管理器。
+
+        Args:
+            state_file: 登录状态文件路径 (由 login.py 生成)，为 None 时创建不带登录状态的上下文（回放模式）
+            headless: 是否以无头模式运行
+            max_contexts: 同时存活的上下文上限，默认读取环境变量 BROWSER_MAX_CONTEXTS (4)
+            max_pages_per_context: 每个上下文同时打开的页面上限，默认读取 BROWSER_MAX_PAGES_PER_CONTEXT (3)
+            context_max_uses: 单个上下文被借出多少次后回收重建，默认读取 BROWSER_CONTEXT_MAX_USES (20)
+            user_agent: 新建上下文时使用的 User-Agent
+            context_setup: 可选的协程函数，每个上下文创建后以 context_setup(context) 调用一次（如安装路由策略）
+        """
+        self.state_file = state_file
+        self.headless = headless
+        self.max_contexts = max_contexts or int(os.getenv("BROWSER_MAX_CONTEXTS", 4))
+        self.max_pages_per_context = max_pages_per_context or int(os.getenv("BROWSER_MAX_PAGES_PER_CONTEXT", 3))
+        self.context_max_uses = context_max_uses or int(os.getenv("BROWSER_CONTEXT_MAX_USES", 20))
+        self.user_agent = user_agent
+        self.context_setup = context_setup
+
+        self._playwright = None
+        self._browser = None
+        self._idle_contexts = []
+        self._context_semaphore = asyncio.Semaphore(self.max_contexts)
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        """启动 Playwright 和共享的 Chromium 实例（重复调用是安全的）。"""
+        async with self._start_lock:
+            if self._browser and self._browser.is_connected():
+                return
+            if not self._playwright:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            self._idle_contexts = []
+            print(f"LOG: 共享浏览器已启动 (上下文上限: {self.max_contexts}, 每上下文页面上限: {self.max_pages_per_context})")
+
+    async def _new_context(self) -> PooledContext:
+        context = await self._browser.new_context(storage_state=self.state_file, user_agent=self.user_agent)
+        if self.context_setup:
+            await self.context_setup(context)
+        return PooledContext(context, self.max_pages_per_context)
+
+    @asynccontextmanager
+    async def acquire_context(self):
+        """
+        从池中借出一个浏览器上下文，用完后自动归还。
+
+        在上下文数量达到上限时会等待其他任务归还；借出期间该上下文由调用方独占。
+        """
+        await self._context_semaphore.acquire()
+        pooled = None
+        try:
+            await self.start()
+            pooled = self._idle_contexts.pop() if self._idle_contexts else await self._new_context()
+            pooled.uses += 1
+            yield pooled
+        finally:
+            if pooled is not None:
+                await self._release(pooled)
+            self._context_semaphore.release()
+
+    @asynccontextmanager
+    async def dedicated_context(self):
+        """
+        创建一个不计入 max_contexts 配额、也不放回池中的独占上下文，退出时直接关闭。
+
+        用于在整个运行期间都要保留页面的调用方，避免其长期占住池中的名额，使其他任务无限等待。
+        """
+        await self.start()
+        pooled = await self._new_context()
+        try:
+            yield pooled
+        finally:
+            try:
+                await pooled.context.close()
+            except Exception:
+                pass
+
+    async def _release(self, pooled: PooledContext):
+        """归还上下文：关闭残留页面，超过复用次数或浏览器已断开时直接关闭。"""
+        try:
+            if not self._browser or not self._browser.is_connected():
+                return
+            for page in list(pooled.context.pages):
+                await page.close()
+            if pooled.uses >= self.context_max_uses:
+                print(f"LOG: 浏览器上下文已使用 {pooled.uses} 次，回收重建。")
+                await pooled.context.close()
+                return
+            self._idle_contexts.append(pooled)
+        except Exception as e:
+            print(f"   [警告] 归还浏览器上下文时出错，已丢弃该上下文: {e}")
+            try:
+                await pooled.context.close()
+            except Exception:
+                pass
+
+    async def close(self):
+        """关闭所有上下文、浏览器和 Playwright。"""
+        for pooled in self._idle_contexts:
+            try:
+                await pooled.context.close()
+            except Exception:
+                pass
+        self._idle_contexts = []
+        if self._browser:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
@@ -0,0 +1,76 @@
+import asyncio
+import os
+from urllib.parse import urlparse
+
+import aiofiles
+import httpx
+
+
+class ImageDownloader:
+    """
+    所有任务共享的异步图片下载器。
+
+    使用一个长连接复用的 httpx.AsyncClient 连接池，分别限制总并发数和单个域名的并发数，
+    响应体以流式方式通过 aiofiles 写入磁盘，不阻塞事件循环。
+    """
+
+    def __init__(self, headers: dict = None, max_concurrency: int = None, per_host_concurrency: int = None,
+                 timeout: float = 20):
+        """
+        Args:
+            headers: 下载请求使用的请求头
+            max_concurrency: 总并发下载数，默认读取环境变量 IMAGE_DOWNLOAD_CONCURRENCY (8)
+            per_host_concurrency: 单个域名的并发下载数，默认读取环境变量 IMAGE_DOWNLOAD_PER_HOST (4)
+            timeout: 单次请求超时时间（秒）
+        """
+        self.headers = headers or {}
+        self.max_concurrency = max_concurrency or int(os.getenv("IMAGE_DOWNLOAD_CONCURRENCY", 8))
+        self.per_host_concurrency = per_host_concurrency or int(os.getenv("IMAGE_DOWNLOAD_PER_HOST", 4))
+        self.timeout = timeout
+        self._client = None
+        self._semaphore = None
+        self._host_semaphores = {}
+
+    def _ensure_client(self):
+        # 在首次使用时（事件循环中）再创建连接池和信号量
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlparse(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(self.per_host_concurrency)
+        return self._host_semaphores[host]
+
+    async def download(self, url: str, save_path: str) -> str:
+        """
+        下载单个文件到 save_path。先写入临时文件，完成后再重命名，避免留下不完整的文件。
+        HTTP 状态码异常时抛出 httpx.HTTPStatusError。
+        """
+        client = self._ensure_client()
+        temp_path = f"{save_path}.part"
+        # 先取单个域名的名额再取全局名额，等待繁忙域名的下载不会占住全局名额而拖慢其他域名
+        async with self._host_semaphore(url), self._semaphore:
+            try:
+                async with client.stream("GET", url) as response:
+                    response.raise_for_status()
+                    async with aiofiles.open(temp_path, "wb") as f:
+                        async for chunk in response.aiter_bytes(chunk_size=65536):
+                            await f.write(chunk)
+                os.replace(temp_path, save_path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+        return save_path
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,115 @@
+import os
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+try:
+    # 可选依赖：安装 pillow-heif 后即可解码 HEIC 图片
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+# 发送给AI前图片预处理的默认参数
+DEFAULT_AI_IMAGE_MAX_EDGE = 1024
+DEFAULT_AI_IMAGE_FORMAT = "jpeg"
+DEFAULT_AI_IMAGE_QUALITY = 80
+
+# 支持的输出格式: 配置名 -> (Pillow 格式名, 文件扩展名)
+AI_IMAGE_FORMATS = {
+    "jpeg": ("JPEG", "jpg"),
+    "webp": ("WEBP", "webp"),
+}
+
+# 大多数多模态模型可以直接接受的图片类型
+MODEL_ACCEPTED_MIME_TYPES = {"image/jpeg", "image/png", "image/webp", "image/gif"}
+
+_pillow_warning_printed = False
+
+
+def guess_image_mime(path: str) -> str:
+    """根据文件头识别图片的实际类型，而不是依赖扩展名。"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(16)
+    except IOError:
+        return "image/jpeg"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG"):
+        return "image/png"
+    if head.startswith(b"GIF8"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in (b"avif", b"avis"):
+            return "image/avif"
+        if brand in (b"heic", b"heix", b"hevc", b"hevx", b"mif1", b"msf1"):
+            return "image/heic"
+    return "image/jpeg"
+
+
+def preprocess_image(path: str, max_edge: int = DEFAULT_AI_IMAGE_MAX_EDGE,
+                     image_format: str = DEFAULT_AI_IMAGE_FORMAT, quality: int = DEFAULT_AI_IMAGE_QUALITY) -> str:
+    """
+    将图片缩放到最长边不超过 max_edge，并以指定格式和质量重新编码。
+
+    结果缓存在原图旁边（如 xxx.ai_1024_q80.jpg），原图未变化时直接复用。
+    Pillow 不可用或处理失败时返回原图路径。
+
+    Returns:
+        应发送给AI的图片路径。
+    """
+    global _pillow_warning_printed
+    if Image is None:
+        if not _pillow_warning_printed:
+            print("   [图片] 警告：未安装 Pillow，将直接发送原图。可运行 pip install Pillow 以启用图片压缩。")
+            _pillow_warning_printed = True
+        return path
+
+    pil_format, extension = AI_IMAGE_FORMATS.get((image_format or "").lower(), AI_IMAGE_FORMATS[DEFAULT_AI_IMAGE_FORMAT])
+    output_path = f"{os.path.splitext(path)[0]}.ai_{max_edge}_q{quality}.{extension}"
+    if not (os.path.exists(output_path) and os.path.getmtime(output_path) >= os.path.getmtime(path)):
+        try:
+            with Image.open(path) as img:
+                img = ImageOps.exif_transpose(img)
+                img.thumbnail((max_edge, max_edge))
+                if img.mode not in ("RGB", "L"):
+                    img = img.convert("RGB")
+                temp_path = f"{output_path}.tmp"
+                img.save(temp_path, pil_format, quality=quality, optimize=True)
+            os.replace(temp_path, output_path)
+        except Exception as e:
+            print(f"   [图片] 预处理图片 {os.path.basename(path)} 失败，将发送原图: {e}")
+            return path
+
+    # 原图的字节数和尺寸都已经足够小、且模型可以直接接受时，保留原图；
+    # 尺寸超过 max_edge 的原图即使文件更小也不保留，否则会按原分辨率计算图片 token
+    if os.path.getsize(path) <= os.path.getsize(output_path) and guess_image_mime(path) in MODEL_ACCEPTED_MIME_TYPES \
+            and _fits_within(path, max_edge):
+        return path
+    return output_path
+
+
+def _fits_within(path: str, max_edge: int) -> bool:
+    """只读取图片头部判断长边是否不超过 max_edge，无法读取时视为不满足。"""
+    try:
+        with Image.open(path) as img:
+            return max(img.size) <= max_edge
+    except Exception:
+        return False
+
+
+def preprocess_images(paths: list, max_edge: int = DEFAULT_AI_IMAGE_MAX_EDGE,
+                      image_format: str = DEFAULT_AI_IMAGE_FORMAT, quality: int = DEFAULT_AI_IMAGE_QUALITY) -> list:
+    """批量预处理图片，返回与输入一一对应的待发送图片路径。"""
+    processed = [preprocess_image(path, max_edge, image_format, quality) for path in paths]
+    original_bytes = sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+    processed_bytes = sum(os.path.getsize(path) for path in processed if os.path.exists(path))
+    if paths:
+        print(f"   [图片] 预处理完成: {len(paths)} 张图片 {original_bytes / 1024:.0f}KB -> {processed_bytes / 1024:.0f}KB")
+    return processed
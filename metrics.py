@@ -0,0 +1,220 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+
+# 爬虫进程定期把指标写入该文件，web_server.py 的 /metrics 接口读取后对外暴露
+METRICS_FILE = os.getenv("SPIDER_METRICS_FILE", os.path.join("logs", "spider_metrics.prom"))
+
+# 阶段耗时直方图的桶（秒）：从毫秒级的保存到分钟级的AI重试
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """按标签组合累加的计数器。"""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Gauge:
+    """按标签组合记录当前值的仪表（如队列长度）。"""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = {}
+
+    def set(self, value: float, *label_values):
+        self.values[label_values] = value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    """按标签组合统计的直方图，输出 Prometheus 的累积桶格式。"""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple, buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        # 标签组合 -> [各个桶的计数..., 总和, 总数]
+        self.values = {}
+
+    def observe(self, value: float, *label_values):
+        state = self.values.get(label_values)
+        if state is None:
+            state = self.values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[i] += 1
+                break
+        state[-2] += value
+        state[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for label_values, state in sorted(self.values.items()):
+            cumulative = 0
+            labels = _format_labels(self.label_names, label_values)
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                bucket_labels = _format_labels(self.label_names, label_values, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            inf_labels = _format_labels(self.label_names, label_values, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf_labels} {state[-1]}")
+            lines.append(f"{self.name}_sum{labels} {round(state[-2], 6)}")
+            lines.append(f"{self.name}_count{labels} {state[-1]}")
+        return lines
+
+
+class StageTimer:
+    """time_stage 返回的计时对象，调用方可以把 outcome 改为 blocked / empty 等更具体的结果。"""
+
+    __slots__ = ("outcome",)
+
+    def __init__(self):
+        self.outcome = "ok"
+
+
+class SpiderMetrics:
+    """
+    爬虫各阶段的耗时和结果统计，以 Prometheus 文本格式导出。
+
+    不依赖 prometheus_client：指标在进程内累加，后台任务每隔 flush_interval 秒把完整快照写入文件。
+    爬虫作为 Web 服务的子进程运行，因此由 web_server.py 的 /metrics 接口读取该文件对外暴露。
+    """
+
+    def __init__(self, path: str = METRICS_FILE, flush_interval: float = None):
+        """
+        Args:
+            path: 指标快照文件路径，默认读取环境变量 SPIDER_METRICS_FILE (logs/spider_metrics.prom)
+            flush_interval: 写入间隔（秒），默认读取 SPIDER_METRICS_FLUSH_INTERVAL (15)
+        """
+        self.path = path
+        self.flush_interval = flush_interval or float(os.getenv("SPIDER_METRICS_FLUSH_INTERVAL", 15))
+        self.stage_seconds = Histogram(
+            "goofish_stage_duration_seconds", "Time spent in each spider stage.", ("task", "stage"))
+        self.stage_total = Counter(
+            "goofish_stage_total", "Spider stage executions by outcome.", ("task", "stage", "outcome"))
+        self.blocks_total = Counter(
+            "goofish_blocks_total", "Anti-bot blocks detected (user_validate, baxia).", ("task", "kind"))
+        self.notification_seconds = Histogram(
+            "goofish_notification_send_seconds", "Webhook send latency per channel.", ("channel", "outcome"),
+            buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+        self.ai_queue_depth = Gauge(
+            "goofish_ai_queue_depth", "AI analysis jobs waiting for a worker, per provider.", ("provider",))
+        self.ai_in_flight = Gauge(
+            "goofish_ai_in_flight", "AI analysis jobs currently running, per provider.", ("provider",))
+        self.ai_queue_wait_seconds = Histogram(
+            "goofish_ai_queue_wait_seconds", "Time AI analysis jobs wait in the worker pool queue.", ("provider",))
+        self.started_at = time.time()
+        self._flush_task = None
+
+    # --- 记录 ---
+
+    @contextmanager
+    def time_stage(self, task: str, stage: str):
+        """
+        统计一个阶段的耗时和结果。代码块抛出异常时结果记为 error，被取消时记为 cancelled。
+
+            with stage_metrics.time_stage(task_name, "detail") as timer:
+                ...
+                timer.outcome = "blocked"
+        """
+        timer = StageTimer()
+        started = time.perf_counter()
+        try:
+            yield timer
+        except asyncio.CancelledError:
+            timer.outcome = "cancelled"
+            raise
+        except Exception:
+            timer.outcome = "error"
+            raise
+        finally:
+            self.stage_seconds.observe(time.perf_counter() - started, task, stage)
+            self.stage_total.inc(task, stage, timer.outcome)
+
+    def record_block(self, task: str, kind: str):
+        self.blocks_total.inc(task, kind)
+
+    def observe_notification(self, channel: str, seconds: float, outcome: str):
+        self.notification_seconds.observe(seconds, channel, outcome)
+
+    # --- 导出 ---
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.stage_seconds, self.stage_total, self.blocks_total, self.notification_seconds,
+                       self.ai_queue_depth, self.ai_in_flight, self.ai_queue_wait_seconds):
+            lines.extend(metric.render())
+        lines += [
+            "# HELP goofish_spider_start_time_seconds Unix time the spider process started.",
+            "# TYPE goofish_spider_start_time_seconds gauge",
+            f"goofish_spider_start_time_seconds {self.started_at:.0f}",
+            "# HELP goofish_metrics_flush_time_seconds Unix time of this metrics snapshot.",
+            "# TYPE goofish_metrics_flush_time_seconds gauge",
+            f"goofish_metrics_flush_time_seconds {time.time():.0f}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self):
+        """把当前快照写入文件（先写临时文件再替换，读取方不会读到写了一半的内容）。"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.render())
+            os.replace(tmp_path, self.path)
+        except IOError as e:
+            print(f"   [警告] 写入指标文件失败: {e}")
+
+    def start(self):
+        """启动定期写入快照的后台任务。"""
+        if not self._flush_task:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """停止后台任务并写入最后一次快照。"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+        self.write()
+
+    async def _flush_loop(self):
+        while True:
+            self.write()
+            await asyncio.sleep(self.flush_interval)
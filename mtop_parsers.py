@@ -0,0 +1,328 @@
+"""
+闲鱼 mtop 接口返回数据的同步解析函数。
+
+字段路径在模块加载时预先编译为 JsonPath 对象，解析时不再为每次字段访问创建协程，
+在包含数百张卡片的评价列表、商品列表上明显更快。spider_v2.py 中保留了同名的 async 包装函数以兼容旧调用。
+新品筛选和详情页字段提取也放在这里，与解析函数一起纳入 benchmarks/run_benchmarks.py 的测量范围。
+本模块不依赖 Playwright 和环境变量，可以被基准测试直接导入。
+"""
+import math
+from datetime import datetime
+
+
+class JsonPath:
+    """预编译的嵌套字段路径，等价于依次执行 data[key]，任一层不存在时返回默认值。"""
+
+    __slots__ = ("keys",)
+
+    def __init__(self, *keys):
+        self.keys = keys
+
+    def get(self, data, default="暂无"):
+        try:
+            for key in self.keys:
+                data = data[key]
+        except (KeyError, TypeError, IndexError):
+            return default
+        return data
+
+
+def get_path(data, *keys, default="暂无"):
+    """安全获取嵌套字典值（同步版本的 safe_get）。"""
+    try:
+        for key in keys:
+            data = data[key]
+    except (KeyError, TypeError, IndexError):
+        return default
+    return data
+
+
+# --- 搜索接口 (mtop.taobao.idlemtopsearch.pc.search) ---
+SEARCH_RESULT_LIST = JsonPath("data", "resultList")
+SEARCH_MAIN = JsonPath("data", "item", "main")
+MAIN_EX_CONTENT = JsonPath("exContent")
+MAIN_CLICK_ARGS = JsonPath("clickParam", "args")
+MAIN_TARGET_URL = JsonPath("targetUrl")
+EX_R1_TAGS = JsonPath("fishTags", "r1", "tagList")
+TAG_CONTENT = JsonPath("data", "content")
+
+# --- 商品详情接口 (mtop.taobao.idle.pc.detail) ---
+DETAIL_ITEM = JsonPath("data", "itemDO")
+DETAIL_SELLER = JsonPath("data", "sellerDO")
+SELLER_ZHIMA_LEVEL = JsonPath("zhimaLevelInfo", "levelName")
+
+# --- 卖家主页头部接口 (mtop.idle.web.user.page.head) ---
+HEAD_MODULE = JsonPath("data", "module")
+MODULE_YLZ_TAGS = JsonPath("base", "ylzTags")
+MODULE_DISPLAY_NAME = JsonPath("base", "displayName")
+MODULE_AVATAR = JsonPath("base", "avatar", "avatar")
+MODULE_INTRODUCTION = JsonPath("base", "introduction")
+MODULE_ITEM_COUNT = JsonPath("tabs", "item", "number")
+MODULE_RATE_COUNT = JsonPath("tabs", "rate", "number")
+TAG_ROLE = JsonPath("attributes", "role")
+TAG_LEVEL = JsonPath("attributes", "level")
+
+# --- 评价列表接口 (mtop.idle.web.trade.rate.list) ---
+CARD_DATA = JsonPath("cardData")
+RATE_ROLE_TEXT = JsonPath("rateTagList", 0, "text")
+
+RATE_TEXTS = {1: "好评", 0: "中评", -1: "差评"}
+ITEM_STATUS_TEXTS = {0: "在售", 1: "已售"}
+
+
+def parse_search_results(json_data: dict) -> list:
+    """解析搜索API的JSON数据，返回基础商品信息列表。"""
+    page_data = []
+    for item in SEARCH_RESULT_LIST.get(json_data, default=[]) or []:
+        main = SEARCH_MAIN.get(item, default={})
+        main_data = MAIN_EX_CONTENT.get(main, default={})
+        click_params = MAIN_CLICK_ARGS.get(main, default={})
+        if not isinstance(main_data, dict):
+            main_data = {}
+        if not isinstance(click_params, dict):
+            click_params = {}
+
+        price_parts = main_data.get("price", [])
+        if isinstance(price_parts, list):
+            price = "".join([str(p.get("text", "")) for p in price_parts if isinstance(p, dict)]).replace("当前价", "").strip()
+        else:
+            price = "价格异常"
+        if "万" in price:
+            price = f"¥{float(price.replace('¥', '').replace('万', '')) * 10000:.0f}"
+
+        tags = []
+        if click_params.get("tag") == "freeship":
+            tags.append("包邮")
+        for tag_item in EX_R1_TAGS.get(main_data, default=[]) or []:
+            if "验货宝" in TAG_CONTENT.get(tag_item, default=""):
+                tags.append("验货宝")
+
+        pub_time_ts = click_params.get("publishTime", "")
+        raw_link = MAIN_TARGET_URL.get(main, default="")
+        page_data.append({
+            "商品标题": main_data.get("title", "未知标题"),
+            "当前售价": price,
+            "商品原价": main_data.get("oriPrice", "暂无"),
+            "“想要”人数": click_params.get("wantNum", 'NaN'),
+            "商品标签": tags,
+            "发货地区": main_data.get("area", "地区未知"),
+            "卖家昵称": main_data.get("userNickName", "匿名卖家"),
+            "商品链接": raw_link.replace("fleamarket://", "https://www.goofish.com/"),
+            "发布时间": datetime.fromtimestamp(int(pub_time_ts) / 1000).strftime("%Y-%m-%d %H:%M") if pub_time_ts.isdigit() else "未知时间",
+            "商品ID": main_data.get("itemId", "未知ID"),
+            "商品主图链接": main_data.get("picUrl", "")
+        })
+    return page_data
+
+
+def is_new_product(pub_time_str: str, time_window_seconds: int = 3600) -> bool:
+    """
+    判断商品是否为新发布的商品。
+
+    Args:
+        pub_time_str: 商品发布时间字符串，格式如 "2024-01-15 14:30"
+        time_window_seconds: 时间窗口（秒），默认1小时
+
+    Returns:
+        bool: 如果是新商品返回True，否则返回False
+    """
+    try:
+        # 解析发布时间
+        pub_time = datetime.strptime(pub_time_str, "%Y-%m-%d %H:%M")
+        current_time = datetime.now()
+
+        # 计算时间差
+        time_diff = (current_time - pub_time).total_seconds()
+
+        # 如果时间差在窗口内，认为是新商品
+        return 0 <= time_diff <= time_window_seconds
+    except (ValueError, TypeError):
+        # 如果时间解析失败，保守地认为不是新商品
+        return False
+
+
+def filter_new_products(products: list, time_window_seconds: int = 3600, processed_ids: set = None) -> list:
+    """
+    从商品列表中筛选出新发布的商品。
+
+    Args:
+        products: 商品信息列表
+        time_window_seconds: 时间窗口（秒）
+        processed_ids: 已处理的商品ID集合，用于去重
+
+    Returns:
+        list: 新商品列表
+    """
+    if processed_ids is None:
+        processed_ids = set()
+
+    new_products = []
+    for product in products:
+        product_id = product.get('商品ID', '')
+        pub_time = product.get('发布时间', '')
+
+        # 检查是否已处理过
+        if product_id in processed_ids:
+            continue
+
+        # 检查是否为新商品
+        if is_new_product(pub_time, time_window_seconds):
+            new_products.append(product)
+            processed_ids.add(product_id)
+
+    return new_products
+
+
+def format_registration_days(total_days: int) -> str:
+    """
+    将总天数格式化为“X年Y个月”的字符串。
+    """
+    if not isinstance(total_days, int) or total_days <= 0:
+        return '未知'
+
+    # 使用更精确的平均天数
+    DAYS_IN_YEAR = 365.25
+    DAYS_IN_MONTH = DAYS_IN_YEAR / 12  # 大约 30.44
+
+    # 计算年数
+    years = math.floor(total_days / DAYS_IN_YEAR)
+
+    # 计算剩余天数
+    remaining_days = total_days - (years * DAYS_IN_YEAR)
+
+    # 计算月数，四舍五入
+    months = round(remaining_days / DAYS_IN_MONTH)
+
+    # 处理进位：如果月数等于12，则年数加1，月数归零
+    if months == 12:
+        years += 1
+        months = 0
+
+    # 构建最终的输出字符串
+    if years > 0 and months > 0:
+        return f"来闲鱼{years}年{months}个月"
+    elif years > 0 and months == 0:
+        return f"来闲鱼{years}年整"
+    elif years == 0 and months > 0:
+        return f"来闲鱼{months}个月"
+    else: # years == 0 and months == 0
+        return "来闲鱼不足一个月"
+
+
+def parse_item_detail(detail_json: dict, item_data: dict) -> dict:
+    """
+    解析商品详情API的JSON数据：把完整图片列表、想要人数、浏览量补充到 item_data 中，
+    并返回卖家相关信息 {"seller_id", "zhima_credit_text", "registration_duration_text"}。
+    """
+    item_do = DETAIL_ITEM.get(detail_json, default={})
+    seller_do = DETAIL_SELLER.get(detail_json, default={})
+
+    # 提取该商品的完整图片列表
+    image_infos = get_path(item_do, 'imageInfos', default=[])
+    if image_infos:
+        all_image_urls = [img.get('url') for img in image_infos if img.get('url')]
+        if all_image_urls:
+            # 用新的字段存储图片列表，替换掉旧的单个链接
+            item_data['商品图片列表'] = all_image_urls
+            # (可选) 仍然保留主图链接，以防万一
+            item_data['商品主图链接'] = all_image_urls[0]
+
+    item_data['“想要”人数'] = get_path(item_do, 'wantCnt', default=item_data.get('“想要”人数', 'NaN'))
+    item_data['浏览量'] = get_path(item_do, 'browseCnt', default='-')
+    # ...[此处可添加更多从详情页解析出的商品信息]...
+
+    return {
+        "seller_id": get_path(seller_do, 'sellerId', default=None),
+        "zhima_credit_text": SELLER_ZHIMA_LEVEL.get(seller_do),
+        "registration_duration_text": format_registration_days(get_path(seller_do, 'userRegDay', default=0)),
+    }
+
+
+def parse_user_head(head_json: dict) -> dict:
+    """解析用户头部API的JSON数据。"""
+    module = HEAD_MODULE.get(head_json, default={})
+    seller_credit, buyer_credit = {}, {}
+    for tag in MODULE_YLZ_TAGS.get(module, default=[]):
+        role = TAG_ROLE.get(tag)
+        if role == 'seller':
+            seller_credit = {'level': TAG_LEVEL.get(tag), 'text': tag.get('text')}
+        elif role == 'buyer':
+            buyer_credit = {'level': TAG_LEVEL.get(tag), 'text': tag.get('text')}
+    return {
+        "卖家昵称": MODULE_DISPLAY_NAME.get(module),
+        "卖家头像链接": MODULE_AVATAR.get(module),
+        "卖家个性签名": MODULE_INTRODUCTION.get(module, default=''),
+        "卖家在售/已售商品数": MODULE_ITEM_COUNT.get(module),
+        "卖家收到的评价总数": MODULE_RATE_COUNT.get(module),
+        "卖家信用等级": seller_credit.get('text', '暂无'),
+        "买家信用等级": buyer_credit.get('text', '暂无')
+    }
+
+
+def parse_ratings(ratings_json: list) -> list:
+    """解析评价列表API的JSON数据。"""
+    parsed_list = []
+    for card in ratings_json:
+        data = CARD_DATA.get(card, default={})
+        parsed_list.append({
+            "评价ID": data.get('rateId'),
+            "评价内容": data.get('feedback'),
+            "评价类型": RATE_TEXTS.get(data.get('rate', "暂无"), "未知"),
+            "评价来源角色": RATE_ROLE_TEXT.get(data, default='未知角色'),
+            "评价者昵称": data.get('raterUserNick'),
+            "评价时间": data.get('gmtCreate'),
+            "评价图片": data.get('pictCdnUrlList', [])
+        })
+    return parsed_list
+
+
+def calculate_reputation(ratings_json: list, base_counts: dict = None) -> dict:
+    """
+    从原始评价API数据列表中，计算作为卖家和买家的好评数与好评率。
+
+    传入 base_counts（已有计数）时，只把新评价的计数累加上去。
+    """
+    base_counts = base_counts or {}
+    seller_total = base_counts.get("seller_total", 0)
+    seller_positive = base_counts.get("seller_positive", 0)
+    buyer_total = base_counts.get("buyer_total", 0)
+    buyer_positive = base_counts.get("buyer_positive", 0)
+
+    for card in ratings_json:
+        data = CARD_DATA.get(card, default={})
+        role_tag = RATE_ROLE_TEXT.get(data, default='')
+        positive = data.get('rate') == 1  # 1=好评, 0=中评, -1=差评
+        if "卖家" in role_tag:
+            seller_total += 1
+            seller_positive += positive
+        elif "买家" in role_tag:
+            buyer_total += 1
+            buyer_positive += positive
+
+    seller_rate = f"{(seller_positive / seller_total * 100):.2f}%" if seller_total > 0 else "N/A"
+    buyer_rate = f"{(buyer_positive / buyer_total * 100):.2f}%" if buyer_total > 0 else "N/A"
+    return {
+        "作为卖家的好评数": f"{seller_positive}/{seller_total}",
+        "作为卖家的好评率": seller_rate,
+        "作为买家的好评数": f"{buyer_positive}/{buyer_total}",
+        "作为买家的好评率": buyer_rate
+    }
+
+
+def parse_user_items(items_json: list) -> list:
+    """解析用户主页的商品列表API的JSON数据。"""
+    parsed_list = []
+    for card in items_json:
+        data = card.get('cardData', {})
+        status_code = data.get('itemStatus')
+        status_text = ITEM_STATUS_TEXTS.get(status_code)
+        if status_text is None:
+            status_text = f"未知状态 ({status_code})"
+        parsed_list.append({
+            "商品ID": data.get('id'),
+            "商品标题": data.get('title'),
+            "商品价格": data.get('priceInfo', {}).get('price'),
+            "商品主图": data.get('picInfo', {}).get('picUrl'),
+            "商品状态": status_text
+        })
+    return parsed_list
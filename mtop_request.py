@@ -0,0 +1,98 @@
+import hashlib
+import json
+import time
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+# 存放 mtop 签名 token 的 Cookie，值形如 "<token>_<过期时间>"
+MTOP_TOKEN_COOKIE = "_m_h5_tk"
+
+
+def sign_mtop(token: str, timestamp: str, app_key: str, data: str) -> str:
+    """计算 h5 mtop 请求的签名: md5(token&t&appKey&data)。"""
+    return hashlib.md5(f"{token}&{timestamp}&{app_key}&{data}".encode("utf-8")).hexdigest()
+
+
+def build_search_data(template: str = None, keyword: str = None, page_number: int = 1, sort_newest: bool = True,
+                      personal_only: bool = False, min_price: str = None, max_price: str = None) -> str:
+    """
+    构建 idlemtopsearch 搜索请求的 data 字段，直接带上排序和筛选条件，代替逐个点击页面上的筛选控件。
+
+    Args:
+        template: 页面自身发出的搜索请求中的 data（JSON 字符串），保留其中的其他字段
+        keyword: 搜索关键词
+        page_number: 页码，从 1 开始
+        sort_newest: 是否按发布时间从新到旧排序（对应页面上的 新发布 -> 最新）
+        personal_only: 是否只看个人闲置
+        min_price: 最低价格
+        max_price: 最高价格
+
+    Returns:
+        JSON 字符串，可直接作为 replay_mtop_request 的 data 参数。
+    """
+    data = json.loads(template) if template else {}
+    data.update({"pageNumber": page_number, "fromFilter": True})
+    if keyword:
+        data["keyword"] = keyword
+    if sort_newest:
+        data["sortField"] = "create"
+        data["sortValue"] = "desc"
+    search_filter = ""
+    if min_price or max_price:
+        search_filter += f"priceRange:{min_price or 0},{max_price or ''};"
+    if personal_only:
+        search_filter += "quickFilter:filterPersonal;"
+    if search_filter:
+        data["propValueStr"] = {"searchFilter": search_filter}
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def is_mtop_success(payload: dict) -> bool:
+    """mtop 响应的 ret 字段以 SUCCESS 开头时表示调用成功。"""
+    ret = (payload or {}).get("ret") or []
+    return any(str(code).startswith("SUCCESS") for code in ret)
+
+
+def _single_values(query: str) -> dict:
+    return {key: values[0] for key, values in parse_qs(query or "", keep_blank_values=True).items()}
+
+
+def request_data(request) -> str:
+    """取出已捕获 mtop 请求的 data 字段（JSON 字符串）。"""
+    return _single_values(request.post_data).get("data")
+
+
+async def replay_mtop_request(page, request, data: str = None):
+    """
+    使用页面所在浏览器上下文的 Cookie，对一个已捕获的 mtop 请求重新签名后重放。
+
+    请求通过 page.request 发出，与页面共享 Cookie，服务端下发的新 token 也会写回上下文。
+
+    Args:
+        page: 发起原请求的页面
+        request: 捕获到的原始 Playwright Request
+        data: 替换请求体中的 data 字段（JSON 字符串），默认沿用原请求
+
+    Returns:
+        解析后的响应 JSON；缺少 token 或 HTTP 状态异常时返回 None。调用方需用 is_mtop_success 判断业务是否成功。
+    """
+    cookies = await page.context.cookies(request.url)
+    token_value = next((c["value"] for c in cookies if c["name"] == MTOP_TOKEN_COOKIE), None)
+    if not token_value:
+        return None
+
+    parsed = urlparse(request.url)
+    params = _single_values(parsed.query)
+    form = _single_values(request.post_data)
+    if data is not None:
+        form["data"] = data
+
+    timestamp = str(int(time.time() * 1000))
+    params["t"] = timestamp
+    params["sign"] = sign_mtop(token_value.split("_")[0], timestamp, params.get("appKey", ""), form.get("data", ""))
+    url = urlunparse(parsed._replace(query=urlencode(params)))
+
+    headers = {k: v for k, v in request.headers.items() if k.lower() in ("accept", "referer", "origin", "user-agent")}
+    response = await page.request.post(url, form=form, headers=headers)
+    if not response.ok:
+        return None
+    return await response.json()
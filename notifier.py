@@ -0,0 +1,273 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+
+import httpx
+
+# 发送失败的通知会写入该文件，程序重启后继续重试
+NOTIFICATION_OUTBOX_FILE = os.getenv("NOTIFICATION_OUTBOX_FILE", os.path.join("cache", "notification_outbox.json"))
+
+# 后台重试循环检查发件箱的间隔（秒）
+OUTBOX_RETRY_INTERVAL = 5
+
+# 各渠道单个 webhook 的发送频率上限: 渠道 -> (窗口内最多消息数, 窗口长度秒)
+# 钉钉自定义机器人限制每个 webhook 每分钟最多 20 条消息，超出后会被限流 10 分钟
+CHANNEL_RATE_LIMITS = {
+    "dingtalk": (int(os.getenv("DINGTALK_RATE_LIMIT", 20)), 60),
+}
+
+
+class NotificationDispatcher:
+    """
+    后台通知分发器。
+
+    爬取和监控流程只需调用 submit() 把通知放入队列即可立即返回，不再等待 webhook 响应。
+    每个通知渠道有独立的队列和 worker，某个渠道的 webhook 响应缓慢或超时不会拖慢其他渠道；
+    每个渠道维护一个长连接的 httpx.AsyncClient；发送失败的通知写入磁盘上的
+    发件箱 (outbox)，按指数退避重试，程序重启后也会继续重试。
+    有频率限制的渠道（见 CHANNEL_RATE_LIMITS）会记录每个 webhook 的发送时间，超出额度的通知
+    顺延到后续的空闲时段发送，而不是撞上限流后失败。
+    """
+
+    def __init__(self, outbox_file: str = NOTIFICATION_OUTBOX_FILE, max_attempts: int = None,
+                 base_backoff: float = 10, max_backoff: float = 600, timeout: float = 10, metrics=None,
+                 dry_run: bool = False):
+        """
+        Args:
+            outbox_file: 发件箱文件路径
+            max_attempts: 单条通知最多尝试次数，默认读取环境变量 NOTIFICATION_MAX_ATTEMPTS (8)
+            base_backoff: 首次重试的等待时间（秒），之后每次翻倍
+            max_backoff: 重试等待时间上限（秒）
+            timeout: 单次请求超时时间（秒）
+            metrics: 可选的 SpiderMetrics，用于记录每次发送的耗时和结果
+            dry_run: 只打印通知内容而不实际发送（回放模式使用）
+        """
+        self.outbox_file = outbox_file
+        self.max_attempts = max_attempts or int(os.getenv("NOTIFICATION_MAX_ATTEMPTS", 8))
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.metrics = metrics
+        self.dry_run = dry_run
+        self.sent_count = 0
+        self.failed_count = 0
+        self.deferred_count = 0
+
+        self._started = False
+        self._queues = {}
+        self._workers = {}
+        self._clients = {}
+        self._outbox = []
+        self._sent_times = {}
+        self._retry_task = None
+
+    # --- 生命周期 ---
+
+    def start(self):
+        """启动后台 worker，并加载上次未发送成功的通知。"""
+        if self._started:
+            return
+        self._started = True
+        self._outbox = self._load_outbox()
+        if self._outbox:
+            print(f"LOG: 通知发件箱中有 {len(self._outbox)} 条未发送成功的通知，将在后台继续重试。")
+        self._retry_task = asyncio.create_task(self._retry_loop())
+
+    async def close(self, timeout: float = 15):
+        """等待队列中的通知发送完毕（最多 timeout 秒），剩余通知写入发件箱后关闭连接。"""
+        if not self._started:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(q.join() for q in self._queues.values())), timeout=timeout)
+        except asyncio.TimeoutError:
+            print("   [通知] 等待通知发送超时，剩余通知将保存到发件箱。")
+        tasks = [self._retry_task, *self._workers.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._retry_task = None
+        for queue in self._queues.values():
+            while not queue.empty():
+                self._outbox.append(queue.get_nowait())
+        self._queues, self._workers, self._started = {}, {}, False
+        self._save_outbox()
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients = {}
+
+    # --- 对外接口 ---
+
+    def submit(self, channel: str, url: str, json_body: dict = None, data: bytes = None, headers: dict = None):
+        """
+        提交一条通知，立即返回。
+
+        Args:
+            channel: 渠道名 (ntfy / wecom / dingtalk)，每个渠道复用一个长连接客户端
+            url: 发送地址
+            json_body: 以 JSON 方式发送的请求体
+            data: 以原始字节方式发送的请求体（与 json_body 二选一）
+            headers: 附加请求头
+        """
+        message = {
+            "id": uuid.uuid4().hex,
+            "channel": channel,
+            "url": url,
+            "json": json_body,
+            "data": data.decode("utf-8") if isinstance(data, bytes) else data,
+            "headers": {k: (v.decode("utf-8") if isinstance(v, bytes) else v) for k, v in (headers or {}).items()},
+            "attempts": 0,
+            "next_attempt_at": 0,
+        }
+        if not self._started:
+            # 分发器未启动时（例如单独调用发送函数），直接放入发件箱等待下次启动后发送
+            print("   [通知] 警告：通知分发器尚未启动，通知已保存到发件箱。")
+            self._outbox.append(message)
+            self._save_outbox()
+            return
+        self._enqueue(message)
+
+    def stats(self) -> dict:
+        return {
+            "queued": sum(queue.qsize() for queue in self._queues.values()),
+            "outbox": len(self._outbox),
+            "sent": self.sent_count,
+            "failed": self.failed_count,
+            "deferred": self.deferred_count,
+        }
+
+    # --- 内部实现 ---
+
+    def _client(self, channel: str) -> httpx.AsyncClient:
+        if channel not in self._clients:
+            self._clients[channel] = httpx.AsyncClient(timeout=self.timeout)
+        return self._clients[channel]
+
+    async def _send(self, message: dict):
+        """发送一条通知，HTTP 错误或机器人返回错误码时抛出异常。"""
+        if self.dry_run:
+            body = message.get("json") if message.get("json") is not None else message.get("data")
+            print(f"   -> [通知] (回放模式，未发送) {message['channel']}: {str(body)[:200]}")
+            return
+        client = self._client(message["channel"])
+        # 请求头中可能包含中文（如 ntfy 的 Title），统一按 utf-8 编码为字节
+        headers = {k: str(v).encode("utf-8") for k, v in message["headers"].items()}
+        if message.get("json") is not None:
+            response = await client.post(message["url"], json=message["json"], headers=headers)
+        else:
+            response = await client.post(message["url"], content=(message.get("data") or "").encode("utf-8"),
+                                         headers=headers)
+        response.raise_for_status()
+        if message["channel"] in ("dingtalk", "wecom"):
+            result = response.json()
+            if result.get("errcode", 0) != 0:
+                raise Exception(f"{message['channel']} API返回错误: {result}")
+
+    def _rate_limit_delay(self, message: dict) -> float:
+        """
+        检查该 webhook 在当前窗口内是否还有发送额度。
+        有额度时记录本次发送并返回 0，否则返回需要等待的秒数。
+        """
+        if message["channel"] not in CHANNEL_RATE_LIMITS:
+            return 0
+        limit, window = CHANNEL_RATE_LIMITS[message["channel"]]
+        sent_times = self._sent_times.setdefault(message["url"], deque())
+        now = time.time()
+        while sent_times and now - sent_times[0] >= window:
+            sent_times.popleft()
+        if len(sent_times) >= limit:
+            return sent_times[0] + window - now
+        sent_times.append(now)
+        return 0
+
+    async def _attempt(self, message: dict) -> bool:
+        """尝试发送一次，失败时计算下次重试时间。返回是否发送成功。"""
+        delay = self._rate_limit_delay(message)
+        if delay > 0:
+            # 超出频率额度：顺延到下一个空闲时段，不计入失败次数
+            message["next_attempt_at"] = time.time() + delay
+            self.deferred_count += 1
+            print(f"   -> [通知] {message['channel']} 已达到发送频率上限，通知将在 {delay:.0f} 秒后发送。")
+            return False
+        message["attempts"] += 1
+        started = time.perf_counter()
+        try:
+            await self._send(message)
+            self.sent_count += 1
+            if self.metrics:
+                self.metrics.observe_notification(message["channel"], time.perf_counter() - started, "ok")
+            print(f"   -> [通知] {message['channel']} 通知发送成功。")
+            return True
+        except Exception as e:
+            if self.metrics:
+                self.metrics.observe_notification(message["channel"], time.perf_counter() - started, "error")
+            backoff = min(self.base_backoff * (2 ** (message["attempts"] - 1)), self.max_backoff)
+            message["next_attempt_at"] = time.time() + backoff
+            print(f"   -> [通知] {message['channel']} 通知第 {message['attempts']}/{self.max_attempts} 次发送失败: "
+                  f"{type(e).__name__} - {e}")
+            return False
+
+    def _enqueue(self, message: dict):
+        """放入该渠道的队列，渠道的队列和 worker 在第一次使用时创建。"""
+        channel = message["channel"]
+        if channel not in self._queues:
+            self._queues[channel] = asyncio.Queue()
+            self._workers[channel] = asyncio.create_task(self._worker(channel))
+        self._queues[channel].put_nowait(message)
+
+    async def _worker(self, channel: str):
+        queue = self._queues[channel]
+        while True:
+            message = await queue.get()
+            try:
+                if not await self._attempt(message):
+                    self._park(message)
+            except asyncio.CancelledError:
+                # 关闭时正在发送的通知保存到发件箱，下次启动后继续发送
+                self._outbox.append(message)
+                raise
+            finally:
+                queue.task_done()
+
+    def _park(self, message: dict):
+        """把发送失败或被顺延的通知放入发件箱，超过最大尝试次数的直接丢弃。"""
+        if message["attempts"] >= self.max_attempts:
+            self.failed_count += 1
+            print(f"   -> [通知] {message['channel']} 通知在 {message['attempts']} 次尝试后彻底失败，已丢弃。")
+        else:
+            self._outbox.append(message)
+        self._save_outbox()
+
+    async def _retry_loop(self):
+        """定期把发件箱中已到重试时间的通知放回各自渠道的队列，由渠道 worker 重试。"""
+        while True:
+            await asyncio.sleep(OUTBOX_RETRY_INTERVAL)
+            now = time.time()
+            due = [m for m in self._outbox if m["next_attempt_at"] <= now]
+            for message in due:
+                self._outbox.remove(message)
+                self._enqueue(message)
+
+    def _load_outbox(self) -> list:
+        if not os.path.exists(self.outbox_file):
+            return []
+        try:
+            with open(self.outbox_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            print(f"   [警告] 读取通知发件箱失败，已忽略: {e}")
+            return []
+
+    def _save_outbox(self):
+        directory = os.path.dirname(self.outbox_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.outbox_file}.tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self._outbox, f, ensure_ascii=False)
+            os.replace(temp_path, self.outbox_file)
+        except IOError as e:
+            print(f"   [警告] 写入通知发件箱失败: {e}")
@@ -0,0 +1,101 @@
+import asyncio
+from typing import Awaitable, Callable, List, Optional
+
+
+class Stage:
+    """流水线中的一个处理阶段。"""
+
+    def __init__(self, name: str, handler: Callable[[dict], Awaitable[Optional[dict]]], workers: int = 1,
+                 key: str = None):
+        """
+        Args:
+            name: 阶段名称，用于日志输出
+            handler: 处理函数，接收上一阶段产出的作业字典；返回 None 表示该作业在此阶段终止
+            workers: 该阶段的并发 worker 数量
+            key: 阶段的英文标识，用作追踪记录中的 span 名称，默认与 name 相同
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, int(workers or 1))
+        self.key = key or name
+
+
+class StagedPipeline:
+    """
+    由有界队列串联起来的多阶段异步流水线。
+
+    每个阶段拥有独立的队列和 worker 数量，前一阶段的输出会被放入下一阶段的队列，
+    队列有界，下游处理不过来时上游会自然地被阻塞（背压）。
+
+    作业字典中带有 "trace" (tracing.ItemTrace) 时，每个阶段的处理会记录为一个子 span；
+    作业离开流水线（走完所有阶段、在某个阶段终止或出错）时调用 on_job_done(job, outcome)。
+    """
+
+    def __init__(self, stages: List[Stage], queue_size: int = 4,
+                 on_job_done: Callable[[dict, str], None] = None):
+        self.stages = stages
+        self.queues = [asyncio.Queue(maxsize=max(1, queue_size)) for _ in stages]
+        self.on_job_done = on_job_done
+        self._workers = []
+
+    def start(self):
+        """为每个阶段启动对应数量的 worker。"""
+        for index, stage in enumerate(self.stages):
+            for _ in range(stage.workers):
+                self._workers.append(asyncio.create_task(self._worker(index)))
+
+    async def put(self, job: dict):
+        """向第一个阶段提交一个作业，队列已满时等待。"""
+        await self.queues[0].put(job)
+
+    async def _worker(self, index: int):
+        stage = self.stages[index]
+        queue = self.queues[index]
+        next_queue = self.queues[index + 1] if index + 1 < len(self.queues) else None
+        while True:
+            job = await queue.get()
+            outcome = None
+            try:
+                trace = job.get("trace")
+                if trace is not None:
+                    with trace.span(stage.key) as span:
+                        result = await stage.handler(job)
+                        if result is None and next_queue is not None:
+                            span["outcome"] = "dropped"
+                else:
+                    result = await stage.handler(job)
+                # 最后一个阶段没有下游，处理完即视为完成
+                if next_queue is None:
+                    outcome = "completed"
+                elif result is None:
+                    outcome = f"dropped:{stage.key}"
+                else:
+                    await next_queue.put(result)
+            except Exception as e:
+                outcome = f"error:{stage.key}"
+                print(f"   [流水线] 阶段 '{stage.name}' 处理作业时发生错误，已丢弃该作业: {type(e).__name__} - {e}")
+            finally:
+                queue.task_done()
+            if outcome and self.on_job_done:
+                try:
+                    self.on_job_done(job, outcome)
+                except Exception as e:
+                    print(f"   [流水线] 作业结束回调出错: {type(e).__name__} - {e}")
+
+    async def join_stage(self, index: int):
+        """等待指定阶段队列中的作业全部处理完毕（不等待下游阶段）。"""
+        await self.queues[index].join()
+
+    async def join(self):
+        """按阶段顺序等待所有已提交的作业处理完毕。"""
+        for queue in self.queues:
+            await queue.join()
+
+    async def close(self, drain: bool = True):
+        """停止流水线。drain 为 True 时先等待所有作业处理完毕。"""
+        if drain:
+            await self.join()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
@@ -0,0 +1,104 @@
+import math
+import time
+from datetime import datetime
+
+# 商品发布时间的格式，与 is_new_product 保持一致
+PUBLISH_TIME_FORMAT = "%Y-%m-%d %H:%M"
+
+
+class AdaptivePollScheduler:
+    """
+    新品监控的自适应轮询调度器。
+
+    根据搜索结果中商品的 `发布时间` 估算关键词的新品到达速率：新品越频繁，轮询间隔越短；
+    连续多轮没有新品时逐步退避。间隔通常限制在 [min_interval, max_interval] 之间，
+    但轮询额度不足时总会等到额度积累完成，即使这超过 max_interval。
+
+    请求预算与固定间隔保持一致：调度器以 base_interval 为速率积累轮询额度（最多积累
+    burst_seconds 时长的额度），每次轮询消耗一个额度。空闲时段省下的额度留给繁忙时段使用，
+    因此长期平均请求频率不会超过原来的固定间隔。
+    """
+
+    def __init__(self, base_interval: int, min_interval: int = None, max_interval: int = None,
+                 rate_window: int = 7200, burst_seconds: int = 3600, target_items_per_poll: float = 1.0,
+                 backoff_factor: float = 1.5):
+        """
+        Args:
+            base_interval: 原固定轮询间隔（秒），决定总请求预算
+            min_interval: 最短轮询间隔（秒），默认 60
+            max_interval: 最长轮询间隔（秒），默认 base_interval 的 4 倍
+            rate_window: 估算到达速率时参考的最近时间范围（秒）
+            burst_seconds: 最多积累多长时间的轮询额度（秒）
+            target_items_per_poll: 期望每次轮询平均发现的新品数
+            backoff_factor: 连续无新品时每轮间隔的放大倍数
+        """
+        self.base_interval = base_interval
+        self.min_interval = min_interval or min(60, base_interval)
+        self.max_interval = max(max_interval or base_interval * 4, self.min_interval)
+        self.rate_window = rate_window
+        self.target_items_per_poll = target_items_per_poll
+        self.backoff_factor = backoff_factor
+
+        self.capacity = max(1.0, burst_seconds / base_interval)
+        self.tokens = 1.0
+        self.last_refill = time.time()
+        self.empty_polls = 0
+        self.arrivals = {}  # 商品ID -> 发布时间戳
+
+    def _refill(self):
+        now = time.time()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) / self.base_interval)
+        self.last_refill = now
+
+    def record_poll(self, products: list, new_count: int):
+        """
+        记录一次轮询的结果。
+
+        Args:
+            products: 本轮解析到的全部商品（包括已处理过的），用于估算到达速率
+            new_count: 本轮发现的新商品数
+        """
+        self._refill()
+        self.tokens -= 1
+        self.empty_polls = 0 if new_count else self.empty_polls + 1
+
+        now = time.time()
+        for product in products:
+            product_id = product.get('商品ID')
+            if not product_id or product_id in self.arrivals:
+                continue
+            try:
+                published_at = datetime.strptime(product.get('发布时间', ''), PUBLISH_TIME_FORMAT).timestamp()
+            except (ValueError, TypeError):
+                continue
+            if now - self.rate_window <= published_at <= now + 60:
+                self.arrivals[product_id] = published_at
+        self.arrivals = {pid: ts for pid, ts in self.arrivals.items() if now - ts <= self.rate_window}
+
+    def arrival_rate(self) -> float:
+        """估算的新品到达速率（个/秒）。"""
+        if not self.arrivals:
+            return 0.0
+        # 搜索结果只有一页，繁忙关键词的全部结果可能只覆盖很短的时间，因此用最早一条的时间作为观测起点
+        span = max(time.time() - min(self.arrivals.values()), 60)
+        return len(self.arrivals) / span
+
+    def next_interval(self) -> int:
+        """计算距离下次轮询应等待的秒数。"""
+        self._refill()
+        rate = self.arrival_rate()
+        if rate > 0:
+            desired = self.target_items_per_poll / rate
+        else:
+            desired = self.base_interval
+        # 连续没有新品时逐步退避
+        desired *= self.backoff_factor ** self.empty_polls
+        desired = min(max(desired, self.min_interval), self.max_interval)
+        # 额度不足时至少等到下一个额度积累完成；该等待在区间限制之后应用，max_interval 不能缩短它
+        if self.tokens < 1:
+            desired = max(desired, (1 - self.tokens) * self.base_interval)
+        return int(math.ceil(desired))
+
+    def describe(self) -> str:
+        rate = self.arrival_rate()
+        return f"估算新品速率 {rate * 3600:.1f} 个/小时，剩余轮询额度 {self.tokens:.1f}，连续无新品 {self.empty_polls} 轮"
@@ -0,0 +1,129 @@
+import asyncio
+import math
+import os
+import random
+import time
+from collections import deque
+
+# 各类接口的默认请求预算: 类别 -> (每分钟请求数, 突发容量, 典型浏览停顿秒数)
+# 预算是账号级别的，所有任务共享；停顿时间模拟用户在两次请求之间浏览页面的时间。
+DEFAULT_PACER_BUDGETS = {
+    "search": (4, 2, 4),
+    "detail": (3, 2, 5),
+    "profile": (2, 1, 4),
+}
+
+# 统计利用率时参考的时间范围（秒）
+UTILIZATION_WINDOW = 600
+
+
+class _Bucket:
+    def __init__(self, name: str, per_minute: float, burst: float, think_time: float):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, burst)
+        self.think_time = think_time
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.lock = asyncio.Lock()
+        self.granted = deque()  # 最近发放额度的时间，用于计算利用率
+        self.total_granted = 0
+        self.total_wait = 0.0
+        self.waiting = 0
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+
+class RequestPacer:
+    """
+    账号级的请求节奏控制器。
+
+    每类接口（搜索、详情、卖家主页）各有一个令牌桶，所有任务从同一个桶中借用请求额度，
+    同时运行的任务越多，单个任务分到的请求越少，对闲鱼的总请求频率保持不变；只有少数任务运行时
+    则可以用满预算。在令牌桶之外叠加对数正态分布的浏览停顿，并偶尔插入较长的休息，使请求间隔
+    更接近真实用户。
+
+    预算可通过环境变量 PACER_SEARCH_RPM / PACER_DETAIL_RPM / PACER_PROFILE_RPM 配置（每分钟请求数）。
+    """
+
+    def __init__(self, budgets: dict = None):
+        """
+        Args:
+            budgets: {类别: (每分钟请求数, 突发容量, 典型浏览停顿秒数)}，默认使用 DEFAULT_PACER_BUDGETS
+                     并读取环境变量覆盖每分钟请求数
+        """
+        if budgets is None:
+            budgets = {
+                name: (float(os.getenv(f"PACER_{name.upper()}_RPM", per_minute)), burst, think_time)
+                for name, (per_minute, burst, think_time) in DEFAULT_PACER_BUDGETS.items()
+            }
+        self._buckets = {name: _Bucket(name, *budget) for name, budget in budgets.items()}
+        self._last_report = time.monotonic()
+
+    @staticmethod
+    def _human_delay(think_time: float) -> float:
+        """对数正态分布的浏览停顿：大多数间隔接近 think_time，少数明显更长，偶尔长时间停留。"""
+        delay = random.lognormvariate(math.log(think_time), 0.5)
+        if random.random() < 0.05:
+            delay += random.uniform(3, 6) * think_time
+        return delay
+
+    async def acquire(self, endpoint: str):
+        """
+        为一次请求借用额度，必要时等待。同一类别的等待者按先后顺序获得额度。
+
+        Args:
+            endpoint: 接口类别 (search / detail / profile)
+        """
+        bucket = self._buckets[endpoint]
+        started = time.monotonic()
+        bucket.waiting += 1
+        try:
+            async with bucket.lock:
+                bucket.refill()
+                wait = (1 - bucket.tokens) / bucket.rate if bucket.tokens < 1 else 0
+                delay = max(wait, self._human_delay(bucket.think_time))
+                print(f"   [节奏] {endpoint} 请求等待 {delay:.2f} 秒... (排队 {bucket.waiting - 1} 个)")
+                await asyncio.sleep(delay)
+                bucket.refill()
+                bucket.tokens -= 1
+                now = time.monotonic()
+                bucket.granted.append(now)
+                bucket.total_granted += 1
+                bucket.total_wait += now - started
+        finally:
+            bucket.waiting -= 1
+
+    def stats(self) -> dict:
+        """返回各类接口的预算利用率（最近 UTILIZATION_WINDOW 秒内的实际请求数 / 预算请求数）。"""
+        now = time.monotonic()
+        result = {}
+        for name, bucket in self._buckets.items():
+            while bucket.granted and now - bucket.granted[0] > UTILIZATION_WINDOW:
+                bucket.granted.popleft()
+            budget = bucket.rate * UTILIZATION_WINDOW
+            result[name] = {
+                "per_minute": round(bucket.rate * 60, 2),
+                "recent_requests": len(bucket.granted),
+                "utilization": round(len(bucket.granted) / budget, 3) if budget else 0,
+                "waiting": bucket.waiting,
+                "total_requests": bucket.total_granted,
+                "avg_wait_seconds": round(bucket.total_wait / bucket.total_granted, 2) if bucket.total_granted else 0,
+            }
+        return result
+
+    def report(self, min_interval: float = 300):
+        """打印预算利用率，两次打印至少间隔 min_interval 秒。"""
+        now = time.monotonic()
+        if now - self._last_report < min_interval:
+            return
+        self._last_report = now
+        parts = [
+            f"{name} {s['recent_requests']}次/{UTILIZATION_WINDOW // 60}分钟 (利用率 {s['utilization'] * 100:.0f}%, "
+            f"排队 {s['waiting']}, 平均等待 {s['avg_wait_seconds']}s)"
+            for name, s in self.stats().items()
+        ]
+        print(f"LOG: 请求预算使用情况: {'; '.join(parts)}")
@@ -0,0 +1,245 @@
+import bisect
+import json
+import os
+import re
+import threading
+from array import array
+
+# 从商品链接中提取商品ID，如 https://www.goofish.com/item?id=123456&...
+ITEM_ID_PATTERN = re.compile(r'[?&]id=(\d+)')
+
+
+# AI分析结果的回写行：AI分析在后台完成后，向结果文件追加一行
+# {"ai_update_for": 原记录的字节偏移, "商品ID": ..., "ai_analysis": {...}, "分析时间": ...}，
+# 读取时合并到原记录中。该键总是写在行首，便于只靠字节前缀识别
+AI_UPDATE_KEY = "ai_update_for"
+AI_UPDATE_PREFIX = b'{"' + AI_UPDATE_KEY.encode() + b'"'
+# 需要AI分析的记录先以 {"ai_analysis": {"status": "pending"}} 保存，回写行到达后才算处理完成
+AI_PENDING_STATUS = "pending"
+
+
+def extract_item_id(link: str):
+    """从商品链接中提取数字商品ID，无法解析时返回 None。"""
+    match = ITEM_ID_PATTERN.search(link or "")
+    return int(match.group(1)) if match else None
+
+
+def dedup_key(link: str):
+    """商品的去重键：优先使用数字商品ID，无法解析时退回到链接中第一个"&"之前的部分。"""
+    item_id = extract_item_id(link)
+    if item_id is not None:
+        return item_id
+    return (link or "").split('&', 1)[0] or None
+
+
+class SeenItemIndex:
+    """
+    结果文件 (<keyword>_full_data.jsonl) 旁的已处理商品ID索引。
+
+    索引文件是一个只追加的 int64 数组 (<jsonl>.ids)，每保存一条记录追加 8 个字节，
+    启动时整体读入即可得到去重集合，无需逐行解码体积庞大的 JSONL 文件。
+    链接中解析不出商品ID的记录改用链接前缀作为去重键，逐行记录在 <jsonl>.keys 中。
+    等待AI分析的记录在回写行写入后才加入索引，进程中断时遗留的“分析中”记录不计入去重，下次运行会重新处理。
+    索引缺失或比结果文件更旧（例如结果文件被手动修改过）时，会从 JSONL 自动重建。
+    """
+
+    def __init__(self, jsonl_path: str):
+        self.jsonl_path = jsonl_path
+        self.path = f"{jsonl_path}.ids"
+        self.keys_path = f"{jsonl_path}.keys"
+
+    def is_stale(self) -> bool:
+        if not os.path.exists(self.path) or not os.path.exists(self.keys_path):
+            return True
+        return os.path.getmtime(self.path) < os.path.getmtime(self.jsonl_path)
+
+    def load(self) -> set:
+        """读取所有已处理的商品ID，必要时先重建索引。"""
+        if not os.path.exists(self.jsonl_path):
+            return set()
+        if self.is_stale():
+            self.rebuild()
+        ids = array('q')
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        # 忽略因异常中断而写了一半的尾部字节
+        ids.frombytes(data[:len(data) - len(data) % ids.itemsize])
+        with open(self.keys_path, 'r', encoding='utf-8') as f:
+            keys = {line.rstrip("\n") for line in f if line.strip()}
+        return set(ids) | keys
+
+    def rebuild(self):
+        """从 JSONL 结果文件重新生成索引。"""
+        print(f"LOG: 去重索引 {self.path} 不存在或已过期，正在从结果文件重建...")
+        ids = array('q')
+        keys = []
+        # 尚未收到回写行的“分析中”记录: 原记录偏移 -> 去重键
+        pending = {}
+
+        def add_key(key):
+            if isinstance(key, int):
+                ids.append(key)
+            elif key:
+                keys.append(key)
+
+        offset = 0
+        with open(self.jsonl_path, 'rb') as f:
+            for line in f:
+                line_offset, offset = offset, offset + len(line)
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    print("   [警告] 文件中有一行无法解析为JSON，已跳过。")
+                    continue
+                if AI_UPDATE_KEY in record:
+                    add_key(pending.pop(record[AI_UPDATE_KEY], None))
+                    continue
+                key = dedup_key((record.get('商品信息') or {}).get('商品链接', ''))
+                if (record.get('ai_analysis') or {}).get('status') == AI_PENDING_STATUS:
+                    pending[line_offset] = key
+                else:
+                    add_key(key)
+        temp_keys_path = f"{self.keys_path}.tmp"
+        with open(temp_keys_path, 'w', encoding='utf-8') as f:
+            f.writelines(f"{key}\n" for key in keys)
+        os.replace(temp_keys_path, self.keys_path)
+        # .ids 最后写入，保证其修改时间不早于 .keys
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(ids.tobytes())
+        os.replace(temp_path, self.path)
+
+    def add(self, link: str):
+        """把刚保存的商品加入索引：能解析出商品ID时追加到 .ids，否则把链接前缀追加到 .keys。"""
+        key = dedup_key(link)
+        if isinstance(key, int):
+            self.append(key)
+            return
+        if key:
+            with open(self.keys_path, 'a', encoding='utf-8') as f:
+                f.write(f"{key}\n")
+        # 结果文件已经变新，刷新 .ids 的修改时间，避免下次启动时被误判为过期而整体重建
+        self.touch()
+
+    def append(self, item_id: int):
+        """追加一个商品ID到索引。"""
+        with open(self.path, 'ab') as f:
+            f.write(array('q', [item_id]).tobytes())
+
+    def touch(self):
+        """结果文件追加了不计入去重的行（分析中的记录、AI分析回写行）后调用，刷新索引的修改时间，避免下次启动时被误判为过期。"""
+        if os.path.exists(self.path):
+            os.utime(self.path)
+
+
+class ResultOffsetIndex:
+    """
+    结果文件的字节偏移索引，供 Web 端分页读取使用。
+
+    记录第 N 条记录在文件中的起始字节偏移，并单独维护一份 AI 推荐记录的偏移列表。
+    文件增长时只扫描新增的字节，分页时只需 seek 到目标偏移并解码当页的记录。
+    AI分析结果的回写行（见 AI_UPDATE_KEY）不计入记录数，读取时合并到对应的原记录中。
+    """
+
+    def __init__(self, jsonl_path: str):
+        self.jsonl_path = jsonl_path
+        self.offsets = array('q')
+        self.recommended_offsets = array('q')
+        # 原记录偏移 -> 最新一条回写行的偏移
+        self.updates = {}
+        self.indexed_size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _is_recommended(line: bytes) -> bool:
+        # 绝大多数记录不包含推荐标记，先用字节查找过滤，只对可能命中的行做完整解码
+        if b'"is_recommended"' not in line:
+            return False
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            return False
+        return (record.get("ai_analysis") or {}).get("is_recommended") is True
+
+    def refresh(self):
+        """把上次索引之后新追加的完整行加入索引；文件变小（被截断或重写）时从头重建。"""
+        with self._lock:
+            size = os.path.getsize(self.jsonl_path)
+            if size < self.indexed_size:
+                self.offsets, self.recommended_offsets, self.indexed_size = array('q'), array('q'), 0
+                self.updates = {}
+            if size == self.indexed_size:
+                return
+            offset = self.indexed_size
+            with open(self.jsonl_path, 'rb') as f:
+                f.seek(offset)
+                for line in f:
+                    # 写入尚未完成的最后一行留到下次再索引
+                    if not line.endswith(b"\n"):
+                        break
+                    if line.startswith(AI_UPDATE_PREFIX):
+                        self._index_update(line, offset)
+                    elif line.strip():
+                        self.offsets.append(offset)
+                        if self._is_recommended(line):
+                            self.recommended_offsets.append(offset)
+                    offset += len(line)
+            self.indexed_size = offset
+
+    def _index_update(self, line: bytes, offset: int):
+        try:
+            update = json.loads(line)
+            record_offset = int(update[AI_UPDATE_KEY])
+        except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+            return
+        self.updates[record_offset] = offset
+        # 原记录保存时AI分析尚未完成，推荐状态以回写结果为准
+        position = bisect.bisect_left(self.recommended_offsets, record_offset)
+        listed = position < len(self.recommended_offsets) and self.recommended_offsets[position] == record_offset
+        recommended = (update.get("ai_analysis") or {}).get("is_recommended") is True
+        if recommended and not listed:
+            self.recommended_offsets.insert(position, record_offset)
+        elif listed and not recommended:
+            self.recommended_offsets.pop(position)
+
+    def read_page(self, page: int, limit: int, recommended_only: bool = False) -> tuple:
+        """
+        按从新到旧的顺序读取一页记录。
+
+        Returns:
+            (total_items, items)
+        """
+        self.refresh()
+        # 在锁内取出当页的偏移和对应的回写行偏移，其他线程的 refresh 随后重建索引也不影响本次读取
+        with self._lock:
+            offsets = self.recommended_offsets if recommended_only else self.offsets
+            total = len(offsets)
+            start = max(total - page * limit, 0)
+            end = max(total - (page - 1) * limit, 0)
+            page_offsets = list(reversed(offsets[start:end]))
+            page_updates = {offset: self.updates[offset] for offset in page_offsets if offset in self.updates}
+        items = []
+        with open(self.jsonl_path, 'rb') as f:
+            for offset in page_offsets:
+                f.seek(offset)
+                try:
+                    record = json.loads(f.readline())
+                except json.JSONDecodeError:
+                    continue
+                if offset in page_updates:
+                    self._merge_update(f, record, page_updates[offset])
+                items.append(record)
+        return total, items
+
+    @staticmethod
+    def _merge_update(f, record: dict, update_offset: int):
+        f.seek(update_offset)
+        try:
+            update = json.loads(f.readline())
+        except json.JSONDecodeError:
+            return
+        # 文件被手动修改后偏移可能错位，商品ID不一致时不合并
+        if str(update.get("商品ID")) == str((record.get("商品信息") or {}).get("商品ID")):
+            record["ai_analysis"] = update.get("ai_analysis")
@@ -0,0 +1,157 @@
+import os
+import re
+from urllib.parse import urlparse
+
+# 默认放行的资源类型：详情页和卖家主页只需要文档、页面脚本以及脚本发起的 mtop 接口请求
+DEFAULT_ALLOWED_RESOURCE_TYPES = "document,script,xhr,fetch"
+
+# 默认放行的域名（含子域名）：页面和 mtop 接口 (goofish.com)、页面脚本 CDN (alicdn.com)、登录态相关接口 (taobao.com)
+DEFAULT_ALLOWED_HOSTS = "goofish.com,alicdn.com,taobao.com"
+
+# 放行的域名中仍然拦截的埋点/统计类请求（按 URL 正则匹配）
+DEFAULT_BLOCKED_URL_PATTERNS = (
+    r"mmstat\.com",
+    r"/alilog/",
+    r"aplus[\w.-]*\.js",
+    r"arms-retcode",
+    r"retcode\.taobao\.com",
+    r"fourier\.taobao\.com",
+)
+
+# 会被采样实际大小的资源类型（只采样放行域名下的请求，埋点请求从不采样）
+SAMPLED_RESOURCE_TYPES = ("image", "media", "font", "stylesheet")
+
+# 尚未采样到实际大小时，各类被拦截资源的估算大小（字节）
+DEFAULT_SIZE_ESTIMATES = {
+    "image": 60 * 1024,
+    "media": 500 * 1024,
+    "font": 40 * 1024,
+    "stylesheet": 20 * 1024,
+    "script": 30 * 1024,
+    "analytics": 5 * 1024,
+    "other": 5 * 1024,
+}
+
+
+class ResourceBlocker:
+    """
+    Playwright 路由策略：详情页、卖家主页采用白名单，只放行页面发起 mtop 调用所需的
+    文档、脚本和接口请求 (document/script/xhr/fetch)，且只放行闲鱼相关域名；
+    图片、音视频、字体、样式表、第三方域名的请求以及放行域名中的埋点请求一律拦截。
+
+    路由通过 install() 在每个浏览器上下文创建时安装一次 (context.route)，只对 attach() 登记过的页面生效，
+    同一上下文中的搜索页等其他页面不受影响。
+
+    为了统计节省的流量，放行域名下每拦截 sample_every 个同类型的资源（图片、音视频、字体、样式表）就实际请求一次
+    （结果同样不交给页面），用采样得到的平均大小估算被拦截资源的总字节数。埋点请求和第三方域名的请求
+    从不采样，确保不会发出任何统计上报；被采样的请求实际下载过，不计入节省的字节数。
+
+    可通过环境变量配置：
+        BLOCK_RESOURCES: 是否启用拦截 (默认 true)
+        BLOCK_ALLOWED_RESOURCE_TYPES: 放行的资源类型，逗号分隔 (默认 document,script,xhr,fetch)
+        BLOCK_ALLOWED_HOSTS: 放行的域名（含子域名），逗号分隔 (默认 goofish.com,alicdn.com,taobao.com)
+    """
+
+    def __init__(self, enabled: bool = None, allowed_types: str = None, allowed_hosts: str = None,
+                 extra_allowed_hosts=(), blocked_url_patterns=DEFAULT_BLOCKED_URL_PATTERNS, sample_every: int = 20):
+        """
+        Args:
+            enabled: 是否启用拦截，默认读取环境变量 BLOCK_RESOURCES
+            allowed_types: 放行的资源类型，逗号分隔，默认读取环境变量 BLOCK_ALLOWED_RESOURCE_TYPES
+            allowed_hosts: 放行的域名，逗号分隔，默认读取环境变量 BLOCK_ALLOWED_HOSTS
+            extra_allowed_hosts: 额外放行的域名（如本地回放服务的主机名）
+            blocked_url_patterns: 放行域名中仍需拦截的 URL 正则列表
+            sample_every: 每拦截多少个同类资源采样一次实际大小，设为 0 表示不采样
+        """
+        if enabled is None:
+            enabled = os.getenv("BLOCK_RESOURCES", "true").lower() == "true"
+        self.enabled = enabled
+        allowed_types = allowed_types or os.getenv("BLOCK_ALLOWED_RESOURCE_TYPES", DEFAULT_ALLOWED_RESOURCE_TYPES)
+        self.allowed_types = {t.strip() for t in allowed_types.split(",") if t.strip()}
+        allowed_hosts = allowed_hosts or os.getenv("BLOCK_ALLOWED_HOSTS", DEFAULT_ALLOWED_HOSTS)
+        self.allowed_hosts = {h.strip().lower() for h in allowed_hosts.split(",") if h.strip()}
+        self.allowed_hosts.update(h.lower() for h in extra_allowed_hosts if h)
+        self.blocked_url_pattern = re.compile("|".join(blocked_url_patterns)) if blocked_url_patterns else None
+        self.sample_every = sample_every
+
+        self.pages = 0
+        self.blocked_counts = {}
+        self.fetched_counts = {}  # 资源类型 -> 为采样而实际请求的次数
+        self._sampled = {}  # 资源类型 -> (采样次数, 采样总字节数)
+        self._page_stats = {}  # 已登记的页面 -> 该页面的拦截统计
+
+    def _host_allowed(self, url: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        return any(host == allowed or host.endswith("." + allowed) for allowed in self.allowed_hosts)
+
+    def _category(self, request) -> str:
+        """返回被拦截请求的统计类别，放行的请求返回 None。"""
+        if self.blocked_url_pattern and self.blocked_url_pattern.search(request.url):
+            return "analytics"
+        resource_type = request.resource_type
+        if resource_type in self.allowed_types and self._host_allowed(request.url):
+            return None
+        return resource_type if resource_type in DEFAULT_SIZE_ESTIMATES else "other"
+
+    def _estimated_size(self, category: str) -> float:
+        count, total = self._sampled.get(category, (0, 0))
+        return total / count if count else DEFAULT_SIZE_ESTIMATES.get(category, DEFAULT_SIZE_ESTIMATES["other"])
+
+    async def install(self, context):
+        """为新建的浏览器上下文安装拦截路由，每个上下文只需调用一次（作为 BrowserManager 的 context_setup）。"""
+        if self.enabled:
+            await context.route("**/*", self._handle_route)
+
+    async def attach(self, page) -> dict:
+        """
+        让上下文中的拦截路由对该页面生效，页面关闭时自动取消登记。
+
+        Returns:
+            该页面的拦截统计 {"blocked": 拦截请求数, "bytes_saved": 估算节省字节数}，随页面加载实时更新。
+        """
+        page_stats = {"blocked": 0, "bytes_saved": 0}
+        if not self.enabled:
+            return page_stats
+        self.pages += 1
+        self._page_stats[page] = page_stats
+        page.once("close", lambda _: self._page_stats.pop(page, None))
+        return page_stats
+
+    async def _handle_route(self, route):
+        request = route.request
+        try:
+            page_stats = self._page_stats.get(request.frame.page)
+        except Exception:
+            # Service Worker 等不属于任何页面的请求
+            page_stats = None
+        category = self._category(request) if page_stats is not None else None
+        if category is None:
+            await route.continue_()
+            return
+        count = self.blocked_counts.get(category, 0) + 1
+        self.blocked_counts[category] = count
+        page_stats["blocked"] += 1
+        if (self.sample_every and category in SAMPLED_RESOURCE_TYPES and count % self.sample_every == 0
+                and self._host_allowed(request.url)):
+            self.fetched_counts[category] = self.fetched_counts.get(category, 0) + 1
+            try:
+                response = await route.fetch()
+                size = len(await response.body())
+                sampled_count, sampled_total = self._sampled.get(category, (0, 0))
+                self._sampled[category] = (sampled_count + 1, sampled_total + size)
+            except Exception:
+                pass
+        else:
+            page_stats["bytes_saved"] += self._estimated_size(category)
+        await route.abort("blockedbyclient")
+
+    def stats(self) -> dict:
+        """返回累计的拦截统计。"""
+        bytes_saved = sum((count - self.fetched_counts.get(category, 0)) * self._estimated_size(category)
+                          for category, count in self.blocked_counts.items())
+        return {
+            "pages": self.pages,
+            "blocked": dict(self.blocked_counts),
+            "bytes_saved": int(bytes_saved),
+            "kb_saved_per_page": round(bytes_saved / 1024 / self.pages, 1) if self.pages else 0,
+        }
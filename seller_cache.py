@@ -0,0 +1,103 @@
+import json
+import os
+import sqlite3
+import time
+
+# 默认的卖家信息缓存文件
+SELLER_CACHE_FILE = os.getenv("SELLER_CACHE_FILE", os.path.join("cache", "seller_profiles.db"))
+
+
+class SellerProfileCache:
+    """
+    基于 SQLite 的卖家信息持久化缓存，以 sellerId 为键。
+
+    缓存内容为 scrape_user_profile 解析后的卖家信息（头部摘要、商品列表、评价列表及好评率统计），
+    所有任务共用同一个缓存文件，程序重启后依然有效。超过 TTL 的条目视为过期，
+    条目数超过上限时按最近访问时间淘汰最旧的条目。
+    """
+
+    def __init__(self, path: str = SELLER_CACHE_FILE, ttl: int = None, max_entries: int = None):
+        """
+        Args:
+            path: SQLite 缓存文件路径
+            ttl: 缓存有效期（秒），默认读取环境变量 SELLER_CACHE_TTL (86400)，设为 0 表示禁用缓存
+            max_entries: 最多缓存的卖家数，默认读取环境变量 SELLER_CACHE_MAX_ENTRIES (5000)
+        """
+        self.path = path
+        self.ttl = int(os.getenv("SELLER_CACHE_TTL", 86400)) if ttl is None else ttl
+        self.max_entries = max_entries or int(os.getenv("SELLER_CACHE_MAX_ENTRIES", 5000))
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seller_profiles ("
+            " seller_id TEXT PRIMARY KEY,"
+            " profile TEXT NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, seller_id: str) -> dict:
+        """读取未过期的卖家信息，不存在或已过期时返回 None。"""
+        profile, is_fresh = self.get_entry(seller_id)
+        return profile if is_fresh else None
+
+    def get_entry(self, seller_id: str) -> tuple:
+        """
+        读取卖家信息及其是否仍在有效期内。
+
+        Returns:
+            (profile, is_fresh)：条目不存在时为 (None, False)；已过期的条目仍会返回，
+            以便调用方基于旧数据做增量刷新。
+        """
+        if not self.enabled:
+            return None, False
+        row = self._conn.execute(
+            "SELECT profile, updated_at FROM seller_profiles WHERE seller_id = ?", (str(seller_id),)
+        ).fetchone()
+        if not row:
+            self.misses += 1
+            return None, False
+        self._conn.execute(
+            "UPDATE seller_profiles SET accessed_at = ? WHERE seller_id = ?", (time.time(), str(seller_id))
+        )
+        self._conn.commit()
+        is_fresh = time.time() - row[1] <= self.ttl
+        if is_fresh:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return json.loads(row[0]), is_fresh
+
+    def put(self, seller_id: str, profile: dict):
+        """写入或覆盖一个卖家的信息，并在超过容量时淘汰最久未访问的条目。"""
+        if not self.enabled:
+            return
+        now = time.time()
+        self._conn.execute(
+            "INSERT OR REPLACE INTO seller_profiles (seller_id, profile, updated_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (str(seller_id), json.dumps(profile, ensure_ascii=False), now, now)
+        )
+        self._evict()
+        self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM seller_profiles").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM seller_profiles WHERE seller_id IN ("
+                " SELECT seller_id FROM seller_profiles ORDER BY accessed_at ASC LIMIT ?)", (overflow,)
+            )
+
+    def close(self):
+        self._conn.close()
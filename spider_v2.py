@@ -2,28 +2,53 @@ import asyncio
 import sys
 import os
 import argparse
-import math
 import json
 import random
 import base64
 import re
 import time
+from contextlib import AsyncExitStack
 from datetime import datetime
 from functools import wraps
-from urllib.parse import urlencode
+from urllib.parse import urlencode, urlparse
 
-import requests
 from dotenv import load_dotenv
 from openai import AsyncOpenAI, APIStatusError
-from playwright.async_api import async_playwright, Response, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import Response, TimeoutError as PlaywrightTimeoutError
 from requests.exceptions import HTTPError
 
+from ai_pool import AIWorkerPool, provider_key
+from ai_prescreen import (
+    DEFAULT_PRESCREEN_BATCH_SIZE, PrescreenBatcher, build_prescreen_prompt, build_prescreen_text,
+    parse_prescreen_response
+)
+from browser_pool import BrowserManager
+from image_downloader import ImageDownloader
+from metrics import SpiderMetrics
+from notifier import NotificationDispatcher
+from pipeline import Stage, StagedPipeline
+from poll_scheduler import AdaptivePollScheduler
+from request_pacer import RequestPacer
+from route_policy import ResourceBlocker
+from result_index import AI_PENDING_STATUS, AI_UPDATE_KEY, SeenItemIndex, dedup_key
+from seller_cache import SellerProfileCache
+from tracing import Tracer
+from ai_cache import AIAnalysisCache
+from mtop_parsers import (
+    calculate_reputation, filter_new_products, get_path, parse_item_detail, parse_ratings, parse_search_results,
+    parse_user_head, parse_user_items
+)
+from mtop_request import build_search_data, is_mtop_success, replay_mtop_request, request_data
+from image_processing import (
+    DEFAULT_AI_IMAGE_FORMAT, DEFAULT_AI_IMAGE_MAX_EDGE, DEFAULT_AI_IMAGE_QUALITY, guess_image_mime, preprocess_images
+)
+
 # 定义登录状态文件的路径
 STATE_FILE = "xianyu_state.json"
-# 定义闲鱼搜索API的URL特征
-API_URL_PATTERN = "h5api.m.goofish.com/h5/mtop.taobao.idlemtopsearch.pc.search"
+# 定义闲鱼搜索API的URL特征（不含域名，以便同样匹配本地回放服务的接口）
+API_URL_PATTERN = "/h5/mtop.taobao.idlemtopsearch.pc.search"
 # 定义闲鱼详情页API的URL特征
-DETAIL_API_URL_PATTERN = "h5api.m.goofish.com/h5/mtop.taobao.idle.pc.detail"
+DETAIL_API_URL_PATTERN = "/h5/mtop.taobao.idle.pc.detail"
 
 # --- AI & Notification Configuration ---
 load_dotenv()
@@ -35,6 +60,14 @@ WX_BOT_URL = os.getenv("WX_BOT_URL")
 DINGTALK_WEBHOOK = os.getenv("DINGTALK_WEBHOOK")
 PCURL_TO_MOBILE = os.getenv("PCURL_TO_MOBILE")
 RUN_HEADLESS = os.getenv("RUN_HEADLESS", "true").lower() != "false"
+# 闲鱼网页版地址。指向 benchmarks/replay_server.py 启动的本地回放服务时，可以离线端到端运行爬虫
+GOOFISH_BASE_URL = os.getenv("GOOFISH_BASE_URL", "https://www.goofish.com").rstrip("/")
+REPLAY_MODE = GOOFISH_BASE_URL != "https://www.goofish.com"
+# 回放模式下结果文件、卖家/AI缓存和通知发件箱写入单独的目录，通知只打印不发送，避免污染真实数据或发出真实通知
+REPLAY_DATA_DIR = os.getenv("REPLAY_DATA_DIR", "replay_data")
+RESULT_DIR = REPLAY_DATA_DIR if REPLAY_MODE else ""
+if RESULT_DIR:
+    os.makedirs(RESULT_DIR, exist_ok=True)
 
 # 检查配置是否齐全
 if not all([BASE_URL, MODEL_NAME]):
@@ -47,9 +80,21 @@ except Exception as e:
     sys.exit(f"初始化 OpenAI 客户端时出错: {e}")
 
 # 定义目录和文件名
-IMAGE_SAVE_DIR = "images"
+IMAGE_SAVE_DIR = os.getenv("IMAGE_SAVE_DIR", "images")
 os.makedirs(IMAGE_SAVE_DIR, exist_ok=True)
 
+# 所有任务共享的卖家信息缓存和AI分析结果缓存
+if REPLAY_MODE:
+    seller_profile_cache = SellerProfileCache(os.path.join(REPLAY_DATA_DIR, "seller_profiles.db"))
+    ai_analysis_cache = AIAnalysisCache(os.path.join(REPLAY_DATA_DIR, "ai_analysis.db"))
+else:
+    seller_profile_cache = SellerProfileCache()
+    ai_analysis_cache = AIAnalysisCache()
+
+# 商品处理流水线中各个非浏览器阶段的默认 worker 数量（可在任务配置的 pipeline_workers 中覆盖）
+# AI分析不在流水线中，由进程级的 ai_worker_pool 按模型服务统一限制并发
+DEFAULT_PIPELINE_WORKERS = {"images": 2}
+
 # 定义下载图片所需的请求头
 IMAGE_DOWNLOAD_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:139.0) Gecko/20100101 Firefox/139.0',
@@ -59,6 +104,40 @@ IMAGE_DOWNLOAD_HEADERS = {
     'Upgrade-Insecure-Requests': '1',
 }
 
+# 所有任务共享的图片下载连接池
+image_downloader = ImageDownloader(headers=IMAGE_DOWNLOAD_HEADERS)
+
+# 各阶段耗时和结果的 Prometheus 指标，定期写入文件后由 web_server.py 的 /metrics 接口暴露
+# 每个商品在流水线中各阶段耗时的追踪记录（logs/traces.jsonl，Web 服务的 /api/traces 接口按任务列出最慢的商品）
+# 回放模式下两者都写入 REPLAY_DATA_DIR，不与真实运行的数据混在一起
+if REPLAY_MODE:
+    stage_metrics = SpiderMetrics(os.path.join(REPLAY_DATA_DIR, "spider_metrics.prom"))
+    item_tracer = Tracer(os.path.join(REPLAY_DATA_DIR, "traces.jsonl"))
+else:
+    stage_metrics = SpiderMetrics()
+    item_tracer = Tracer()
+
+# 所有任务共享的后台通知分发器
+if REPLAY_MODE:
+    notification_dispatcher = NotificationDispatcher(
+        outbox_file=os.path.join(REPLAY_DATA_DIR, "notification_outbox.json"), metrics=stage_metrics, dry_run=True)
+else:
+    notification_dispatcher = NotificationDispatcher(metrics=stage_metrics)
+
+# 所有任务共享的AI分析 worker 池，按模型服务（OPENAI_BASE_URL 的主机名）限制并发
+ai_worker_pool = AIWorkerPool(metrics=stage_metrics)
+AI_PROVIDER = provider_key(BASE_URL)
+
+# 账号级的请求节奏控制，所有任务共享搜索/详情/卖家主页的请求预算
+request_pacer = RequestPacer()
+
+# 详情页和卖家主页的资源拦截策略（白名单），在每个浏览器上下文创建时安装；回放模式下放行本地回放服务
+resource_blocker = ResourceBlocker(extra_allowed_hosts=[urlparse(GOOFISH_BASE_URL).hostname])
+
+# 新品监控钉钉摘要的默认配置：每条消息最多包含的商品数、合并窗口（秒，0 表示每轮检查发送一次）
+DEFAULT_DIGEST_MAX_ITEMS = 10
+DEFAULT_DIGEST_WINDOW = 0
+
 def convert_goofish_link(url: str) -> str:
     """
     将Goofish商品链接转换为只包含商品ID的手机端格式。
@@ -77,66 +156,6 @@ def convert_goofish_link(url: str) -> str:
 
     return url
 
-def get_link_unique_key(link: str) -> str:
-    """截取链接中第一个"&"之前的内容作为唯一标识依据。"""
-    return link.split('&', 1)[0]
-
-def is_new_product(pub_time_str: str, time_window_seconds: int = 3600) -> bool:
-    """
-    判断商品是否为新发布的商品。
-
-    Args:
-        pub_time_str: 商品发布时间字符串，格式如 "2024-01-15 14:30"
-        time_window_seconds: 时间窗口（秒），默认1小时
-
-    Returns:
-        bool: 如果是新商品返回True，否则返回False
-    """
-    try:
-        # 解析发布时间
-        pub_time = datetime.strptime(pub_time_str, "%Y-%m-%d %H:%M")
-        current_time = datetime.now()
-
-        # 计算时间差
-        time_diff = (current_time - pub_time).total_seconds()
-
-        # 如果时间差在窗口内，认为是新商品
-        return 0 <= time_diff <= time_window_seconds
-    except (ValueError, TypeError):
-        # 如果时间解析失败，保守地认为不是新商品
-        return False
-
-def filter_new_products(products: list, time_window_seconds: int = 3600, processed_ids: set = None) -> list:
-    """
-    从商品列表中筛选出新发布的商品。
-
-    Args:
-        products: 商品信息列表
-        time_window_seconds: 时间窗口（秒）
-        processed_ids: 已处理的商品ID集合，用于去重
-
-    Returns:
-        list: 新商品列表
-    """
-    if processed_ids is None:
-        processed_ids = set()
-
-    new_products = []
-    for product in products:
-        product_id = product.get('商品ID', '')
-        pub_time = product.get('发布时间', '')
-
-        # 检查是否已处理过
-        if product_id in processed_ids:
-            continue
-
-        # 检查是否为新商品
-        if is_new_product(pub_time, time_window_seconds):
-            new_products.append(product)
-            processed_ids.add(product_id)
-
-    return new_products
-
 class NewProductMonitor:
     """新品监控器类，管理监控状态和已处理商品ID。"""
 
@@ -187,80 +206,102 @@ async def random_sleep(min_seconds: float, max_seconds: float):
     print(f"   [延迟] 等待 {delay:.2f} 秒... (范围: {min_seconds}-{max_seconds}s)") # 调试时可以取消注释
     await asyncio.sleep(delay)
 
-async def save_to_jsonl(data_record: dict, keyword: str):
-    """将一个包含商品和卖家信息的完整记录追加保存到 .jsonl 文件。"""
-    filename = f"{keyword.replace(' ', '_')}_full_data.jsonl"
+def result_filename(keyword: str) -> str:
+    """任务结果文件的路径；回放模式下位于 REPLAY_DATA_DIR 中。"""
+    return os.path.join(RESULT_DIR, f"{keyword.replace(' ', '_')}_full_data.jsonl")
+
+async def save_to_jsonl(data_record: dict, keyword: str, mark_seen: bool = True):
+    """
+    将一个包含商品和卖家信息的完整记录追加保存到 .jsonl 文件，并同步追加去重索引。
+
+    Args:
+        mark_seen: 是否立即把商品加入去重索引。等待AI分析的记录传 False，由 save_ai_update 在回写成功后加入，
+            进程中断时这些商品下次运行会重新处理
+    Returns:
+        记录在文件中的起始字节偏移（用于之后回写AI分析结果），写入失败时返回 None。
+    """
+    filename = result_filename(keyword)
     try:
+        seen_index = SeenItemIndex(filename)
+        index_was_fresh = os.path.exists(filename) and not seen_index.is_stale()
         with open(filename, "a", encoding="utf-8") as f:
+            offset = f.seek(0, os.SEEK_END)
             f.write(json.dumps(data_record, ensure_ascii=False) + "\n")
-        return True
+        # 索引已过期时不再追加，下次启动会从结果文件整体重建
+        if index_was_fresh and mark_seen:
+            seen_index.add(data_record.get('商品信息', {}).get('商品链接', ''))
+        elif index_was_fresh:
+            seen_index.touch()
+        return offset
     except IOError as e:
         print(f"写入文件 {filename} 出错: {e}")
-        return False
+        return None
 
-async def calculate_reputation_from_ratings(ratings_json: list) -> dict:
-    """从原始评价API数据列表中，计算作为卖家和买家的好评数与好评率。"""
-    seller_total = 0
-    seller_positive = 0
-    buyer_total = 0
-    buyer_positive = 0
-
-    for card in ratings_json:
-        # 使用 safe_get 保证安全访问
-        data = await safe_get(card, 'cardData', default={})
-        role_tag = await safe_get(data, 'rateTagList', 0, 'text', default='')
-        rate_type = await safe_get(data, 'rate') # 1=好评, 0=中评, -1=差评
-
-        if "卖家" in role_tag:
-            seller_total += 1
-            if rate_type == 1:
-                seller_positive += 1
-        elif "买家" in role_tag:
-            buyer_total += 1
-            if rate_type == 1:
-                buyer_positive += 1
-
-    # 计算比率，并处理除以零的情况
-    seller_rate = f"{(seller_positive / seller_total * 100):.2f}%" if seller_total > 0 else "N/A"
-    buyer_rate = f"{(buyer_positive / buyer_total * 100):.2f}%" if buyer_total > 0 else "N/A"
-
-    return {
-        "作为卖家的好评数": f"{seller_positive}/{seller_total}",
-        "作为卖家的好评率": seller_rate,
-        "作为买家的好评数": f"{buyer_positive}/{buyer_total}",
-        "作为买家的好评率": buyer_rate
+async def save_ai_update(keyword: str, record_offset: int, item_data: dict, ai_analysis: dict) -> bool:
+    """
+    把后台完成的AI分析结果作为回写行追加到 .jsonl 文件，Web 端读取时会合并到偏移为 record_offset 的原记录中。
+    回写成功后商品才加入去重索引。
+    """
+    filename = result_filename(keyword)
+    update = {
+        AI_UPDATE_KEY: record_offset,
+        "商品ID": item_data.get('商品ID'),
+        "ai_analysis": ai_analysis,
+        "分析时间": datetime.now().isoformat(),
     }
+    try:
+        seen_index = SeenItemIndex(filename)
+        index_was_fresh = not seen_index.is_stale()
+        with open(filename, "a", encoding="utf-8") as f:
+            f.write(json.dumps(update, ensure_ascii=False) + "\n")
+        if index_was_fresh:
+            seen_index.add(item_data.get('商品链接', ''))
+        return True
+    except IOError as e:
+        print(f"回写AI分析结果到文件 {filename} 出错: {e}")
+        return False
+
+def parse_reputation_counts(profile_data: dict) -> dict:
+    """从已保存的卖家信息中还原好评统计的原始计数，用于增量更新。"""
+    counts = {"seller_positive": 0, "seller_total": 0, "buyer_positive": 0, "buyer_total": 0}
+    for role, key in (("seller", "作为卖家的好评数"), ("buyer", "作为买家的好评数")):
+        try:
+            positive, total = str(profile_data.get(key, "0/0")).split("/", 1)
+            counts[f"{role}_positive"], counts[f"{role}_total"] = int(positive), int(total)
+        except ValueError:
+            pass
+    return counts
+
+async def calculate_reputation_from_ratings(ratings_json: list, base_counts: dict = None) -> dict:
+    """
+    从原始评价API数据列表中，计算作为卖家和买家的好评数与好评率。
+
+    传入 base_counts（由 parse_reputation_counts 得到的已有计数）时，只把新评价的计数累加上去，
+    无需对全部历史评价重新计算。
+    """
+    return calculate_reputation(ratings_json, base_counts)
 
 async def _parse_user_items_data(items_json: list) -> list:
     """解析用户主页的商品列表API的JSON数据。"""
-    parsed_list = []
-    for card in items_json:
-        data = card.get('cardData', {})
-        status_code = data.get('itemStatus')
-        if status_code == 0:
-            status_text = "在售"
-        elif status_code == 1:
-            status_text = "已售"
-        else:
-            status_text = f"未知状态 ({status_code})"
-
-        parsed_list.append({
-            "商品ID": data.get('id'),
-            "商品标题": data.get('title'),
-            "商品价格": data.get('priceInfo', {}).get('price'),
-            "商品主图": data.get('picInfo', {}).get('picUrl'),
-            "商品状态": status_text
-        })
-    return parsed_list
+    return parse_user_items(items_json)
 
 
-async def scrape_user_profile(context, user_id: str) -> dict:
+async def scrape_user_profile(context, user_id: str, known_profile: dict = None) -> dict:
     """
     【新版】访问指定用户的个人主页，按顺序采集其摘要信息、完整的商品列表和完整的评价列表。
+
+    传入 known_profile（缓存中已过期的卖家信息）时进入增量模式：滚动到已有的商品ID或评价ID即停止，
+    只把新抓到的卡片合并进已有信息，好评统计也只对新评价做增量累加。
     """
-    print(f"   -> 开始采集用户ID: {user_id} 的完整信息...")
+    incremental = bool(known_profile)
+    print(f"   -> 开始{'增量' if incremental else ''}采集用户ID: {user_id} 的完整信息...")
     profile_data = {}
     page = await context.new_page()
+    block_stats = await resource_blocker.attach(page)
+
+    known_profile = known_profile or {}
+    known_item_ids = {str(item.get('商品ID')) for item in known_profile.get('卖家发布的商品列表', [])}
+    known_rate_ids = {str(rate.get('评价ID')) for rate in known_profile.get('卖家收到的评价列表', [])}
 
     # 为各项异步任务准备Future和数据容器
     head_api_future = asyncio.get_event_loop().create_future()
@@ -281,10 +322,14 @@ async def scrape_user_profile(context, user_id: str) -> dict:
         elif "mtop.idle.web.xyh.item.list" in response.url:
             try:
                 data = await response.json()
-                all_items.extend(data.get('data', {}).get('cardList', []))
+                cards = data.get('data', {}).get('cardList', [])
+                all_items.extend(cards)
                 print(f"      [API捕获] 商品列表... 当前已捕获 {len(all_items)} 件")
                 if not data.get('data', {}).get('nextPage', True):
                     stop_item_scrolling.set()
+                elif any(str(card.get('cardData', {}).get('id')) in known_item_ids for card in cards):
+                    print("      [增量] 已滚动到缓存中已有的商品，停止加载商品列表。")
+                    stop_item_scrolling.set()
             except Exception as e:
                 stop_item_scrolling.set()
 
@@ -292,10 +337,15 @@ async def scrape_user_profile(context, user_id: str) -> dict:
         elif "mtop.idle.web.trade.rate.list" in response.url:
             try:
                 data = await response.json()
-                all_ratings.extend(data.get('data', {}).get('cardList', []))
+                cards = data.get('data', {}).get('cardList', [])
+                new_cards = [card for card in cards if str(card.get('cardData', {}).get('rateId')) not in known_rate_ids]
+                all_ratings.extend(new_cards)
                 print(f"      [API捕获] 评价列表... 当前已捕获 {len(all_ratings)} 条")
                 if not data.get('data', {}).get('nextPage', True):
                     stop_rating_scrolling.set()
+                elif len(new_cards) < len(cards):
+                    print("      [增量] 已滚动到缓存中已有的评价，停止加载评价列表。")
+                    stop_rating_scrolling.set()
             except Exception as e:
                 stop_rating_scrolling.set()
 
@@ -303,7 +353,8 @@ async def scrape_user_profile(context, user_id: str) -> dict:
 
     try:
         # --- 任务1: 导航并采集头部信息 ---
-        await page.goto(f"https://www.goofish.com/personal?userId={user_id}", wait_until="domcontentloaded", timeout=20000)
+        await request_pacer.acquire("profile")
+        await page.goto(f"{GOOFISH_BASE_URL}/personal?userId={user_id}", wait_until="domcontentloaded", timeout=20000)
         head_data = await asyncio.wait_for(head_api_future, timeout=15)
         profile_data = await parse_user_head_data(head_data)
 
@@ -317,7 +368,12 @@ async def scrape_user_profile(context, user_id: str) -> dict:
             except asyncio.TimeoutError:
                 print("      [滚动超时] 商品列表可能已加载完毕。")
                 break
-        profile_data["卖家发布的商品列表"] = await _parse_user_items_data(all_items)
+        items_list = await _parse_user_items_data(all_items)
+        if incremental:
+            # 新抓到的商品（含状态可能已变化的旧商品）在前，其余沿用缓存中的记录
+            fetched_ids = {str(item.get('商品ID')) for item in items_list}
+            items_list += [item for item in known_profile.get('卖家发布的商品列表', []) if str(item.get('商品ID')) not in fetched_ids]
+        profile_data["卖家发布的商品列表"] = items_list
 
         # --- 任务3: 点击并采集所有评价 ---
         print("      [采集阶段] 开始采集该用户的评价列表...")
@@ -334,8 +390,14 @@ async def scrape_user_profile(context, user_id: str) -> dict:
                     print("      [滚动超时] 评价列表可能已加载完毕。")
                     break
 
-            profile_data['卖家收到的评价列表'] = await parse_ratings_data(all_ratings)
-            reputation_stats = await calculate_reputation_from_ratings(all_ratings)
+            new_ratings = await parse_ratings_data(all_ratings)
+            if incremental:
+                print(f"      [增量] 新增评价 {len(new_ratings)} 条。")
+                profile_data['卖家收到的评价列表'] = new_ratings + known_profile.get('卖家收到的评价列表', [])
+                reputation_stats = await calculate_reputation_from_ratings(all_ratings, parse_reputation_counts(known_profile))
+            else:
+                profile_data['卖家收到的评价列表'] = new_ratings
+                reputation_stats = await calculate_reputation_from_ratings(all_ratings)
             profile_data.update(reputation_stats)
         else:
             print("      [警告] 未找到评价选项卡，跳过评价采集。")
@@ -345,153 +407,55 @@ async def scrape_user_profile(context, user_id: str) -> dict:
     finally:
         page.remove_listener("response", handle_response)
         await page.close()
-        print(f"   -> 用户 {user_id} 信息采集完成。")
+        print(f"   -> 用户 {user_id} 信息采集完成。(拦截 {block_stats['blocked']} 个资源请求，约节省 {block_stats['bytes_saved'] / 1024:.0f}KB)")
+
+    return profile_data
 
+async def get_user_profile(context, user_id: str) -> dict:
+    """
+    获取卖家信息：优先读取卖家信息缓存；缓存过期时以增量模式刷新，完全未命中时才完整采集，结果写回缓存。
+    """
+    cached_profile, is_fresh = seller_profile_cache.get_entry(user_id)
+    if is_fresh:
+        print(f"   -> 用户 {user_id} 的信息命中缓存，跳过主页采集。(缓存命中 {seller_profile_cache.hits} 次)")
+        return cached_profile
+
+    profile_data = await scrape_user_profile(context, user_id, known_profile=cached_profile)
+    # 只缓存成功走完商品列表采集的结果，避免把中途出错的残缺数据缓存下来
+    items_scraped = "卖家发布的商品列表" in profile_data
+    # 增量刷新时，本次未能采集到的部分（如中途出错的评价列表和好评统计）沿用缓存中的旧数据，合并后再写回缓存
+    for key, value in (cached_profile or {}).items():
+        profile_data.setdefault(key, value)
+    if items_scraped:
+        seller_profile_cache.put(user_id, profile_data)
     return profile_data
 
 async def parse_user_head_data(head_json: dict) -> dict:
     """解析用户头部API的JSON数据。"""
-    data = head_json.get('data', {})
-    ylz_tags = await safe_get(data, 'module', 'base', 'ylzTags', default=[])
-    seller_credit, buyer_credit = {}, {}
-    for tag in ylz_tags:
-        if await safe_get(tag, 'attributes', 'role') == 'seller':
-            seller_credit = {'level': await safe_get(tag, 'attributes', 'level'), 'text': tag.get('text')}
-        elif await safe_get(tag, 'attributes', 'role') == 'buyer':
-            buyer_credit = {'level': await safe_get(tag, 'attributes', 'level'), 'text': tag.get('text')}
-    return {
-        "卖家昵称": await safe_get(data, 'module', 'base', 'displayName'),
-        "卖家头像链接": await safe_get(data, 'module', 'base', 'avatar', 'avatar'),
-        "卖家个性签名": await safe_get(data, 'module', 'base', 'introduction', default=''),
-        "卖家在售/已售商品数": await safe_get(data, 'module', 'tabs', 'item', 'number'),
-        "卖家收到的评价总数": await safe_get(data, 'module', 'tabs', 'rate', 'number'),
-        "卖家信用等级": seller_credit.get('text', '暂无'),
-        "买家信用等级": buyer_credit.get('text', '暂无')
-    }
+    return parse_user_head(head_json)
 
 
 async def parse_ratings_data(ratings_json: list) -> list:
     """解析评价列表API的JSON数据。"""
-    parsed_list = []
-    for card in ratings_json:
-        data = await safe_get(card, 'cardData', default={})
-        rate_tag = await safe_get(data, 'rateTagList', 0, 'text', default='未知角色')
-        rate_type = await safe_get(data, 'rate')
-        if rate_type == 1: rate_text = "好评"
-        elif rate_type == 0: rate_text = "中评"
-        elif rate_type == -1: rate_text = "差评"
-        else: rate_text = "未知"
-        parsed_list.append({
-            "评价ID": data.get('rateId'),
-            "评价内容": data.get('feedback'),
-            "评价类型": rate_text,
-            "评价来源角色": rate_tag,
-            "评价者昵称": data.get('raterUserNick'),
-            "评价时间": data.get('gmtCreate'),
-            "评价图片": await safe_get(data, 'pictCdnUrlList', default=[])
-        })
-    return parsed_list
+    return parse_ratings(ratings_json)
 
 async def safe_get(data, *keys, default="暂无"):
-    """安全获取嵌套字典值"""
-    for key in keys:
-        try:
-            data = data[key]
-        except (KeyError, TypeError, IndexError):
-            return default
-    return data
+    """安全获取嵌套字典值（保留的异步接口，新代码请直接使用 mtop_parsers.get_path）"""
+    return get_path(data, *keys, default=default)
 
 async def _parse_search_results_json(json_data: dict, source: str) -> list:
     """解析搜索API的JSON数据，返回基础商品信息列表。"""
-    page_data = []
     try:
-        items = await safe_get(json_data, "data", "resultList", default=[])
-        if not items:
+        page_data = parse_search_results(json_data)
+        if not page_data:
             print(f"LOG: ({source}) API响应中未找到商品列表 (resultList)。")
             return []
-
-        for item in items:
-            main_data = await safe_get(item, "data", "item", "main", "exContent", default={})
-            click_params = await safe_get(item, "data", "item", "main", "clickParam", "args", default={})
-
-            title = await safe_get(main_data, "title", default="未知标题")
-            price_parts = await safe_get(main_data, "price", default=[])
-            price = "".join([str(p.get("text", "")) for p in price_parts if isinstance(p, dict)]).replace("当前价", "").strip() if isinstance(price_parts, list) else "价格异常"
-            if "万" in price: price = f"¥{float(price.replace('¥', '').replace('万', '')) * 10000:.0f}"
-            area = await safe_get(main_data, "area", default="地区未知")
-            seller = await safe_get(main_data, "userNickName", default="匿名卖家")
-            raw_link = await safe_get(item, "data", "item", "main", "targetUrl", default="")
-            image_url = await safe_get(main_data, "picUrl", default="")
-            pub_time_ts = click_params.get("publishTime", "")
-            item_id = await safe_get(main_data, "itemId", default="未知ID")
-            original_price = await safe_get(main_data, "oriPrice", default="暂无")
-            wants_count = await safe_get(click_params, "wantNum", default='NaN')
-
-
-            tags = []
-            if await safe_get(click_params, "tag") == "freeship":
-                tags.append("包邮")
-            r1_tags = await safe_get(main_data, "fishTags", "r1", "tagList", default=[])
-            for tag_item in r1_tags:
-                content = await safe_get(tag_item, "data", "content", default="")
-                if "验货宝" in content:
-                    tags.append("验货宝")
-
-            page_data.append({
-                "商品标题": title,
-                "当前售价": price,
-                "商品原价": original_price,
-                "“想要”人数": wants_count,
-                "商品标签": tags,
-                "发货地区": area,
-                "卖家昵称": seller,
-                "商品链接": raw_link.replace("fleamarket://", "https://www.goofish.com/"),
-                "发布时间": datetime.fromtimestamp(int(pub_time_ts)/1000).strftime("%Y-%m-%d %H:%M") if pub_time_ts.isdigit() else "未知时间",
-                "商品ID": item_id,
-                "商品主图链接": image_url  # 添加主图链接
-            })
         print(f"LOG: ({source}) 成功解析到 {len(page_data)} 条商品基础信息。")
         return page_data
     except Exception as e:
         print(f"LOG: ({source}) JSON数据处理异常: {str(e)}")
         return []
 
-def format_registration_days(total_days: int) -> str:
-    """
-    将总天数格式化为“X年Y个月”的字符串。
-    """
-    if not isinstance(total_days, int) or total_days <= 0:
-        return '未知'
-
-    # 使用更精确的平均天数
-    DAYS_IN_YEAR = 365.25
-    DAYS_IN_MONTH = DAYS_IN_YEAR / 12  # 大约 30.44
-
-    # 计算年数
-    years = math.floor(total_days / DAYS_IN_YEAR)
-
-    # 计算剩余天数
-    remaining_days = total_days - (years * DAYS_IN_YEAR)
-
-    # 计算月数，四舍五入
-    months = round(remaining_days / DAYS_IN_MONTH)
-
-    # 处理进位：如果月数等于12，则年数加1，月数归零
-    if months == 12:
-        years += 1
-        months = 0
-
-    # 构建最终的输出字符串
-    if years > 0 and months > 0:
-        return f"来闲鱼{years}年{months}个月"
-    elif years > 0 and months == 0:
-        return f"来闲鱼{years}年整"
-    elif years == 0 and months > 0:
-        return f"来闲鱼{months}个月"
-    else: # years == 0 and months == 0
-        return "来闲鱼不足一个月"
-
-
 # --- AI分析及通知辅助函数 (从 ai_filter.py 移植并异步化改造) ---
 
 def retry_on_failure(retries=3, delay=5):
@@ -529,22 +493,28 @@ def retry_on_failure(retries=3, delay=5):
 
 @retry_on_failure(retries=2, delay=3)
 async def _download_single_image(url, save_path):
-    """一个带重试的内部函数，用于异步下载单个图片。"""
-    loop = asyncio.get_running_loop()
-    # 使用 run_in_executor 运行同步的 requests 代码，避免阻塞事件循环
-    response = await loop.run_in_executor(
-        None,
-        lambda: requests.get(url, headers=IMAGE_DOWNLOAD_HEADERS, timeout=20, stream=True)
-    )
-    response.raise_for_status()
-    with open(save_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
-    return save_path
+    """一个带重试的内部函数，通过共享的连接池异步下载单个图片。"""
+    return await image_downloader.download(url, save_path)
+
+
+async def _download_image_at(index, total_images, url, save_path):
+    """下载一个商品的第 index 张图片，成功返回保存路径，失败返回 None。"""
+    try:
+        if os.path.exists(save_path):
+            print(f"   [图片] 图片 {index}/{total_images} 已存在，跳过下载: {os.path.basename(save_path)}")
+            return save_path
+
+        print(f"   [图片] 正在下载图片 {index}/{total_images}: {url}")
+        if await _download_single_image(url, save_path):
+            print(f"   [图片] 图片 {index}/{total_images} 已成功下载到: {os.path.basename(save_path)}")
+            return save_path
+    except Exception as e:
+        print(f"   [图片] 处理图片 {url} 时发生错误，已跳过此图: {e}")
+    return None
 
 
 async def download_all_images(product_id, image_urls):
-    """异步下载一个商品的所有图片。如果图片已存在则跳过。"""
+    """并发下载一个商品的所有图片。如果图片已存在则跳过，返回的路径顺序与图片顺序一致。"""
     if not image_urls:
         return []
 
@@ -552,32 +522,21 @@ async def download_all_images(product_id, image_urls):
     if not urls:
         return []
 
-    saved_paths = []
+    downloads = []
     total_images = len(urls)
     for i, url in enumerate(urls):
-        try:
-            clean_url = url.split('.heic')[0] if '.heic' in url else url
-            file_name_base = os.path.basename(clean_url).split('?')[0]
-            file_name = f"product_{product_id}_{i + 1}_{file_name_base}"
-            file_name = re.sub(r'[\\/*?:"<>|]', "", file_name)
-            if not os.path.splitext(file_name)[1]:
-                file_name += ".jpg"
-
-            save_path = os.path.join(IMAGE_SAVE_DIR, file_name)
-
-            if os.path.exists(save_path):
-                print(f"   [图片] 图片 {i + 1}/{total_images} 已存在，跳过下载: {os.path.basename(save_path)}")
-                saved_paths.append(save_path)
-                continue
-
-            print(f"   [图片] 正在下载图片 {i + 1}/{total_images}: {url}")
-            if await _download_single_image(url, save_path):
-                print(f"   [图片] 图片 {i + 1}/{total_images} 已成功下载到: {os.path.basename(save_path)}")
-                saved_paths.append(save_path)
-        except Exception as e:
-            print(f"   [图片] 处理图片 {url} 时发生错误，已跳过此图: {e}")
+        clean_url = url.split('.heic')[0] if '.heic' in url else url
+        file_name_base = os.path.basename(clean_url).split('?')[0]
+        file_name = f"product_{product_id}_{i + 1}_{file_name_base}"
+        file_name = re.sub(r'[\\/*?:"<>|]', "", file_name)
+        if not os.path.splitext(file_name)[1]:
+            file_name += ".jpg"
 
-    return saved_paths
+        save_path = os.path.join(IMAGE_SAVE_DIR, file_name)
+        downloads.append(_download_image_at(i + 1, total_images, url, save_path))
+
+    results = await asyncio.gather(*downloads)
+    return [path for path in results if path]
 
 
 def encode_image_to_base64(image_path):
@@ -592,14 +551,13 @@ def encode_image_to_base64(image_path):
         return None
 
 
-@retry_on_failure(retries=3, delay=5)
 async def send_ntfy_notification(product_data, reason):
-    """当发现推荐商品时，异步发送一个高优先级的 ntfy.sh 通知。"""
-    if not NTFY_TOPIC_URL:
-        print("警告：未在 .env 文件中配置 NTFY_TOPIC_URL，跳过通知。")
-        return
-    if not WX_BOT_URL:
-        print("警告：未在 .env 文件中配置 WX_BOT_URL，跳过通知。")
+    """
+    当发现推荐商品时，发送高优先级的 ntfy.sh 通知和企业微信通知。
+    通知只是放入后台分发器的队列，函数立即返回，失败的通知由分发器负责重试。
+    """
+    if not NTFY_TOPIC_URL and not WX_BOT_URL:
+        print("警告：未在 .env 文件中配置 NTFY_TOPIC_URL 或 WX_BOT_URL，跳过通知。")
         return
     title = product_data.get('商品标题', 'N/A')
     price = product_data.get('当前售价', 'N/A')
@@ -612,61 +570,32 @@ async def send_ntfy_notification(product_data, reason):
 
     notification_title = f"🚨 新推荐! {title[:30]}..."
 
-    try:
-        print(f"   -> 正在发送 ntfy 通知到: {NTFY_TOPIC_URL}")
-        loop = asyncio.get_running_loop()
-        await loop.run_in_executor(
-            None,
-            lambda: requests.post(
-                NTFY_TOPIC_URL,
-                data=message.encode('utf-8'),
-                headers={
-                    "Title": notification_title.encode('utf-8'),
-                    "Priority": "urgent",
-                    "Tags": "bell,vibration"
-                },
-                timeout=10
-            )
+    if NTFY_TOPIC_URL:
+        print(f"   -> 已加入 ntfy 通知队列: {NTFY_TOPIC_URL}")
+        notification_dispatcher.submit(
+            "ntfy",
+            NTFY_TOPIC_URL,
+            data=message.encode('utf-8'),
+            headers={
+                "Title": notification_title,
+                "Priority": "urgent",
+                "Tags": "bell,vibration"
+            }
         )
-        print("   -> 通知发送成功。")
-    except Exception as e:
-        print(f"   -> 发送 ntfy 通知失败: {e}")
-        raise
-
-    # 企业微信文本消息的 payload 格式
-    payload = {
-        "msgtype": "text",
-        "text": {
-            "content": f"{notification_title}\n{message}"
-        }
-    }
 
-    try:
-        print(f"   -> 正在发送企业微信通知到: {WX_BOT_URL}")
-        # 设置正确的 Content-Type 为 application/json
-        headers = {
-            "Content-Type": "application/json"
+    if WX_BOT_URL:
+        # 企业微信文本消息的 payload 格式
+        payload = {
+            "msgtype": "text",
+            "text": {
+                "content": f"{notification_title}\n{message}"
+            }
         }
-        # 使用 json 参数直接发送字典，requests 会自动处理编码和 Content-Type
-        response = requests.post(
-            WX_BOT_URL,
-            json=payload,
-            headers=headers,
-            timeout=10
-        )
-        response.raise_for_status()  # 检查HTTP状态码是否为错误 (如4xx或5xx)
-        result = response.json()
-        print(f"   -> 通知发送成功。响应: {result}")
-    except requests.exceptions.RequestException as e:
-        print(f"   -> 发送企业微信通知失败: {e}")
-        raise  # 重新抛出异常，以便上层可以捕获
-    except Exception as e:
-        print(f"   -> 发送企业微信通知时发生未知错误: {e}")
-        raise
+        print(f"   -> 已加入企业微信通知队列: {WX_BOT_URL}")
+        notification_dispatcher.submit("wecom", WX_BOT_URL, json_body=payload)
 
-@retry_on_failure(retries=3, delay=5)
 async def send_dingtalk_notification(product_data, reason="", webhook_url=None, msg_type="markdown"):
-    """发送钉钉机器人通知，支持文本和markdown格式。"""
+    """发送钉钉机器人通知，支持文本和markdown格式。通知由后台分发器异步发送。"""
     webhook = webhook_url or DINGTALK_WEBHOOK
     if not webhook:
         print("警告：未配置钉钉webhook URL，跳过钉钉通知。")
@@ -740,33 +669,54 @@ async def send_dingtalk_notification(product_data, reason="", webhook_url=None,
             }
         }
 
-    try:
-        print(f"   -> 正在发送钉钉通知到: {webhook}")
-        loop = asyncio.get_running_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: requests.post(
-                webhook,
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=10
-            )
-        )
-        response.raise_for_status()
-        result = response.json()
+    print(f"   -> 已加入钉钉通知队列: {webhook}")
+    notification_dispatcher.submit("dingtalk", webhook, json_body=payload)
 
-        if result.get('errcode') == 0:
-            print("   -> 钉钉通知发送成功。")
-        else:
-            print(f"   -> 钉钉通知发送失败: {result}")
-            raise Exception(f"钉钉API返回错误: {result}")
+async def send_dingtalk_digest(products, reason="", webhook_url=None, max_items=DEFAULT_DIGEST_MAX_ITEMS):
+    """
+    将多个新商品合并为一条钉钉 markdown 摘要消息发送，每条消息最多包含 max_items 个商品，
+    超出的部分拆分为多条消息。只有一个商品时仍使用单商品的详细格式。
 
-    except requests.exceptions.RequestException as e:
-        print(f"   -> 发送钉钉通知失败: {e}")
-        raise
-    except Exception as e:
-        print(f"   -> 发送钉钉通知时发生未知错误: {e}")
-        raise
+    Returns:
+        提交的消息条数。
+    """
+    webhook = webhook_url or DINGTALK_WEBHOOK
+    if not webhook:
+        print("警告：未配置钉钉webhook URL，跳过钉钉通知。")
+        return 0
+    if not products:
+        return 0
+    if len(products) == 1:
+        await send_dingtalk_notification(products[0], reason=reason, webhook_url=webhook)
+        return 1
+
+    max_items = max(1, max_items)
+    batches = [products[i:i + max_items] for i in range(0, len(products), max_items)]
+    for batch_index, batch in enumerate(batches, 1):
+        page_hint = f" ({batch_index}/{len(batches)})" if len(batches) > 1 else ""
+        lines = [f"## 🆕 发现 {len(products)} 个新商品{page_hint}", ""]
+        for index, product in enumerate(batch, (batch_index - 1) * max_items + 1):
+            title = product.get('商品标题', 'N/A')
+            link = product.get('商品链接', '#')
+            if PCURL_TO_MOBILE:
+                link = convert_goofish_link(link)
+            lines.append(f"{index}. [{title[:40]}]({link})")
+            lines.append(f"   **{product.get('当前售价', 'N/A')}** · {product.get('发货地区', '未知')} · "
+                         f"{product.get('卖家昵称', '未知')} · {product.get('发布时间', '未知')}")
+            lines.append("")
+        if reason:
+            lines.append(f"**推荐原因**：{reason}")
+
+        payload = {
+            "msgtype": "markdown",
+            "markdown": {
+                "title": f"新商品通知 - {len(products)} 个新商品{page_hint}",
+                "text": "\n".join(lines)
+            }
+        }
+        notification_dispatcher.submit("dingtalk", webhook, json_body=payload)
+    print(f"   -> 已将 {len(products)} 个新商品合并为 {len(batches)} 条钉钉摘要加入通知队列: {webhook}")
+    return len(batches)
 
 @retry_on_failure(retries=5, delay=10)
 async def get_ai_analysis(product_data, image_paths=None, prompt_text=""):
@@ -798,7 +748,7 @@ async def get_ai_analysis(product_data, image_paths=None, prompt_text=""):
             base64_image = encode_image_to_base64(path)
             if base64_image:
                 user_content_list.append(
-                    {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{base64_image}"}})
+                    {"type": "image_url", "image_url": {"url": f"data:{guess_image_mime(path)};base64,{base64_image}"}})
 
     messages = [{"role": "user", "content": user_content_list}]
 
@@ -818,58 +768,397 @@ async def get_ai_analysis(product_data, image_paths=None, prompt_text=""):
         raise e
 
 
-async def scrape_xianyu(task_config: dict, debug_limit: int = 0):
+@retry_on_failure(retries=3, delay=5)
+async def get_ai_prescreen(records: list, prompt_prefix: str):
+    """
+    把一批商品的精简文本信息（标题、价格、地区、标签、卖家概况）放进一次请求做初筛，不发送图片。
+
+    Returns:
+        {商品ID: {"pass": bool, "reason": str}}，多次重试后仍失败时返回 None。
+    """
+    print(f"\n   [AI初筛] 发送一批 {len(records)} 个商品进行文本初筛...")
+    response = await client.chat.completions.create(
+        model=MODEL_NAME,
+        messages=[{"role": "user", "content": build_prescreen_text(prompt_prefix, records)}],
+        response_format={"type": "json_object"}
+    )
+    ai_response_content = response.choices[0].message.content
+    try:
+        verdicts = parse_prescreen_response(ai_response_content)
+    except json.JSONDecodeError as e:
+        print("---!!! AI PRESCREEN RESPONSE PARSING FAILED (JSONDecodeError) !!!---")
+        print(f"原始返回值 (Raw response from AI):\n---\n{ai_response_content[:500]}\n---")
+        raise e
+    rejected = sum(1 for verdict in verdicts.values() if not verdict["pass"])
+    print(f"   [AI初筛] 本批返回 {len(verdicts)}/{len(records)} 个结论，淘汰 {rejected} 个。")
+    return verdicts
+
+
+async def get_ai_analysis_cached(product_data, image_paths=None, prompt_text=""):
+    """
+    带内容寻址缓存的AI分析：商品字段、图片内容和 prompt 均未变化时直接复用之前的结果，不再调用模型。
+    """
+    loop = asyncio.get_running_loop()
+    # 计算缓存键需要读取图片文件，放到线程池中执行
+    cache_key = await loop.run_in_executor(
+        None, ai_analysis_cache.make_key, product_data, image_paths, prompt_text, MODEL_NAME
+    )
+    cached_result = ai_analysis_cache.get(cache_key)
+    stats = ai_analysis_cache.stats()
+    if cached_result is not None:
+        print(f"   [AI分析] 命中分析结果缓存，跳过模型调用。(命中率: {stats['hit_rate']}, 命中 {stats['hits']} / 未命中 {stats['misses']})")
+        return cached_result
+
+    ai_analysis_result = await get_ai_analysis(product_data, image_paths, prompt_text=prompt_text)
+    if ai_analysis_result:
+        ai_analysis_cache.put(cache_key, ai_analysis_result)
+    return ai_analysis_result
+
+
+async def apply_search_filters(page, initial_response, keyword: str, personal_only: bool = False,
+                               min_price: str = None, max_price: str = None, filter_mode: str = "url"):
+    """
+    在已打开的搜索页上应用排序（最新发布）、个人闲置和价格筛选，返回筛选后的第一页搜索结果。
+
+    filter_mode 为 "url" 时，以页面自身的搜索请求为模板直接构建带筛选条件的请求并重放，只需一次搜索请求；
+    失败或 filter_mode 为 "click" 时，按原来的方式逐个点击页面上的筛选控件。
+
+    Returns:
+        (搜索结果JSON, 可供重放的搜索请求, 筛选后的请求data)。点击方式下第三项为 None，
+        此时翻页需要点击页面上的“下一页”按钮。
+    """
+    initial_request = initial_response.request
+    if filter_mode == "url":
+        filtered_data = build_search_data(request_data(initial_request), keyword=keyword, personal_only=personal_only,
+                                          min_price=min_price, max_price=max_price)
+        try:
+            await request_pacer.acquire("search")
+            search_data = await replay_mtop_request(page, initial_request, filtered_data)
+            if is_mtop_success(search_data):
+                print("LOG: 已通过搜索参数直接获取筛选后的结果。")
+                return search_data, initial_request, filtered_data
+            print(f"LOG: 参数方式筛选失败 ({(search_data or {}).get('ret')})，改为点击筛选控件。")
+        except Exception as e:
+            print(f"LOG: 参数方式筛选出错 ({e})，改为点击筛选控件。")
+
+    final_response = None
+    await page.click('text=新发布')
+    await random_sleep(2, 4) # 原来是 (1.5, 2.5)
+    async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=20000) as response_info:
+        await page.click('text=最新')
+        # --- 修改: 增加排序后的等待时间 ---
+        await random_sleep(4, 7) # 原来是 (3, 5)
+    final_response = await response_info.value
+
+    if personal_only:
+        async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=20000) as response_info:
+            await page.click('text=个人闲置')
+            # --- 修改: 将固定等待改为随机等待，并加长 ---
+            await random_sleep(4, 6) # 原来是 asyncio.sleep(5)
+        final_response = await response_info.value
+
+    if min_price or max_price:
+        price_container = page.locator('div[class*="search-price-input-container"]').first
+        if await price_container.is_visible():
+            if min_price:
+                await price_container.get_by_placeholder("¥").first.fill(min_price)
+                # --- 修改: 将固定等待改为随机等待 ---
+                await random_sleep(1, 2.5) # 原来是 asyncio.sleep(5)
+            if max_price:
+                await price_container.get_by_placeholder("¥").nth(1).fill(max_price)
+                # --- 修改: 将固定等待改为随机等待 ---
+                await random_sleep(1, 2.5) # 原来是 asyncio.sleep(5)
+
+            async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=20000) as response_info:
+                await page.keyboard.press('Tab')
+                # --- 修改: 增加确认价格后的等待时间 ---
+                await random_sleep(4, 7) # 原来是 asyncio.sleep(5)
+            final_response = await response_info.value
+        else:
+            print("LOG: 警告 - 未找到价格输入容器。")
+
+    response = final_response if final_response and final_response.ok else initial_response
+    if not response.ok:
+        return None, response.request, None
+    return await response.json(), response.request, None
+
+async def scrape_xianyu(task_config: dict, browser_manager: BrowserManager, debug_limit: int = 0):
     """
     【核心执行器】
     根据单个任务配置，异步爬取闲鱼商品数据，并对每个新发现的商品进行实时的、独立的AI分析和通知。
+    浏览器上下文从共享的 BrowserManager 中借出，任务结束后归还。
+
+    每个新商品依次流经 详情 -> 卖家信息 -> 图片 -> 图片预处理 -> 保存 五个阶段，
+    阶段之间由有界队列连接。面向浏览器的阶段保留反爬延迟，其余阶段并发处理已抓取的商品。
+    保存后商品被提交到进程级的AI分析 worker 池，分析完成时再发送通知并回写结果，
+    浏览器不必等待模型响应；任务在归还浏览器上下文后等待本任务的AI作业全部完成再返回。
+
+    任务开启 ai_prescreen 时，卖家信息之后增加一个初筛阶段：多个商品合并为一次纯文本请求，
+    只有通过初筛的商品才会下载图片并进行完整的多模态AI分析。
     """
     keyword = task_config['keyword']
     max_pages = task_config.get('max_pages', 1)
     personal_only = task_config.get('personal_only', False)
     min_price = task_config.get('min_price')
     max_price = task_config.get('max_price')
+    # 筛选方式: "url" 直接构建带筛选条件的搜索请求，"click" 逐个点击页面上的筛选控件
+    filter_mode = task_config.get('search_filter_mode') or 'url'
     ai_prompt_text = task_config.get('ai_prompt_text', '')
+    task_name = task_config.get('task_name', keyword)
+    stage_workers = {**DEFAULT_PIPELINE_WORKERS, **(task_config.get('pipeline_workers') or {})}
+
+    prescreener = None
+    if ai_prompt_text and task_config.get('ai_prescreen'):
+        # 分析标准只在每批请求中发送一次；任务使用单个 prompt 文件时把整个 prompt 作为分析标准
+        prescreen_prompt = build_prescreen_prompt(task_config.get('ai_criteria_text') or ai_prompt_text)
+        if prescreen_prompt:
+            prescreener = PrescreenBatcher(
+                lambda records: ai_worker_pool.submit(AI_PROVIDER, get_ai_prescreen, records, prescreen_prompt),
+                batch_size=task_config.get('ai_prescreen_batch_size') or DEFAULT_PRESCREEN_BATCH_SIZE,
+            )
 
     processed_item_count = 0
-    stop_scraping = False
+    queued_item_count = 0
+    pending_ai_jobs = []
+    debug_limit_reached = False
+    stop_scraping = asyncio.Event()
 
     processed_links = set()
-    output_filename = f"{keyword.replace(' ', '_')}_full_data.jsonl"
+    output_filename = result_filename(keyword)
     if os.path.exists(output_filename):
-        print(f"LOG: 发现已存在文件 {output_filename}，正在加载历史记录以去重...")
+        print(f"LOG: 发现已存在文件 {output_filename}，正在加载去重索引...")
         try:
-            with open(output_filename, 'r', encoding='utf-8') as f:
-                for line in f:
-                    try:
-                        record = json.loads(line)
-                        link = record.get('商品信息', {}).get('商品链接', '')
-                        if link:
-                            processed_links.add(get_link_unique_key(link))
-                    except json.JSONDecodeError:
-                        print(f"   [警告] 文件中有一行无法解析为JSON，已跳过。")
+            processed_links = SeenItemIndex(output_filename).load()
             print(f"LOG: 加载完成，已记录 {len(processed_links)} 个已处理过的商品。")
         except IOError as e:
             print(f"   [警告] 读取历史文件时发生错误: {e}")
     else:
         print(f"LOG: 输出文件 {output_filename} 不存在，将创建新文件。")
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=RUN_HEADLESS)
-        context = await browser.new_context(storage_state=STATE_FILE, user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3")
-        page = await context.new_page()
+    async with browser_manager.acquire_context() as context:
+
+        # --- 流水线各阶段的处理函数 ---
+
+        async def fetch_detail_stage(job: dict):
+            """阶段1: 打开详情页，捕获详情API并补充商品信息。"""
+            if stop_scraping.is_set():
+                return None
+            item_data = job['item_data']
+            # 详情请求由全局节奏控制器统一限速，等待期间上一个商品的卖家信息/图片/AI/通知在下游并行处理
+            await request_pacer.acquire("detail")
+            if stop_scraping.is_set():
+                return None
+            print(f"-> 获取商品详情: {item_data['商品标题'][:30]}...")
+
+            detail_page = await context.new_page()
+            block_stats = await resource_blocker.attach(detail_page)
+            try:
+                with stage_metrics.time_stage(task_name, "detail") as timer:
+                    async with detail_page.expect_response(lambda r: DETAIL_API_URL_PATTERN in r.url, timeout=25000) as detail_info:
+                        await detail_page.goto(item_data["商品链接"], wait_until="domcontentloaded", timeout=25000)
+
+                    detail_response = await detail_info.value
+                    if not detail_response.ok:
+                        timer.outcome = "http_error"
+                        return None
+                    detail_json = await detail_response.json()
+
+                    ret_string = str(await safe_get(detail_json, 'ret', default=[]))
+                    if "FAIL_SYS_USER_VALIDATE" in ret_string:
+                        timer.outcome = "blocked"
+
+                if "FAIL_SYS_USER_VALIDATE" in ret_string:
+                    stage_metrics.record_block(task_name, "user_validate")
+                    job['trace'].set(blocked="user_validate")
+                    stop_scraping.set()
+                    print("\n==================== CRITICAL BLOCK DETECTED ====================")
+                    print("检测到闲鱼反爬虫验证 (FAIL_SYS_USER_VALIDATE)，程序将终止。")
+                    long_sleep_duration = random.randint(300, 600)
+                    print(f"为避免账户风险，将执行一次长时间休眠 ({long_sleep_duration} 秒) 后再退出...")
+                    await asyncio.sleep(long_sleep_duration)
+                    print("长时间休眠结束，现在将安全退出。")
+                    print("===================================================================")
+                    return None
+
+                # 解析商品详情数据并更新 item_data（图片列表、想要人数、浏览量），同时取出卖家ID、芝麻信用和注册时长
+                job.update(parse_item_detail(detail_json, item_data))
+                job['trace'].set(seller_id=job.get('seller_id'), images=len(item_data.get('商品图片列表', [])))
+                return job
+            except PlaywrightTimeoutError:
+                print(f"   错误: 访问商品详情页或等待API响应超时。")
+                return None
+            finally:
+                await detail_page.close()
+                if block_stats['blocked']:
+                    print(f"   [资源拦截] 详情页拦截 {block_stats['blocked']} 个资源请求，约节省 {block_stats['bytes_saved'] / 1024:.0f}KB")
+
+        async def seller_profile_stage(job: dict):
+            """阶段2: 采集卖家个人主页信息，并构建基础记录。"""
+            item_data = job['item_data']
+            user_profile_data = {}
+            user_id = job.get('seller_id')
+            if user_id:
+                with stage_metrics.time_stage(task_name, "profile"):
+                    user_profile_data = await get_user_profile(context, str(user_id))
+            else:
+                print("   [警告] 未能从详情API中获取到卖家ID。")
+            user_profile_data['卖家芝麻信用'] = job.get('zhima_credit_text')
+            user_profile_data['卖家注册时长'] = job.get('registration_duration_text')
+
+            # 构建基础记录
+            job['record'] = {
+                "爬取时间": datetime.now().isoformat(),
+                "搜索关键字": keyword,
+                "任务名称": task_config.get('task_name', 'Untitled Task'),
+                "商品信息": item_data,
+                "卖家信息": user_profile_data
+            }
+            return job
+
+        async def prescreen_stage(job: dict):
+            """阶段2.5: 与其他商品合并成一批，只用文本信息进行AI初筛。"""
+            with stage_metrics.time_stage(task_name, "prescreen") as timer:
+                verdict = await prescreener.screen(job['record'])
+                timer.outcome = "passed" if verdict['pass'] else "rejected"
+            job['prescreen'] = verdict
+            job['trace'].set(prescreen_passed=verdict['pass'])
+            if not verdict['pass']:
+                print(f"   -> 商品 #{job['item_data']['商品ID']} 未通过AI初筛，跳过图片下载和完整分析: {verdict['reason']}")
+            return job
+
+        def passed_prescreen(job: dict) -> bool:
+            return (job.get('prescreen') or {}).get('pass', True)
+
+        async def download_images_stage(job: dict):
+            """阶段3: 下载商品图片。"""
+            item_data = job['item_data']
+            if ai_prompt_text and passed_prescreen(job):
+                image_urls = item_data.get('商品图片列表', [])
+                with stage_metrics.time_stage(task_name, "images") as timer:
+                    job['image_paths'] = await download_all_images(item_data['商品ID'], image_urls)
+                    if len(job['image_paths']) < len(image_urls):
+                        timer.outcome = "partial"
+            return job
+
+        async def preprocess_images_stage(job: dict):
+            """阶段3.5: 缩放并重新编码图片，减小发送给AI的请求体积。"""
+            if job.get('image_paths'):
+                loop = asyncio.get_running_loop()
+                job['image_paths'] = await loop.run_in_executor(
+                    None, preprocess_images, job['image_paths'],
+                    task_config.get('ai_image_max_edge') or DEFAULT_AI_IMAGE_MAX_EDGE,
+                    task_config.get('ai_image_format') or DEFAULT_AI_IMAGE_FORMAT,
+                    task_config.get('ai_image_quality') or DEFAULT_AI_IMAGE_QUALITY,
+                )
+            return job
+
+        async def persist_stage(job: dict):
+            """阶段5: 保存记录，并把AI分析提交到后台 worker 池。"""
+            nonlocal processed_item_count
+            record = job['record']
+            needs_analysis = ai_prompt_text and passed_prescreen(job)
+            if needs_analysis:
+                # 先以“分析中”状态保存，AI结果回写后才加入去重索引；发给AI的记录本身不包含该占位字段
+                record = {**record, 'ai_analysis': {'status': AI_PENDING_STATUS}}
+            elif ai_prompt_text:
+                record['ai_analysis'] = {
+                    'is_recommended': False,
+                    'reason': f"AI初筛未通过：{job['prescreen']['reason']}",
+                    'prescreen': job['prescreen'],
+                }
+            with stage_metrics.time_stage(task_name, "persist") as timer:
+                record_offset = await save_to_jsonl(record, keyword, mark_seen=not needs_analysis)
+                if record_offset is None:
+                    timer.outcome = "failed"
+            processed_item_count += 1
+            if needs_analysis:
+                job['ai_submitted'] = True
+                pending_ai_jobs.append(ai_worker_pool.submit(AI_PROVIDER, analyze_in_background, job, record_offset))
+                print(f"   -> 商品已保存并提交AI分析。累计处理 {processed_item_count} 个新商品。")
+            elif ai_prompt_text:
+                print(f"   -> 商品已保存（未通过初筛）。累计处理 {processed_item_count} 个新商品。")
+            else:
+                print(f"   -> 任务未配置AI prompt，跳过分析。累计处理 {processed_item_count} 个新商品。")
+            return None
+
+        async def analyze_in_background(job: dict, record_offset):
+            """后台AI作业: 调用AI进行分析，商品被推荐时发送通知，并把结果回写到结果文件。"""
+            final_record = job['record']
+            item_data = job['item_data']
+            trace = job['trace']
+            outcome = "completed"
+            try:
+                print(f"   -> 开始对商品 #{item_data['商品ID']} 进行AI分析...")
+                with trace.span("ai"):
+                    try:
+                        # 注意：这里我们将整个记录传给AI，让它拥有最全的上下文
+                        with stage_metrics.time_stage(task_name, "ai") as timer:
+                            ai_analysis_result = await get_ai_analysis_cached(final_record, job.get('image_paths', []), prompt_text=ai_prompt_text)
+                            if not ai_analysis_result:
+                                timer.outcome = "failed"
+                        if ai_analysis_result:
+                            print(f"   -> 商品 #{item_data['商品ID']} AI分析完成。推荐状态: {ai_analysis_result.get('is_recommended')}")
+                        else:
+                            ai_analysis_result = {'error': 'AI analysis returned None after retries.'}
+                    except Exception as e:
+                        print(f"   -> AI分析过程中发生严重错误: {e}")
+                        ai_analysis_result = {'error': str(e)}
+                final_record['ai_analysis'] = ai_analysis_result
+                trace.set(ai_recommended=ai_analysis_result.get('is_recommended'))
+
+                if ai_analysis_result.get('is_recommended'):
+                    print(f"   -> 商品被AI推荐，准备发送通知...")
+                    with trace.span("notify"), stage_metrics.time_stage(task_name, "notify"):
+                        await send_ntfy_notification(item_data, ai_analysis_result.get("reason", "无"))
+
+                if record_offset is not None:
+                    with trace.span("writeback"), stage_metrics.time_stage(task_name, "ai_writeback") as timer:
+                        if not await save_ai_update(keyword, record_offset, item_data, ai_analysis_result):
+                            timer.outcome = "failed"
+                return ai_analysis_result
+            except Exception:
+                outcome = "error:ai"
+                raise
+            finally:
+                item_tracer.finish(trace, outcome)
+
+        def on_job_done(job: dict, outcome: str):
+            # 未能走完流水线（详情/卖家信息获取失败、超时或出错）的商品移出本次运行的去重集合，再次出现时重新处理
+            if outcome != "completed":
+                processed_links.discard(job['unique_key'])
+            # 已提交AI分析的商品在后台作业结束时才写出追踪记录
+            if not job.get('ai_submitted'):
+                item_tracer.finish(job['trace'], outcome)
+
+        stages = [
+            Stage("详情", fetch_detail_stage, workers=1, key="detail"),
+            Stage("卖家信息", seller_profile_stage, workers=1, key="profile"),
+            Stage("图片", download_images_stage, workers=stage_workers['images'], key="images"),
+            Stage("图片预处理", preprocess_images_stage, workers=stage_workers['images'], key="preprocess"),
+            Stage("保存", persist_stage, workers=1, key="persist"),
+        ]
+        if prescreener:
+            # 初筛阶段的 worker 数等于批大小，一整批商品可以同时等待结论
+            stages.insert(2, Stage("AI初筛", prescreen_stage, workers=prescreener.batch_size, key="prescreen"))
+        pipeline = StagedPipeline(stages, queue_size=task_config.get('pipeline_queue_size') or 4,
+                                  on_job_done=on_job_done)
 
+        page = await context.new_page()
+        pipeline.start()
         try:
             print("LOG: 步骤 1 - 直接导航到搜索结果页...")
             # 使用 'q' 参数构建正确的搜索URL，并进行URL编码
             params = {'q': keyword}
-            search_url = f"https://www.goofish.com/search?{urlencode(params)}"
+            search_url = f"{GOOFISH_BASE_URL}/search?{urlencode(params)}"
             print(f"   -> 目标URL: {search_url}")
 
             # 使用 expect_response 在导航的同时捕获初始搜索的API数据
-            async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=30000) as response_info:
-                await page.goto(search_url, wait_until="domcontentloaded", timeout=60000)
+            await request_pacer.acquire("search")
+            with stage_metrics.time_stage(task_name, "search"):
+                async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=30000) as response_info:
+                    await page.goto(search_url, wait_until="domcontentloaded", timeout=60000)
 
-            initial_response = await response_info.value
+                initial_response = await response_info.value
 
             # 等待页面加载出关键筛选元素，以确认已成功进入搜索结果页
             await page.wait_for_selector('text=新发布', timeout=15000)
@@ -879,6 +1168,7 @@ async def scrape_xianyu(task_config: dict, debug_limit: int = 0):
             try:
                 # 等待弹窗在2秒内出现。如果出现，则执行块内代码。
                 await baxia_dialog.wait_for(state='visible', timeout=2000)
+                stage_metrics.record_block(task_name, "baxia")
                 print("\n==================== CRITICAL BLOCK DETECTED ====================")
                 print("检测到闲鱼反爬虫验证弹窗 (baxia-dialog)，无法继续操作。")
                 print("这通常是因为操作过于频繁或被识别为机器人。")
@@ -887,7 +1177,6 @@ async def scrape_xianyu(task_config: dict, debug_limit: int = 0):
                 print("2. (推荐) 在 .env 文件中设置 RUN_HEADLESS=false，以非无头模式运行，这有助于绕过检测。")
                 print(f"任务 '{keyword}' 将在此处中止。")
                 print("===================================================================")
-                await browser.close()
                 return processed_item_count
             except PlaywrightTimeoutError:
                 # 2秒内弹窗未出现，这是正常情况，继续执行
@@ -900,225 +1189,116 @@ async def scrape_xianyu(task_config: dict, debug_limit: int = 0):
             except PlaywrightTimeoutError:
                 print("LOG: 未检测到广告弹窗。")
 
-            final_response = None
             print("\nLOG: 步骤 2 - 应用筛选条件...")
-            await page.click('text=新发布')
-            await random_sleep(2, 4) # 原来是 (1.5, 2.5)
-            async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=20000) as response_info:
-                await page.click('text=最新')
-                # --- 修改: 增加排序后的等待时间 ---
-                await random_sleep(4, 7) # 原来是 (3, 5)
-            final_response = await response_info.value
-
-            if personal_only:
-                async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=20000) as response_info:
-                    await page.click('text=个人闲置')
-                    # --- 修改: 将固定等待改为随机等待，并加长 ---
-                    await random_sleep(4, 6) # 原来是 asyncio.sleep(5)
-                final_response = await response_info.value
-
-            if min_price or max_price:
-                price_container = page.locator('div[class*="search-price-input-container"]').first
-                if await price_container.is_visible():
-                    if min_price:
-                        await price_container.get_by_placeholder("¥").first.fill(min_price)
-                        # --- 修改: 将固定等待改为随机等待 ---
-                        await random_sleep(1, 2.5) # 原来是 asyncio.sleep(5)
-                    if max_price:
-                        await price_container.get_by_placeholder("¥").nth(1).fill(max_price)
-                        # --- 修改: 将固定等待改为随机等待 ---
-                        await random_sleep(1, 2.5) # 原来是 asyncio.sleep(5)
-
-                    async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=20000) as response_info:
-                        await page.keyboard.press('Tab')
-                        # --- 修改: 增加确认价格后的等待时间 ---
-                        await random_sleep(4, 7) # 原来是 asyncio.sleep(5)
-                    final_response = await response_info.value
-                else:
-                    print("LOG: 警告 - 未找到价格输入容器。")
-
+            current_data, search_request, filtered_data = await apply_search_filters(
+                page, initial_response, keyword, personal_only, min_price, max_price, filter_mode
+            )
             print("\nLOG: 所有筛选已完成，开始处理商品列表...")
 
-            current_response = final_response if final_response and final_response.ok else initial_response
             for page_num in range(1, max_pages + 1):
-                if stop_scraping: break
+                if stop_scraping.is_set() or debug_limit_reached: break
                 print(f"\n--- 正在处理第 {page_num}/{max_pages} 页 ---")
 
-                if page_num > 1:
+                if page_num > 1 and filtered_data:
+                    # 直接以页码重放已筛选的搜索请求
+                    await request_pacer.acquire("search")
+                    with stage_metrics.time_stage(task_name, "search") as timer:
+                        current_data = await replay_mtop_request(
+                            page, search_request, build_search_data(filtered_data, page_number=page_num)
+                        )
+                        if not is_mtop_success(current_data):
+                            timer.outcome = "failed"
+                    if not is_mtop_success(current_data):
+                        print(f"LOG: 获取第 {page_num} 页搜索结果失败，停止翻页。")
+                        break
+                elif page_num > 1:
                     next_btn = page.locator("[class*='search-pagination-arrow-right']:not([disabled])")
                     if not await next_btn.count():
                         print("LOG: 未找到可用的“下一页”按钮，停止翻页。")
                         break
                     try:
-                        async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=20000) as response_info:
-                            await next_btn.click()
-                            # --- 修改: 增加翻页后的等待时间 ---
-                            await random_sleep(5, 8) # 原来是 (1.5, 3.5)
-                        current_response = await response_info.value
+                        await request_pacer.acquire("search")
+                        with stage_metrics.time_stage(task_name, "search"):
+                            async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=20000) as response_info:
+                                await next_btn.click()
+                            current_response = await response_info.value
+                        # --- 修改: 增加翻页后的等待时间 ---
+                        await random_sleep(5, 8) # 原来是 (1.5, 3.5)
+                        current_data = await current_response.json() if current_response.ok else None
                     except PlaywrightTimeoutError:
                         print(f"LOG: 翻页到第 {page_num} 页超时。")
                         break
 
-                if not (current_response and current_response.ok):
+                if not current_data:
                     print(f"LOG: 第 {page_num} 页响应无效，跳过。")
                     continue
 
-                basic_items = await _parse_search_results_json(await current_response.json(), f"第 {page_num} 页")
+                basic_items = await _parse_search_results_json(current_data, f"第 {page_num} 页")
                 if not basic_items: break
 
                 total_items_on_page = len(basic_items)
                 for i, item_data in enumerate(basic_items, 1):
-                    if debug_limit > 0 and processed_item_count >= debug_limit:
+                    if stop_scraping.is_set():
+                        break
+                    if debug_limit > 0 and queued_item_count >= debug_limit:
                         print(f"LOG: 已达到调试上限 ({debug_limit})，停止获取新商品。")
-                        stop_scraping = True
+                        debug_limit_reached = True
                         break
 
-                    unique_key = get_link_unique_key(item_data["商品链接"])
+                    # 与去重索引使用同一套去重键：优先数字商品ID，解析不出时使用链接前缀
+                    unique_key = dedup_key(item_data["商品链接"])
                     if unique_key in processed_links:
                         print(f"   -> [页内进度 {i}/{total_items_on_page}] 商品 '{item_data['商品标题'][:20]}...' 已存在，跳过。")
                         continue
 
-                    print(f"-> [页内进度 {i}/{total_items_on_page}] 发现新商品，获取详情: {item_data['商品标题'][:30]}...")
-                    # --- 修改: 访问详情页前的等待时间，模拟用户在列表页上看了一会儿 ---
-                    await random_sleep(3, 6) # 原来是 (2, 4)
-
-                    detail_page = await context.new_page()
-                    try:
-                        async with detail_page.expect_response(lambda r: DETAIL_API_URL_PATTERN in r.url, timeout=25000) as detail_info:
-                            await detail_page.goto(item_data["商品链接"], wait_until="domcontentloaded", timeout=25000)
-
-                        detail_response = await detail_info.value
-                        if detail_response.ok:
-                            detail_json = await detail_response.json()
-
-                            ret_string = str(await safe_get(detail_json, 'ret', default=[]))
-                            if "FAIL_SYS_USER_VALIDATE" in ret_string:
-                                print("\n==================== CRITICAL BLOCK DETECTED ====================")
-                                print("检测到闲鱼反爬虫验证 (FAIL_SYS_USER_VALIDATE)，程序将终止。")
-                                long_sleep_duration = random.randint(300, 600)
-                                print(f"为避免账户风险，将执行一次长时间休眠 ({long_sleep_duration} 秒) 后再退出...")
-                                await asyncio.sleep(long_sleep_duration)
-                                print("长时间休眠结束，现在将安全退出。")
-                                print("===================================================================")
-                                stop_scraping = True
-                                break
-
-                            # 解析商品详情数据并更新 item_data
-                            item_do = await safe_get(detail_json, 'data', 'itemDO', default={})
-                            seller_do = await safe_get(detail_json, 'data', 'sellerDO', default={})
-
-                            reg_days_raw = await safe_get(seller_do, 'userRegDay', default=0)
-                            registration_duration_text = format_registration_days(reg_days_raw)
-
-                            # --- START: 新增代码块 ---
-
-                            # 1. 提取卖家的芝麻信用信息
-                            zhima_credit_text = await safe_get(seller_do, 'zhimaLevelInfo', 'levelName')
-
-                            # 2. 提取该商品的完整图片列表
-                            image_infos = await safe_get(item_do, 'imageInfos', default=[])
-                            if image_infos:
-                                # 使用列表推导式获取所有有效的图片URL
-                                all_image_urls = [img.get('url') for img in image_infos if img.get('url')]
-                                if all_image_urls:
-                                    # 用新的字段存储图片列表，替换掉旧的单个链接
-                                    item_data['商品图片列表'] = all_image_urls
-                                    # (可选) 仍然保留主图链接，以防万一
-                                    item_data['商品主图链接'] = all_image_urls[0]
-
-                            # --- END: 新增代码块 ---
-                            item_data['“想要”人数'] = await safe_get(item_do, 'wantCnt', default=item_data.get('“想要”人数', 'NaN'))
-                            item_data['浏览量'] = await safe_get(item_do, 'browseCnt', default='-')
-                            # ...[此处可添加更多从详情页解析出的商品信息]...
-
-                            # 调用核心函数采集卖家信息
-                            user_profile_data = {}
-                            user_id = await safe_get(seller_do, 'sellerId')
-                            if user_id:
-                                # 新的、高效的调用方式:
-                                user_profile_data = await scrape_user_profile(context, str(user_id))
-                            else:
-                                print("   [警告] 未能从详情API中获取到卖家ID。")
-                            user_profile_data['卖家芝麻信用'] = zhima_credit_text
-                            user_profile_data['卖家注册时长'] = registration_duration_text
-
-                            # 构建基础记录
-                            final_record = {
-                                "爬取时间": datetime.now().isoformat(),
-                                "搜索关键字": keyword,
-                                "任务名称": task_config.get('task_name', 'Untitled Task'),
-                                "商品信息": item_data,
-                                "卖家信息": user_profile_data
-                            }
-
-                            # --- START: Real-time AI Analysis & Notification ---
-                            print(f"   -> 开始对商品 #{item_data['商品ID']} 进行实时AI分析...")
-                            # 1. Download images
-                            image_urls = item_data.get('商品图片列表', [])
-                            downloaded_image_paths = await download_all_images(item_data['商品ID'], image_urls)
-
-                            # 2. Get AI analysis
-                            ai_analysis_result = None
-                            if ai_prompt_text:
-                                try:
-                                    # 注意：这里我们将整个记录传给AI，让它拥有最全的上下文
-                                    ai_analysis_result = await get_ai_analysis(final_record, downloaded_image_paths, prompt_text=ai_prompt_text)
-                                    if ai_analysis_result:
-                                        final_record['ai_analysis'] = ai_analysis_result
-                                        print(f"   -> AI分析完成。推荐状态: {ai_analysis_result.get('is_recommended')}")
-                                    else:
-                                        final_record['ai_analysis'] = {'error': 'AI analysis returned None after retries.'}
-                                except Exception as e:
-                                    print(f"   -> AI分析过程中发生严重错误: {e}")
-                                    final_record['ai_analysis'] = {'error': str(e)}
-                            else:
-                                print("   -> 任务未配置AI prompt，跳过分析。")
-
-                            # 3. Send notification if recommended
-                            if ai_analysis_result and ai_analysis_result.get('is_recommended'):
-                                print(f"   -> 商品被AI推荐，准备发送通知...")
-                                await send_ntfy_notification(item_data, ai_analysis_result.get("reason", "无"))
-                            # --- END: Real-time AI Analysis & Notification ---
-
-                            # 4. 保存包含AI结果的完整记录
-                            await save_to_jsonl(final_record, keyword)
-
-                            processed_links.add(unique_key)
-                            processed_item_count += 1
-                            print(f"   -> 商品处理流程完毕。累计处理 {processed_item_count} 个新商品。")
-
-                            # --- 修改: 增加单个商品处理后的主要延迟 ---
-                            print("   [反爬] 执行一次主要的随机延迟以模拟用户浏览间隔...")
-                            await random_sleep(15, 30) # 原来是 (8, 15)，这是最重要的修改之一
-
-                    except PlaywrightTimeoutError:
-                        print(f"   错误: 访问商品详情页或等待API响应超时。")
-                    except Exception as e:
-                        print(f"   错误: 处理商品详情时发生未知错误: {e}")
-                    finally:
-                        await detail_page.close()
-                        # --- 修改: 增加关闭页面后的短暂整理时间 ---
-                        await random_sleep(2, 4) # 原来是 (1, 2.5)
+                    print(f"-> [页内进度 {i}/{total_items_on_page}] 发现新商品，加入处理流水线: {item_data['商品标题'][:30]}...")
+                    # 入队时先加入去重集合，避免同一商品在处理期间被重复提交；处理失败时由 on_job_done 移除
+                    processed_links.add(unique_key)
+                    queued_item_count += 1
+                    trace = item_tracer.start(task_name, item_data.get('商品ID'), item_data.get('商品标题', ''))
+                    trace.set(page=page_num)
+                    await pipeline.put({'item_data': item_data, 'trace': trace, 'unique_key': unique_key})
 
-                # --- 新增: 在处理完一页所有商品后，翻页前，增加一个更长的“休息”时间 ---
-                if not stop_scraping and page_num < max_pages:
-                    print(f"--- 第 {page_num} 页处理完毕，准备翻页。执行一次页面间的长时休息... ---")
-                    await random_sleep(25, 50)
+                # 翻页前等待本页商品全部完成浏览器阶段，保持与逐个处理时相同的浏览节奏
+                await pipeline.join_stage(0)
+                request_pacer.report()
 
         except PlaywrightTimeoutError as e:
             print(f"\n操作超时错误: 页面元素或网络响应未在规定时间内出现。\n{e}")
         except Exception as e:
             print(f"\n爬取过程中发生未知错误: {e}")
         finally:
-            print("\nLOG: 任务执行完毕，浏览器将在5秒后自动关闭...")
-            await asyncio.sleep(5)
-            if debug_limit:
-                input("按回车键关闭浏览器...")
-            await browser.close()
+            print("\nLOG: 等待流水线中剩余的商品处理完毕...")
+            if prescreener:
+                # 浏览器阶段全部完成后不会再有新商品进入初筛，立即发送未凑满的最后一批
+                await pipeline.join_stage(0)
+                await pipeline.join_stage(1)
+                prescreener.close()
+            await pipeline.close()
+            if prescreener:
+                prescreen_stats = prescreener.stats()
+                print(f"\nLOG: AI初筛统计: 共 {prescreen_stats['batches']} 批，通过 {prescreen_stats['passed']} 个，"
+                      f"淘汰 {prescreen_stats['rejected']} 个。")
+            blocker_stats = resource_blocker.stats()
+            if blocker_stats['pages']:
+                print(f"\nLOG: 资源拦截统计: {blocker_stats['pages']} 个页面共拦截 {sum(blocker_stats['blocked'].values())} 个请求，"
+                      f"约节省 {blocker_stats['bytes_saved'] / 1024 / 1024:.1f}MB (平均每页 {blocker_stats['kb_saved_per_page']}KB)")
+            print("\nLOG: 任务执行完毕，归还浏览器上下文。")
+            await page.close()
+
+    if debug_limit:
+        # 上下文已归还，等待输入期间不占用池中的名额，也不阻塞事件循环中的其他任务
+        await asyncio.get_running_loop().run_in_executor(None, input, "按回车键结束任务...")
+
+    if pending_ai_jobs:
+        print(f"\nLOG: 浏览器上下文已归还，等待 {len(pending_ai_jobs)} 个后台AI分析作业完成...")
+        await asyncio.gather(*pending_ai_jobs, return_exceptions=True)
+        pool_stats = ai_worker_pool.stats()
+        print(f"LOG: AI分析作业已全部完成。(worker 池累计完成 {pool_stats['completed']} 个，出错 {pool_stats['failed']} 个)")
 
     return processed_item_count
 
-async def monitor_new_products(task_config: dict):
+async def monitor_new_products(task_config: dict, browser_manager: BrowserManager):
     """
     新品监控核心函数，持续监控指定关键词的新发布商品。
     """
@@ -1130,145 +1310,218 @@ async def monitor_new_products(task_config: dict):
     max_price = task_config.get('max_price')
     notification_types = task_config.get('notification_types', ['dingtalk'])
     dingtalk_webhook = task_config.get('dingtalk_webhook')
-
-    print(f"\n=== 开始新品监控任务: {task_config['task_name']} ===")
+    digest_max_items = task_config.get('digest_max_items') or DEFAULT_DIGEST_MAX_ITEMS
+    digest_window = task_config.get('digest_window') or DEFAULT_DIGEST_WINDOW
+    # 自适应轮询需在任务配置中显式开启，未配置的任务仍按固定的 monitor_interval 轮询
+    adaptive_interval = task_config.get('adaptive_interval', False)
+    warm_search = task_config.get('warm_search', False)
+    filter_mode = task_config.get('search_filter_mode') or 'url'
+    task_name = task_config['task_name']
+
+    print(f"\n=== 开始新品监控任务: {task_name} ===")
     print(f"关键词: {keyword}")
     print(f"监控间隔: {monitor_interval}秒 ({monitor_interval//60}分钟)")
     print(f"新品时间窗口: {new_product_window}秒 ({new_product_window//60}分钟)")
     print(f"通知方式: {', '.join(notification_types)}")
+    print(f"通知合并: 每条最多 {digest_max_items} 个商品，合并窗口 {digest_window} 秒")
+    if warm_search:
+        print("温页面模式: 保留搜索页，每轮只重放搜索请求")
 
     # 初始化监控器
     monitor = NewProductMonitor()
+    scheduler = AdaptivePollScheduler(
+        monitor_interval,
+        min_interval=task_config.get('monitor_min_interval'),
+        max_interval=task_config.get('monitor_max_interval'),
+    )
+    if adaptive_interval:
+        print(f"自适应轮询: 间隔范围 {scheduler.min_interval}-{scheduler.max_interval} 秒，平均请求频率不超过固定间隔")
 
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=RUN_HEADLESS)
-        context = await browser.new_context(
-            storage_state=STATE_FILE,
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-        )
-
-        try:
-            while True:
-                print(f"\n--- {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} 开始检查新商品 ---")
+    # 等待合并发送的新商品及本批次开始时间
+    pending_digest = []
+    digest_started_at = None
 
-                page = await context.new_page()
-                try:
-                    # 构建搜索URL
-                    params = {'q': keyword}
-                    search_url = f"https://www.goofish.com/search?{urlencode(params)}"
+    async def flush_digest():
+        nonlocal pending_digest, digest_started_at
+        if pending_digest and 'dingtalk' in notification_types:
+            try:
+                with stage_metrics.time_stage(task_name, "notify"):
+                    await send_dingtalk_digest(pending_digest, reason="新品监控发现",
+                                               webhook_url=dingtalk_webhook, max_items=digest_max_items)
+            except Exception as e:
+                print(f"   -> 发送通知失败: {e}")
+        pending_digest = []
+        digest_started_at = None
+
+    async def open_filtered_search(page):
+        """完整导航到搜索页并应用筛选条件，返回 apply_search_filters 的结果；遇到验证弹窗时返回 None。"""
+        nonlocal baxia_detected
+        # 构建搜索URL
+        params = {'q': keyword}
+        search_url = f"{GOOFISH_BASE_URL}/search?{urlencode(params)}"
+
+        # 导航并捕获API响应
+        await request_pacer.acquire("search")
+        with stage_metrics.time_stage(task_name, "search"):
+            async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=30000) as response_info:
+                await page.goto(search_url, wait_until="domcontentloaded", timeout=60000)
 
-                    # 导航并捕获API响应
-                    async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=30000) as response_info:
-                        await page.goto(search_url, wait_until="domcontentloaded", timeout=60000)
+            initial_response = await response_info.value
+        await page.wait_for_selector('text=新发布', timeout=15000)
 
-                    initial_response = await response_info.value
-                    await page.wait_for_selector('text=新发布', timeout=15000)
+        # 检查验证弹窗
+        baxia_dialog = page.locator("div.baxia-dialog-mask")
+        try:
+            await baxia_dialog.wait_for(state='visible', timeout=2000)
+            stage_metrics.record_block(task_name, "baxia")
+            print("检测到反爬虫验证弹窗，暂停监控...")
+            # 退避等待在归还浏览器上下文之后进行，不占用共享池的名额
+            baxia_detected = True
+            return None, None, None
+        except PlaywrightTimeoutError:
+            pass
+
+        # 关闭广告弹窗
+        try:
+            await page.click("div[class*='closeIconBg']", timeout=3000)
+        except PlaywrightTimeoutError:
+            pass
+
+        # 应用筛选条件
+        return await apply_search_filters(page, initial_response, keyword, personal_only, min_price, max_price, filter_mode)
+
+    # 搜索页出现验证弹窗时置位，本轮检查在释放上下文后退避
+    baxia_detected = False
+
+    # 温页面模式：保留已应用筛选条件的搜索页，之后每轮只重放搜索API请求
+    warm_stack = AsyncExitStack()
+    warm_context = None
+    warm_page = None
+    search_request = None
+    filtered_data = None
+
+    async def poll_search_results(context):
+        """返回本轮搜索结果的JSON数据，失败时返回 None。温页面模式下优先重放搜索请求。"""
+        nonlocal warm_page, search_request, filtered_data
+        if warm_page and search_request:
+            await request_pacer.acquire("search")
+            started = time.monotonic()
+            with stage_metrics.time_stage(task_name, "search") as timer:
+                try:
+                    # 参数方式筛选时重放带筛选条件的 data，点击方式时原请求本身已带筛选条件
+                    search_data = await replay_mtop_request(warm_page, search_request, filtered_data)
+                except Exception as e:
+                    print(f"   [温页面] 重放搜索请求出错: {e}")
+                    search_data = None
+                if not (search_data and is_mtop_success(search_data)):
+                    timer.outcome = "failed"
+            if search_data and is_mtop_success(search_data):
+                print(f"   [温页面] 已重放搜索请求，耗时 {time.monotonic() - started:.2f} 秒")
+                return search_data
+            print("   [温页面] 搜索页会话已失效，重新完整导航...")
+            await warm_page.close()
+            warm_page, search_request, filtered_data = None, None, None
 
-                    # 检查验证弹窗
-                    baxia_dialog = page.locator("div.baxia-dialog-mask")
-                    try:
-                        await baxia_dialog.wait_for(state='visible', timeout=2000)
-                        print("检测到反爬虫验证弹窗，暂停监控...")
-                        await asyncio.sleep(300)  # 等待5分钟后重试
-                        continue
-                    except PlaywrightTimeoutError:
-                        pass
+        page = await context.new_page()
+        try:
+            search_data, request, data = await open_filtered_search(page)
+            if not search_data:
+                return None
+            if warm_search:
+                # 保留页面供下一轮重放，不在这里关闭
+                warm_page, search_request, filtered_data, page = page, request, data, None
+            return search_data
+        finally:
+            if page:
+                await page.close()
 
-                    # 关闭广告弹窗
-                    try:
-                        await page.click("div[class*='closeIconBg']", timeout=3000)
-                    except PlaywrightTimeoutError:
-                        pass
-
-                    # 应用筛选条件
-                    await page.click('text=新发布')
-                    await random_sleep(2, 4)
-
-                    async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=20000) as response_info:
-                        await page.click('text=最新')
-                        await random_sleep(4, 7)
-                    final_response = await response_info.value
-
-                    if personal_only:
-                        async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=20000) as response_info:
-                            await page.click('text=个人闲置')
-                            await random_sleep(4, 6)
-                        final_response = await response_info.value
-
-                    # 应用价格筛选
-                    if min_price or max_price:
-                        price_container = page.locator('div[class*="search-price-input-container"]').first
-                        if await price_container.is_visible():
-                            if min_price:
-                                await price_container.get_by_placeholder("¥").first.fill(min_price)
-                                await random_sleep(1, 2.5)
-                            if max_price:
-                                await price_container.get_by_placeholder("¥").nth(1).fill(max_price)
-                                await random_sleep(1, 2.5)
+    try:
+        while True:
+            print(f"\n--- {datetime.now().strftime('%Y-%m-%d %H:%M:%S')} 开始检查新商品 ---")
+            cycle_items, cycle_new_count = [], 0
 
-                            async with page.expect_response(lambda r: API_URL_PATTERN in r.url, timeout=20000) as response_info:
-                                await page.keyboard.press('Tab')
-                                await random_sleep(4, 7)
-                            final_response = await response_info.value
-
-                    # 解析商品数据
-                    current_response = final_response if final_response and final_response.ok else initial_response
-                    if current_response and current_response.ok:
-                        basic_items = await _parse_search_results_json(await current_response.json(), "新品监控")
-
-                        if basic_items:
-                            # 筛选新商品
-                            new_products = filter_new_products(basic_items, new_product_window, monitor.processed_ids)
-
-                            print(f"发现 {len(basic_items)} 个商品，其中 {len(new_products)} 个新商品")
-
-                            # 按发布时间排序，最新的商品最后推送
-                            if new_products:
-                                try:
-                                    new_products.sort(key=lambda x: datetime.strptime(x.get('发布时间', '1970-01-01 00:00'), "%Y-%m-%d %H:%M"))
-                                    print(f"   -> 已按发布时间排序，最新商品将最后推送")
-                                except Exception as e:
-                                    print(f"   -> 排序失败，使用原始顺序: {e}")
-
-                            # 发送通知
-                            notification_count = 0
-                            for product in new_products:
-                                monitor.add_processed_id(product['商品ID'])
-
-                                if 'dingtalk' in notification_types:
-                                    try:
-                                        await send_dingtalk_notification(
-                                            product,
-                                            reason="新品监控发现",
-                                            webhook_url=dingtalk_webhook
-                                        )
-                                        notification_count += 1
-                                        print(f"   -> 已通知新商品: {product['商品标题'][:30]}... (价格: {product.get('当前售价', 'N/A')})")
-                                    except Exception as e:
-                                        print(f"   -> 发送通知失败: {e}")
-
-                            if notification_count > 0:
-                                print(f"本轮共发送 {notification_count} 条新品通知")
-                        else:
-                            print("未发现任何商品")
+            try:
+                if warm_search:
+                    # 温页面模式在整个监控期间占用一个独占上下文，不计入共享池的配额
+                    if warm_context is None:
+                        warm_context = await warm_stack.enter_async_context(browser_manager.dedicated_context())
+                    search_data = await poll_search_results(warm_context)
+                else:
+                    # 每轮检查借出一个上下文，等待期间归还给其他任务使用
+                    async with browser_manager.acquire_context() as context:
+                        search_data = await poll_search_results(context)
+
+                if baxia_detected:
+                    baxia_detected = False
+                    if warm_context is not None:
+                        # 关闭温页面和独占上下文，退避结束后重新创建
+                        if warm_page:
+                            await warm_page.close()
+                        warm_page, search_request, filtered_data = None, None, None
+                        await warm_stack.aclose()
+                        warm_stack, warm_context = AsyncExitStack(), None
+                    print("已释放浏览器上下文，等待5分钟后重试...")
+                    await asyncio.sleep(300)
+
+                # 解析商品数据
+                if search_data:
+                    basic_items = await _parse_search_results_json(search_data, "新品监控")
+
+                    if basic_items:
+                        # 筛选新商品
+                        new_products = filter_new_products(basic_items, new_product_window, monitor.processed_ids)
+                        cycle_items, cycle_new_count = basic_items, len(new_products)
+
+                        print(f"发现 {len(basic_items)} 个商品，其中 {len(new_products)} 个新商品")
+
+                        # 按发布时间排序，最新的商品最后推送
+                        if new_products:
+                            try:
+                                new_products.sort(key=lambda x: datetime.strptime(x.get('发布时间', '1970-01-01 00:00'), "%Y-%m-%d %H:%M"))
+                                print(f"   -> 已按发布时间排序，最新商品将最后推送")
+                            except Exception as e:
+                                print(f"   -> 排序失败，使用原始顺序: {e}")
+
+                        # 新商品先放入待合并列表，由 flush_digest 合并为摘要发送
+                        for product in new_products:
+                            monitor.add_processed_id(product['商品ID'])
+                            pending_digest.append(product)
+                            print(f"   -> 新商品: {product['商品标题'][:30]}... (价格: {product.get('当前售价', 'N/A')})")
+                        if new_products and digest_started_at is None:
+                            digest_started_at = time.time()
                     else:
-                        print("获取商品数据失败")
-
-                except Exception as e:
-                    print(f"监控过程中发生错误: {e}")
-                finally:
-                    await page.close()
+                        print("未发现任何商品")
+                else:
+                    print("获取商品数据失败")
 
-                # 等待下次检查
-                print(f"等待 {monitor_interval} 秒后进行下次检查...")
-                await asyncio.sleep(monitor_interval)
+            except Exception as e:
+                print(f"监控过程中发生错误: {e}")
+
+            # 合并窗口结束后发送摘要
+            if pending_digest and time.time() - digest_started_at >= digest_window:
+                await flush_digest()
+
+            # 等待下次检查
+            request_pacer.report()
+            scheduler.record_poll(cycle_items, cycle_new_count)
+            if adaptive_interval:
+                wait_seconds = scheduler.next_interval()
+                print(f"{scheduler.describe()}")
+            else:
+                wait_seconds = monitor_interval
+            print(f"等待 {wait_seconds} 秒后进行下次检查...")
+            await asyncio.sleep(wait_seconds)
 
-        except KeyboardInterrupt:
-            print("\n收到中断信号，停止监控...")
-        except Exception as e:
-            print(f"监控任务发生严重错误: {e}")
-        finally:
-            await browser.close()
+    except KeyboardInterrupt:
+        print("\n收到中断信号，停止监控...")
+    except Exception as e:
+        print(f"监控任务发生严重错误: {e}")
+    finally:
+        # 退出前发送尚未发出的摘要
+        await flush_digest()
+        if warm_page:
+            await warm_page.close()
+        await warm_stack.aclose()
 
 async def main():
     parser = argparse.ArgumentParser(
@@ -1287,7 +1540,9 @@ async def main():
     parser.add_argument("--config", type=str, default="config.json", help="指定任务配置文件路径（默认为 config.json）")
     args = parser.parse_args()
 
-    if not os.path.exists(STATE_FILE):
+    if REPLAY_MODE:
+        print(f"** 回放模式: 所有页面和接口请求发往 {GOOFISH_BASE_URL} **")
+    elif not os.path.exists(STATE_FILE):
         sys.exit(f"错误: 登录状态文件 '{STATE_FILE}' 不存在。请先运行 login.py 生成。")
 
     if not os.path.exists(args.config):
@@ -1310,6 +1565,8 @@ async def main():
                 
                 # 动态组合成最终的Prompt
                 task['ai_prompt_text'] = base_prompt.replace("{{CRITERIA_SECTION}}", criteria_text)
+                # 批量初筛只需要分析标准部分
+                task['ai_criteria_text'] = criteria_text
 
             except FileNotFoundError as e:
                 print(f"警告: 任务 '{task['task_name']}' 的prompt文件缺失: {e}，该任务的AI分析将被跳过。")
@@ -1347,24 +1604,43 @@ async def main():
             print(f"-> AI分析任务 '{task_name}' 已加入执行队列。")
             ai_analysis_tasks.append(task_conf)
 
+    # 所有任务共享同一个浏览器实例，按需借出上下文
+    # 回放模式下不需要真实的登录状态，回放服务会自行下发 mtop token
+    state_file = STATE_FILE if os.path.exists(STATE_FILE) else None
+    # AI分析任务在整个运行期间占用一个池中的上下文，非温页面的监控任务每轮检查借出一个；
+    # 温页面监控使用独占上下文，不计入配额。未显式配置上限时按任务数放宽，避免多出的任务排队等待
+    pooled_task_count = len(ai_analysis_tasks) + sum(1 for t in new_product_monitor_tasks if not t.get('warm_search'))
+    max_contexts = None
+    if not os.getenv("BROWSER_MAX_CONTEXTS"):
+        max_contexts = max(4, pooled_task_count)
+    browser_manager = BrowserManager(state_file, headless=RUN_HEADLESS, max_contexts=max_contexts,
+                                     context_setup=resource_blocker.install)
+    if pooled_task_count > browser_manager.max_contexts:
+        print(f"警告: 有 {pooled_task_count} 个任务需要共享浏览器上下文，超过上限 BROWSER_MAX_CONTEXTS={browser_manager.max_contexts}，"
+              f"多出的任务会排队等待其他任务归还上下文后才开始运行。")
+
     # 创建协程列表
     coroutines = []
     task_types = []
 
     # 添加AI分析任务
     for task_conf in ai_analysis_tasks:
-        coroutines.append(scrape_xianyu(task_config=task_conf, debug_limit=args.debug_limit))
+        coroutines.append(scrape_xianyu(task_config=task_conf, browser_manager=browser_manager, debug_limit=args.debug_limit))
         task_types.append('ai_analysis')
 
     # 添加新品监控任务
     for task_conf in new_product_monitor_tasks:
-        coroutines.append(monitor_new_products(task_config=task_conf))
+        coroutines.append(monitor_new_products(task_config=task_conf, browser_manager=browser_manager))
         task_types.append('new_product_monitor')
 
     if not coroutines:
         print("没有可执行的任务，程序退出。")
         return
 
+    # 启动后台通知分发器和指标写入任务（AI分析 worker 池在第一次提交作业时启动）
+    notification_dispatcher.start()
+    stage_metrics.start()
+
     # 并发执行所有任务
     try:
         results = await asyncio.gather(*coroutines, return_exceptions=True)
@@ -1386,6 +1662,12 @@ async def main():
         print("\n收到中断信号，正在停止所有任务...")
     except Exception as e:
         print(f"\n执行任务时发生严重错误: {e}")
+    finally:
+        await browser_manager.close()
+        await ai_worker_pool.close(timeout=60)
+        await image_downloader.close()
+        await notification_dispatcher.close()
+        await stage_metrics.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
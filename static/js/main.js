@@ -223,19 +223,70 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
 
-    async function fetchLogs() {
+    async function fetchLogTail() {
         try {
-            const response = await fetch('/api/logs');
+            const response = await fetch('/api/logs/tail');
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
             return await response.json();
         } catch (error) {
             console.error("无法获取日志:", error);
-            return { content: `加载日志失败: ${error.message}` };
+            return { content: `加载日志失败: ${error.message}`, offset: null };
         }
     }
 
+    // --- Log Streaming ---
+    // 日志页面最多保留的字符数，超出后丢弃最早的内容
+    const MAX_LOG_CHARS = 500000;
+    let logEventSource = null;
+
+    function stopLogStream() {
+        if (logEventSource) {
+            logEventSource.close();
+            logEventSource = null;
+        }
+    }
+
+    function appendLogContent(logContainer, content) {
+        const atBottom = logContainer.scrollHeight - logContainer.scrollTop - logContainer.clientHeight < 20;
+        let text = logContainer.textContent + content;
+        if (text.length > MAX_LOG_CHARS) {
+            text = text.slice(text.length - MAX_LOG_CHARS);
+        }
+        logContainer.textContent = text;
+        if (atBottom) {
+            logContainer.scrollTop = logContainer.scrollHeight;
+        }
+    }
+
+    async function initializeLogsView() {
+        stopLogStream();
+        const logContainer = document.getElementById('log-content-container');
+        const logs = await fetchLogTail();
+        logContainer.textContent = logs.content || '日志文件不存在或尚未创建。';
+        // 自动滚动到底部
+        logContainer.scrollTop = logContainer.scrollHeight;
+        if (logs.offset === null) return;
+
+        // 之后由服务端推送新增的日志行
+        logEventSource = new EventSource(`/api/logs/stream?offset=${logs.offset}`);
+        let hasContent = Boolean(logs.content);
+        logEventSource.onmessage = (event) => {
+            const container = document.getElementById('log-content-container');
+            if (!container) {
+                stopLogStream();
+                return;
+            }
+            const chunk = JSON.parse(event.data);
+            if (!hasContent) {
+                container.textContent = '';
+                hasContent = true;
+            }
+            appendLogContent(container, chunk.content);
+        };
+    }
+
     // --- Render Functions ---
     function renderSystemStatus(status) {
         if (!status) return '<p>无法加载系统状态。</p>';
@@ -288,7 +339,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
             const isRecommended = ai.is_recommended === true;
             const recommendationClass = isRecommended ? 'recommended' : 'not-recommended';
-            const recommendationText = isRecommended ? '推荐' : (ai.is_recommended === false ? '不推荐' : '待定');
+            const recommendationText = isRecommended ? '推荐' : (ai.is_recommended === false ? '不推荐' : (ai.status === 'pending' ? '分析中' : '待定'));
             
             const imageUrl = (info.商品图片列表 && info.商品图片列表[0]) ? info.商品图片列表[0] : 'data:image/gif;base64,R0lGODlhAQABAAD/ACwAAAAAAQABAAACADs=';
 
@@ -387,6 +438,9 @@ document.addEventListener('DOMContentLoaded', function() {
             link.classList.toggle('active', link.getAttribute('href') === `#${sectionId}`);
         });
 
+        // 离开日志页面时关闭日志推送连接
+        stopLogStream();
+
         // Update main content
         if (templates[sectionId]) {
             mainContent.innerHTML = templates[sectionId]();
@@ -406,11 +460,7 @@ document.addEventListener('DOMContentLoaded', function() {
             } else if (sectionId === 'results') {
                 await initializeResultsView();
             } else if (sectionId === 'logs') {
-                const logContainer = document.getElementById('log-content-container');
-                const logs = await fetchLogs();
-                logContainer.textContent = logs.content;
-                // 自动滚动到底部
-                logContainer.scrollTop = logContainer.scrollHeight;
+                await initializeLogsView();
             } else if (sectionId === 'settings') {
                 await initializeSettingsView();
             }
@@ -685,9 +735,7 @@ document.addEventListener('DOMContentLoaded', function() {
         } else if (button.matches('#refresh-logs-btn')) {
             const logContainer = document.getElementById('log-content-container');
             logContainer.textContent = '正在刷新...';
-            const logs = await fetchLogs();
-            logContainer.textContent = logs.content;
-            logContainer.scrollTop = logContainer.scrollHeight;
+            await initializeLogsView();
         }
     });
 
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 测试直接导入项目根目录下的模块
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
@@ -0,0 +1,93 @@
+import copy
+
+import pytest
+
+from ai_cache import AIAnalysisCache
+
+RECORD = {
+    "爬取时间": "2024-01-01T10:00:00",
+    "搜索关键字": "iphone",
+    "任务名称": "iPhone 监控",
+    "商品信息": {
+        "商品标题": "iPhone 15 Pro 256G",
+        "当前售价": "5000",
+        "商品标签": ["包邮"],
+        "发货地区": "上海",
+        "商品ID": "111",
+        "商品链接": "https://www.goofish.com/item?id=111",
+        "商品图片列表": ["https://img.alicdn.com/a.jpg"],
+        "“想要”人数": "3",
+        "浏览量": "100",
+        "发布时间": "2024-01-01 09:00",
+    },
+    "卖家信息": {
+        "卖家昵称": "seller",
+        "卖家信用等级": "极好",
+        "卖家收到的评价列表": [{"评价内容": "很好", "评价类型": "好评"}],
+        "卖家发布的商品列表": [{"商品标题": "AirPods", "商品状态": "在售"}],
+    },
+}
+
+
+def make_key(record, image_paths=(), prompt="prompt", model="model"):
+    return AIAnalysisCache.make_key(record, list(image_paths), prompt, model)
+
+
+def modified(path: tuple, value):
+    record = copy.deepcopy(RECORD)
+    target = record
+    for key in path[:-1]:
+        target = target[key]
+    target[path[-1]] = value
+    return record
+
+
+@pytest.mark.parametrize("path, value", [
+    (("爬取时间",), "2024-02-01T10:00:00"),
+    (("任务名称",), "另一个任务"),
+    (("商品信息", "商品ID"), "222"),
+    (("商品信息", "商品链接"), "https://www.goofish.com/item?id=222"),
+    (("商品信息", "商品图片列表"), ["https://img.alicdn.com/b.jpg"]),
+    (("商品信息", "“想要”人数"), "30"),
+    (("商品信息", "浏览量"), "1000"),
+    (("商品信息", "发布时间"), "2024-02-01 09:00"),
+])
+def test_relisting_and_volatile_fields_keep_the_key(path, value):
+    assert make_key(modified(path, value)) == make_key(RECORD)
+
+
+@pytest.mark.parametrize("path, value", [
+    (("商品信息", "商品标题"), "iPhone 15 Pro 512G"),
+    (("商品信息", "当前售价"), "4500"),
+    (("商品信息", "商品标签"), []),
+    (("卖家信息", "卖家信用等级"), "良好"),
+    (("卖家信息", "卖家收到的评价列表"), [{"评价内容": "有瑕疵未说明", "评价类型": "差评"}]),
+    (("卖家信息", "卖家发布的商品列表"), [{"商品标题": "iPhone 15 Pro 256G", "商品状态": "在售"}]),
+])
+def test_content_sent_to_the_model_changes_the_key(path, value):
+    assert make_key(modified(path, value)) != make_key(RECORD)
+
+
+def test_images_prompt_and_model_change_the_key(tmp_path):
+    first, second = tmp_path / "1.jpg", tmp_path / "2.jpg"
+    first.write_bytes(b"image-1")
+    second.write_bytes(b"image-2")
+    base = make_key(RECORD, [first])
+    assert make_key(RECORD, [second]) != base
+    assert make_key(RECORD, [first, second]) != base
+    assert make_key(RECORD, [first], prompt="other prompt") != base
+    assert make_key(RECORD, [first], model="other-model") != base
+    # 同样内容的图片换了文件名（如重新上架后重新下载）仍然命中
+    renamed = tmp_path / "renamed.jpg"
+    renamed.write_bytes(b"image-1")
+    assert make_key(RECORD, [renamed]) == base
+
+
+def test_get_put_and_hit_rate(tmp_path):
+    cache = AIAnalysisCache(str(tmp_path / "ai.db"), ttl=3600)
+    key = make_key(RECORD)
+    assert cache.get(key) is None
+    cache.put(key, {"is_recommended": True})
+    assert cache.get(key) == {"is_recommended": True}
+    assert cache.stats() == {"hits": 1, "misses": 1, "hit_rate": "50.00%"}
+    cache.close()
@@ -0,0 +1,130 @@
+import asyncio
+import json
+
+import pytest
+
+from ai_prescreen import (
+    ITEMS_HEADER, PrescreenBatcher, build_prescreen_prompt, build_prescreen_text, parse_prescreen_response
+)
+
+
+def record(item_id, title="iPhone 15"):
+    return {"商品信息": {"商品ID": item_id, "商品标题": title, "当前售价": "5000"},
+            "卖家信息": {"卖家信用等级": "极好", "卖家个性签名": "  诚信出售  ", "卖家芝麻信用": ""}}
+
+
+class FakeModel:
+    """记录每批请求的商品ID，按 reject 集合给出结论。"""
+
+    def __init__(self, reject=(), fail=False, omit=()):
+        self.batches = []
+        self.reject = set(reject)
+        self.fail = fail
+        self.omit = set(omit)
+
+    async def screen_batch(self, records):
+        ids = [r["商品信息"]["商品ID"] for r in records]
+        self.batches.append(ids)
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return {item_id: {"pass": item_id not in self.reject, "reason": "test"}
+                for item_id in ids if item_id not in self.omit}
+
+
+def test_prompt_prefix_is_identical_across_batches(tmp_path):
+    template = tmp_path / "prescreen.txt"
+    template.write_text("标准如下:\n{{CRITERIA_SECTION}}\n输出 JSON", encoding="utf-8")
+    prefix = build_prescreen_prompt("只要 256G", str(template))
+    assert prefix == "标准如下:\n只要 256G\n输出 JSON"
+    first = build_prescreen_text(prefix, [record("1")])
+    second = build_prescreen_text(prefix, [record("2"), record("3")])
+    shared = f"{prefix}\n\n{ITEMS_HEADER}\n\n"
+    assert first.startswith(shared) and second.startswith(shared)
+    items = json.loads(first.split("```json\n", 1)[1].split("\n```", 1)[0])
+    assert items == [{"id": "1", "标题": "iPhone 15", "价格": "5000", "发货地区": "", "标签": [],
+                      "卖家": {"卖家信用等级": "极好", "卖家个性签名": "诚信出售"}}]
+
+
+def test_missing_template_disables_prescreen(tmp_path):
+    assert build_prescreen_prompt("x", str(tmp_path / "missing.txt")) == ""
+
+
+def test_parse_response_skips_malformed_entries():
+    content = json.dumps({"results": [
+        {"id": 1, "pass": False, "reason": "型号不符"},
+        {"id": "2", "pass": "yes"},
+        {"pass": True},
+        "garbage",
+        {"id": "3", "pass": True},
+    ]})
+    assert parse_prescreen_response(content) == {
+        "1": {"pass": False, "reason": "型号不符"},
+        "3": {"pass": True, "reason": ""},
+    }
+    with pytest.raises(json.JSONDecodeError):
+        parse_prescreen_response("not json")
+
+
+def test_full_batch_is_sent_immediately():
+    async def run():
+        model = FakeModel(reject={"2"})
+        batcher = PrescreenBatcher(model.screen_batch, batch_size=3, max_wait=60)
+        verdicts = await asyncio.wait_for(asyncio.gather(*(batcher.screen(record(str(i))) for i in range(1, 4))), 1)
+        return model, batcher, verdicts
+
+    model, batcher, verdicts = asyncio.run(run())
+    assert model.batches == [["1", "2", "3"]]
+    assert [v["pass"] for v in verdicts] == [True, False, True]
+    assert batcher.stats() == {"batches": 1, "passed": 2, "rejected": 1}
+
+
+def test_partial_batch_is_sent_after_max_wait():
+    async def run():
+        model = FakeModel()
+        batcher = PrescreenBatcher(model.screen_batch, batch_size=8, max_wait=0.05)
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        verdicts = await asyncio.gather(batcher.screen(record("1")), batcher.screen(record("2")))
+        return model, verdicts, loop.time() - started
+
+    model, verdicts, elapsed = asyncio.run(run())
+    assert model.batches == [["1", "2"]]
+    assert all(v["pass"] for v in verdicts)
+    assert elapsed >= 0.05
+
+
+def test_close_coalesces_the_tail_into_one_batch():
+    async def run():
+        model = FakeModel()
+        batcher = PrescreenBatcher(model.screen_batch, batch_size=8, max_wait=60)
+        first = asyncio.create_task(batcher.screen(record("1")))
+        await asyncio.sleep(0)
+        batcher.close()
+        # 关闭后流水线收尾时陆续到达的商品与已收集的商品合并为一批，而不是等待 max_wait 或逐个发送
+        rest = [asyncio.create_task(batcher.screen(record(str(i)))) for i in range(2, 5)]
+        await asyncio.wait_for(asyncio.gather(first, *rest), 1)
+        return model
+
+    assert asyncio.run(run()).batches == [["1", "2", "3", "4"]]
+
+
+def test_close_without_pending_items_sends_nothing():
+    async def run():
+        model = FakeModel()
+        batcher = PrescreenBatcher(model.screen_batch, batch_size=8, max_wait=60)
+        batcher.close()
+        await asyncio.sleep(0.3)
+        return model
+
+    assert asyncio.run(run()).batches == []
+
+
+def test_failures_and_omissions_default_to_pass():
+    async def run(model):
+        batcher = PrescreenBatcher(model.screen_batch, batch_size=2, max_wait=60)
+        return await asyncio.wait_for(asyncio.gather(batcher.screen(record("1")), batcher.screen(record("2"))), 1)
+
+    assert all(v["pass"] for v in asyncio.run(run(FakeModel(fail=True))))
+    verdicts = asyncio.run(run(FakeModel(reject={"1"}, omit={"2"})))
+    assert [v["pass"] for v in verdicts] == [False, True]
+    assert "默认" in verdicts[1]["reason"]
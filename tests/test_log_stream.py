@@ -0,0 +1,68 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FakeRequest:
+    """只提供 stream_logs 用到的请求头和断开检测。"""
+
+    def __init__(self, headers: dict):
+        self.headers = {name.lower(): value for name, value in headers.items()}
+
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+@pytest.fixture
+def web_server(tmp_path, monkeypatch):
+    monkeypatch.chdir(ROOT_DIR)
+    # web_server 导入的 prompt_generator 在模块加载时检查模型配置
+    for name, value in (("OPENAI_BASE_URL", "http://127.0.0.1:9/v1"), ("OPENAI_MODEL_NAME", "test-model"),
+                        ("OPENAI_API_KEY", "test-key")):
+        monkeypatch.setenv(name, os.getenv(name) or value)
+    import web_server
+    log_path = tmp_path / "scraper.log"
+    log_path.write_bytes(b"line 1\nline 2\nline 3\n")
+    monkeypatch.setattr(web_server, "LOG_FILE_PATH", str(log_path))
+    return web_server
+
+
+def first_event(web_server, headers: dict, offset):
+    async def read():
+        response = await web_server.stream_logs(FakeRequest(headers), offset=offset)
+        iterator = response.body_iterator
+        try:
+            return await iterator.__anext__()
+        finally:
+            await iterator.aclose()
+
+    event = asyncio.run(read())
+    fields = dict(line.split(": ", 1) for line in event.strip().split("\n"))
+    return int(fields["id"]), json.loads(fields["data"])
+
+
+def test_stream_starts_from_query_offset(web_server):
+    event_id, data = first_event(web_server, {}, offset=0)
+    assert data["content"] == "line 1\nline 2\nline 3\n"
+    assert event_id == data["offset"] == len(b"line 1\nline 2\nline 3\n")
+
+
+def test_reconnect_resumes_from_last_event_id(web_server):
+    # 浏览器重连时仍带着建立连接时的 ?offset=0，Last-Event-ID 才是已收到内容的位置
+    with open(web_server.LOG_FILE_PATH, "ab") as f:
+        f.write(b"line 4\n")
+    resumed_from = len(b"line 1\nline 2\nline 3\n")
+    event_id, data = first_event(web_server, {"Last-Event-ID": str(resumed_from)}, offset=0)
+    assert data["content"] == "line 4\n"
+    assert event_id == os.path.getsize(web_server.LOG_FILE_PATH)
+
+
+def test_invalid_last_event_id_falls_back_to_offset(web_server):
+    _, data = first_event(web_server, {"Last-Event-ID": "not-a-cursor"}, offset=len(b"line 1\n"))
+    assert data["content"] == "line 2\nline 3\n"
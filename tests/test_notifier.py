@@ -0,0 +1,159 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+
+import notifier
+from notifier import NotificationDispatcher
+
+
+class RecordingDispatcher(NotificationDispatcher):
+    """不发出真实请求，记录每次发送；fail_urls 中的地址发送失败。"""
+
+    def __init__(self, *args, fail_urls=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sent = []
+        self.fail_urls = set(fail_urls)
+
+    async def _send(self, message):
+        if message["url"] in self.fail_urls:
+            raise RuntimeError("webhook down")
+        self.sent.append((message["channel"], message["url"], message["json"]))
+
+
+def read_outbox(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_messages_are_sent_in_background(tmp_path):
+    async def run():
+        dispatcher = RecordingDispatcher(str(tmp_path / "outbox.json"))
+        dispatcher.start()
+        dispatcher.submit("ntfy", "https://ntfy.example/topic", json_body={"n": 1})
+        dispatcher.submit("wecom", "https://wecom.example/hook", json_body={"n": 2})
+        await dispatcher.close()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert sorted(dispatcher.sent) == [("ntfy", "https://ntfy.example/topic", {"n": 1}),
+                                       ("wecom", "https://wecom.example/hook", {"n": 2})]
+    assert dispatcher.stats()["sent"] == 2
+    assert read_outbox(tmp_path / "outbox.json") == []
+
+
+def test_slow_channel_does_not_block_other_channels(tmp_path):
+    async def run():
+        dispatcher = RecordingDispatcher(str(tmp_path / "outbox.json"))
+        slow_send = dispatcher._send
+
+        async def send(message):
+            if message["channel"] == "wecom":
+                await asyncio.sleep(0.5)
+            await slow_send(message)
+
+        dispatcher._send = send
+        dispatcher.start()
+        dispatcher.submit("wecom", "https://wecom.example/hook", json_body={"n": 1})
+        dispatcher.submit("ntfy", "https://ntfy.example/topic", json_body={"n": 2})
+        await asyncio.sleep(0.1)
+        sent_early = list(dispatcher.sent)
+        await dispatcher.close()
+        return sent_early
+
+    assert asyncio.run(run()) == [("ntfy", "https://ntfy.example/topic", {"n": 2})]
+
+
+def test_rate_limited_webhook_defers_instead_of_failing(tmp_path, monkeypatch):
+    monkeypatch.setitem(notifier.CHANNEL_RATE_LIMITS, "dingtalk", (2, 60))
+
+    async def run():
+        dispatcher = RecordingDispatcher(str(tmp_path / "outbox.json"))
+        dispatcher.start()
+        for i in range(3):
+            dispatcher.submit("dingtalk", "https://oapi.dingtalk.com/robot/send?access_token=a", json_body={"n": i})
+        # 额度按 webhook 计算，另一个 webhook 不受影响
+        dispatcher.submit("dingtalk", "https://oapi.dingtalk.com/robot/send?access_token=b", json_body={"n": 9})
+        await dispatcher.close()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert [body["n"] for _, _, body in dispatcher.sent] == [0, 1, 9]
+    assert dispatcher.stats()["deferred"] == 1
+    assert dispatcher.stats()["failed"] == 0
+    outbox = read_outbox(tmp_path / "outbox.json")
+    assert [m["json"] for m in outbox] == [{"n": 2}]
+    # 顺延不计入尝试次数，下一个窗口开始后才重试
+    assert outbox[0]["attempts"] == 0
+    assert outbox[0]["next_attempt_at"] > time.time() + 50
+
+
+def test_failed_messages_are_persisted_and_resent_after_restart(tmp_path, monkeypatch):
+    monkeypatch.setattr(notifier, "OUTBOX_RETRY_INTERVAL", 0.05)
+    outbox_file = str(tmp_path / "outbox.json")
+    url = "https://ntfy.example/topic"
+
+    async def first_run():
+        dispatcher = RecordingDispatcher(outbox_file, fail_urls={url}, base_backoff=10)
+        dispatcher.start()
+        dispatcher.submit("ntfy", url, json_body={"n": 1})
+        await dispatcher.close()
+
+    asyncio.run(first_run())
+    outbox = read_outbox(outbox_file)
+    assert len(outbox) == 1 and outbox[0]["attempts"] == 1
+
+    # 模拟重试时间已到，重启后由后台重试循环重新放回渠道队列
+    outbox[0]["next_attempt_at"] = 0
+    with open(outbox_file, "w", encoding="utf-8") as f:
+        json.dump(outbox, f)
+
+    async def second_run():
+        dispatcher = RecordingDispatcher(outbox_file)
+        dispatcher.start()
+        await asyncio.sleep(0.2)
+        await dispatcher.close()
+        return dispatcher
+
+    dispatcher = asyncio.run(second_run())
+    assert dispatcher.sent == [("ntfy", url, {"n": 1})]
+    assert read_outbox(outbox_file) == []
+
+
+def test_messages_are_dropped_after_max_attempts(tmp_path):
+    url = "https://ntfy.example/topic"
+
+    async def run():
+        dispatcher = RecordingDispatcher(str(tmp_path / "outbox.json"), fail_urls={url}, max_attempts=1)
+        dispatcher.start()
+        dispatcher.submit("ntfy", url, json_body={"n": 1})
+        await dispatcher.close()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert dispatcher.stats()["failed"] == 1
+    assert read_outbox(tmp_path / "outbox.json") == []
+
+
+def test_submit_before_start_goes_to_the_outbox(tmp_path):
+    dispatcher = RecordingDispatcher(str(tmp_path / "outbox.json"))
+    dispatcher.submit("ntfy", "https://ntfy.example/topic", data="标题".encode("utf-8"), headers={"Title": b"x"})
+    outbox = read_outbox(tmp_path / "outbox.json")
+    assert outbox[0]["data"] == "标题" and outbox[0]["headers"] == {"Title": "x"}
+    assert dispatcher.sent == []
+
+
+def test_dry_run_prints_instead_of_sending(tmp_path, capsys):
+    async def run():
+        dispatcher = NotificationDispatcher(str(tmp_path / "outbox.json"), dry_run=True)
+        dispatcher.start()
+        dispatcher.submit("dingtalk", "https://oapi.dingtalk.com/robot/send?access_token=a", json_body={"n": 1})
+        await dispatcher.close()
+        return dispatcher
+
+    dispatcher = asyncio.run(run())
+    assert dispatcher.stats()["sent"] == 1
+    assert "回放模式，未发送" in capsys.readouterr().out
@@ -0,0 +1,89 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+import poll_scheduler
+from poll_scheduler import PUBLISH_TIME_FORMAT, AdaptivePollScheduler
+
+START = 1_700_000_000.0
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = {"value": START}
+    monkeypatch.setattr(poll_scheduler, "time", SimpleNamespace(time=lambda: now["value"]))
+
+    def advance(seconds):
+        now["value"] += seconds
+        return now["value"]
+
+    advance.now = lambda: now["value"]
+    return advance
+
+
+def products(clock, count, every_seconds, start_id=0):
+    """最近 count 个新品，每 every_seconds 秒发布一个。"""
+    now = clock.now()
+    return [{"商品ID": str(start_id + i),
+             "发布时间": datetime.fromtimestamp(now - i * every_seconds).strftime(PUBLISH_TIME_FORMAT)}
+            for i in range(count)]
+
+
+def test_defaults():
+    scheduler = AdaptivePollScheduler(300)
+    assert (scheduler.min_interval, scheduler.max_interval) == (60, 1200)
+    assert AdaptivePollScheduler(30).min_interval == 30
+    assert AdaptivePollScheduler(300, min_interval=600, max_interval=120).max_interval == 600
+
+
+def test_without_arrivals_polls_at_the_base_interval(clock):
+    scheduler = AdaptivePollScheduler(300)
+    assert scheduler.next_interval() == 300
+
+
+def test_busy_keyword_is_clamped_to_min_interval(clock):
+    scheduler = AdaptivePollScheduler(300, min_interval=60)
+    clock(3600)  # 积累额度
+    scheduler.record_poll(products(clock, 30, 60), new_count=30)
+    assert scheduler.arrival_rate() > 1 / 60
+    assert scheduler.next_interval() == 60
+
+
+def test_quiet_keyword_backs_off_up_to_max_interval(clock):
+    scheduler = AdaptivePollScheduler(300, max_interval=900)
+    clock(3600)
+    intervals = []
+    for _ in range(6):
+        scheduler.record_poll([], new_count=0)
+        intervals.append(scheduler.next_interval())
+    assert intervals == sorted(intervals)
+    assert intervals[0] == 450
+    assert intervals[-1] == 900
+
+
+def test_token_deficit_wait_is_not_cut_short_by_max_interval(clock):
+    scheduler = AdaptivePollScheduler(300, min_interval=60, max_interval=400)
+    scheduler.record_poll(products(clock, 30, 60), new_count=30)
+    for _ in range(3):
+        scheduler.record_poll([], new_count=1)
+    # 额度已透支 3 个，需要等待 4 * 300 秒才能积累出下一个额度，超过 max_interval
+    assert scheduler.tokens == pytest.approx(-3)
+    assert scheduler.next_interval() == 1200
+
+
+def test_long_run_request_budget_matches_the_fixed_interval(clock):
+    base, duration = 300, 24 * 3600
+    scheduler = AdaptivePollScheduler(base, min_interval=60, burst_seconds=3600)
+    polls = 0
+    elapsed = 0
+    while elapsed < duration:
+        # 繁忙时段每分钟一个新品，其余时间没有新品
+        busy = (elapsed // 3600) % 4 == 0
+        batch = products(clock, 20, 60, start_id=polls * 100) if busy else []
+        scheduler.record_poll(batch, new_count=len(batch))
+        polls += 1
+        wait = scheduler.next_interval()
+        clock(wait)
+        elapsed += wait
+    assert polls <= duration / base + scheduler.capacity + 1
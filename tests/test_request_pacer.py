@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+import request_pacer
+from request_pacer import RequestPacer
+
+
+@pytest.fixture
+def no_think_time(monkeypatch):
+    """去掉随机的浏览停顿，只保留令牌桶本身的等待。"""
+    monkeypatch.setattr(RequestPacer, "_human_delay", staticmethod(lambda think_time: 0.0))
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """记录节奏控制器请求的每次等待时长（仍然真实等待）。"""
+    recorded = []
+    real_sleep = asyncio.sleep
+
+    async def sleep(delay, *args, **kwargs):
+        recorded.append(delay)
+        await real_sleep(delay, *args, **kwargs)
+
+    monkeypatch.setattr(request_pacer.asyncio, "sleep", sleep)
+    return recorded
+
+
+def test_burst_is_free_then_requests_follow_the_rate(no_think_time, sleeps):
+    pacer = RequestPacer({"detail": (600, 2, 1)})  # 每秒 10 次，突发 2 次
+
+    async def run():
+        for _ in range(4):
+            await pacer.acquire("detail")
+
+    asyncio.run(run())
+    assert sleeps[:2] == [0, 0]
+    assert sleeps[2] == pytest.approx(0.1, abs=0.02)
+    assert sleeps[3] == pytest.approx(0.1, abs=0.02)
+    assert pacer.stats()["detail"]["total_requests"] == 4
+
+
+def test_concurrent_tasks_share_one_account_budget(no_think_time, sleeps):
+    pacer = RequestPacer({"search": (1200, 1, 1), "profile": (1200, 1, 1)})  # 每秒 20 次，突发 1 次
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(*(pacer.acquire("search") for _ in range(5)), pacer.acquire("profile"))
+        return loop.time() - started
+
+    elapsed = asyncio.run(run())
+    # 5 个任务共用同一个搜索额度，第一个使用突发额度，其余依次间隔 0.05 秒；卖家主页的额度独立
+    assert elapsed >= 4 * 0.05 - 0.01
+    stats = pacer.stats()
+    assert stats["search"]["total_requests"] == 5
+    assert stats["profile"]["total_requests"] == 1
+    assert stats["search"]["waiting"] == 0
+
+
+def test_think_time_is_a_floor_on_the_wait(monkeypatch, sleeps):
+    monkeypatch.setattr(RequestPacer, "_human_delay", staticmethod(lambda think_time: think_time))
+    pacer = RequestPacer({"detail": (600, 5, 0.03)})
+
+    async def run():
+        await pacer.acquire("detail")
+
+    asyncio.run(run())
+    assert sleeps == [0.03]
+
+
+def test_human_delay_is_positive_and_centered_on_think_time():
+    delays = sorted(RequestPacer._human_delay(4) for _ in range(2000))
+    assert delays[0] > 0
+    assert 3 < delays[len(delays) // 2] < 5.5
+
+
+def test_budgets_read_from_environment(monkeypatch):
+    monkeypatch.setenv("PACER_DETAIL_RPM", "10")
+    stats = RequestPacer().stats()
+    assert stats["detail"]["per_minute"] == 10
+    assert set(stats) == {"search", "detail", "profile"}
+
+
+def test_utilization_counts_recent_requests(no_think_time, sleeps):
+    pacer = RequestPacer({"search": (60, 3, 1)})
+
+    async def run():
+        for _ in range(3):
+            await pacer.acquire("search")
+
+    asyncio.run(run())
+    stats = pacer.stats()["search"]
+    assert stats["recent_requests"] == 3
+    assert stats["utilization"] == pytest.approx(3 / (60 / 60 * request_pacer.UTILIZATION_WINDOW), abs=1e-3)
@@ -0,0 +1,130 @@
+import json
+import os
+
+from result_index import AI_UPDATE_KEY, ResultOffsetIndex, SeenItemIndex, dedup_key
+
+
+def item_record(item_id, pending=False, recommended=None, link=None):
+    record = {"商品信息": {"商品ID": str(item_id),
+                       "商品链接": link or f"https://www.goofish.com/item?id={item_id}&categoryId=1"}}
+    if pending:
+        record["ai_analysis"] = {"status": "pending"}
+    elif recommended is not None:
+        record["ai_analysis"] = {"is_recommended": recommended}
+    return record
+
+
+def ai_update(record_offset, item_id, recommended):
+    return {AI_UPDATE_KEY: record_offset, "商品ID": str(item_id), "ai_analysis": {"is_recommended": recommended}}
+
+
+def append_lines(path, *objects) -> list:
+    """追加若干行，返回每行的起始字节偏移。"""
+    offsets = []
+    with open(path, "ab") as f:
+        for obj in objects:
+            offsets.append(f.seek(0, os.SEEK_END))
+            f.write((json.dumps(obj, ensure_ascii=False) + "\n").encode("utf-8"))
+    return offsets
+
+
+def test_dedup_key_prefers_item_id_and_falls_back_to_link_prefix():
+    assert dedup_key("https://www.goofish.com/item?id=123&spm=x") == 123
+    assert dedup_key("https://www.goofish.com/item?spm=x&id=123") == 123
+    assert dedup_key("https://example.com/share?code=abc&spm=x") == "https://example.com/share?code=abc"
+    assert dedup_key("") is None
+
+
+def test_seen_index_rebuild_skips_pending_records_without_write_back(tmp_path):
+    path = str(tmp_path / "kw_full_data.jsonl")
+    offsets = append_lines(path, item_record(1), item_record(2, pending=True), item_record(3, pending=True),
+                           item_record(4, link="https://example.com/share?code=abc&spm=x"))
+    append_lines(path, ai_update(offsets[1], 2, True))
+    index = SeenItemIndex(path)
+    assert index.is_stale()
+    assert index.load() == {1, 2, "https://example.com/share?code=abc"}
+    assert not index.is_stale()
+
+
+def test_seen_index_appends_and_ignores_torn_tail(tmp_path):
+    path = str(tmp_path / "kw_full_data.jsonl")
+    append_lines(path, item_record(1))
+    index = SeenItemIndex(path)
+    assert index.load() == {1}
+    index.add("https://www.goofish.com/item?id=2")
+    index.add("https://example.com/share?code=xyz")
+    with open(index.path, "ab") as f:
+        f.write(b"\x01\x02\x03")  # 中断时写了一半的ID
+    assert not index.is_stale()
+    assert index.load() == {1, 2, "https://example.com/share?code=xyz"}
+
+
+def test_seen_index_rebuilds_when_results_are_newer(tmp_path):
+    path = str(tmp_path / "kw_full_data.jsonl")
+    append_lines(path, item_record(1))
+    index = SeenItemIndex(path)
+    index.load()
+    append_lines(path, item_record(5))
+    stale_time = os.path.getmtime(path) - 10
+    os.utime(index.path, (stale_time, stale_time))
+    assert index.is_stale()
+    assert index.load() == {1, 5}
+
+
+def test_offset_index_merges_write_back_lines(tmp_path):
+    path = str(tmp_path / "kw_full_data.jsonl")
+    offsets = append_lines(path, item_record(1, recommended=True), item_record(2, pending=True),
+                           item_record(3, pending=True))
+    append_lines(path, ai_update(offsets[1], 2, True), ai_update(offsets[2], 3, False))
+    index = ResultOffsetIndex(path)
+
+    total, items = index.read_page(1, 10)
+    assert total == 3
+    assert [item["商品信息"]["商品ID"] for item in items] == ["3", "2", "1"]
+    assert [item["ai_analysis"] for item in items] == [
+        {"is_recommended": False}, {"is_recommended": True}, {"is_recommended": True}]
+
+    total, items = index.read_page(1, 10, recommended_only=True)
+    assert total == 2
+    assert [item["商品信息"]["商品ID"] for item in items] == ["2", "1"]
+
+
+def test_offset_index_uses_the_latest_write_back_and_pages_from_newest(tmp_path):
+    path = str(tmp_path / "kw_full_data.jsonl")
+    offsets = append_lines(path, *(item_record(i, pending=True) for i in range(1, 6)))
+    append_lines(path, ai_update(offsets[0], 1, True))
+    index = ResultOffsetIndex(path)
+    assert index.read_page(1, 10, recommended_only=True)[0] == 1
+
+    # 之后的回写行覆盖之前的结果，推荐列表随之更新
+    append_lines(path, ai_update(offsets[0], 1, False))
+    assert index.read_page(1, 10, recommended_only=True) == (0, [])
+
+    total, items = index.read_page(2, 2)
+    assert total == 5
+    assert [item["商品信息"]["商品ID"] for item in items] == ["3", "2"]
+    assert index.read_page(4, 2) == (5, [])
+
+
+def test_offset_index_waits_for_complete_lines_and_handles_truncation(tmp_path):
+    path = str(tmp_path / "kw_full_data.jsonl")
+    append_lines(path, item_record(1))
+    with open(path, "ab") as f:
+        f.write(b'{"\xe5\x95\x86\xe5\x93\x81')  # 尚未写完的一行
+    index = ResultOffsetIndex(path)
+    assert index.read_page(1, 10)[0] == 1
+
+    with open(path, "wb") as f:
+        f.write(b"")
+    append_lines(path, item_record(7), item_record(8))
+    total, items = index.read_page(1, 10)
+    assert total == 2
+    assert [item["商品信息"]["商品ID"] for item in items] == ["8", "7"]
+
+
+def test_offset_index_ignores_write_back_for_a_different_item(tmp_path):
+    path = str(tmp_path / "kw_full_data.jsonl")
+    offsets = append_lines(path, item_record(1, pending=True))
+    append_lines(path, ai_update(offsets[0], 999, True))
+    _, items = ResultOffsetIndex(path).read_page(1, 10)
+    assert items[0]["ai_analysis"] == {"status": "pending"}
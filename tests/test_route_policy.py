@@ -0,0 +1,119 @@
+import asyncio
+
+from route_policy import ResourceBlocker
+
+
+class FakePage:
+    def __init__(self):
+        self.close_handlers = []
+
+    def once(self, event, handler):
+        assert event == "close"
+        self.close_handlers.append(handler)
+
+    def close(self):
+        for handler in self.close_handlers:
+            handler(self)
+
+
+class FakeRequest:
+    def __init__(self, page, url, resource_type):
+        self.url = url
+        self.resource_type = resource_type
+        self.frame = type("Frame", (), {"page": page})()
+
+
+class FakeResponse:
+    async def body(self):
+        return b"x" * 1000
+
+
+class FakeRoute:
+    def __init__(self, request):
+        self.request = request
+        self.result = None
+        self.fetched = False
+
+    async def continue_(self):
+        self.result = "continue"
+
+    async def abort(self, error_code=None):
+        self.result = "abort"
+
+    async def fetch(self):
+        self.fetched = True
+        return FakeResponse()
+
+
+class FakeContext:
+    def __init__(self):
+        self.handler = None
+
+    async def route(self, pattern, handler):
+        assert pattern == "**/*"
+        self.handler = handler
+
+
+def make_blocker(**kwargs):
+    kwargs.setdefault("enabled", True)
+    kwargs.setdefault("allowed_types", "document,script,xhr,fetch")
+    kwargs.setdefault("allowed_hosts", "goofish.com,alicdn.com")
+    blocker = ResourceBlocker(**kwargs)
+    context = FakeContext()
+    asyncio.run(blocker.install(context))
+    return blocker, context
+
+
+def dispatch(context, page, url, resource_type, routes=None):
+    route = FakeRoute(FakeRequest(page, url, resource_type))
+    asyncio.run(context.handler(route))
+    if routes is not None:
+        routes.append(route)
+    return route.result
+
+
+def test_allow_list_only_lets_through_mtop_requirements():
+    blocker, context = make_blocker()
+    page = FakePage()
+    asyncio.run(blocker.attach(page))
+    assert dispatch(context, page, "https://www.goofish.com/item?id=1", "document") == "continue"
+    assert dispatch(context, page, "https://g.alicdn.com/app.js", "script") == "continue"
+    assert dispatch(context, page, "https://h5api.m.goofish.com/h5/mtop.taobao.idle.pc.detail/1.0/", "xhr") == "continue"
+    assert dispatch(context, page, "https://img.alicdn.com/a.jpg", "image") == "abort"
+    assert dispatch(context, page, "https://g.alicdn.com/style.css", "stylesheet") == "abort"
+    assert dispatch(context, page, "https://cdn.example.com/lib.js", "script") == "abort"
+    assert dispatch(context, page, "https://g.alicdn.com/alilog/aplus_v2.js", "script") == "abort"
+    assert blocker.stats()["blocked"] == {"image": 1, "stylesheet": 1, "script": 1, "analytics": 1}
+
+
+def test_unattached_and_closed_pages_are_not_filtered():
+    blocker, context = make_blocker()
+    search_page, detail_page = FakePage(), FakePage()
+    page_stats = asyncio.run(blocker.attach(detail_page))
+    assert dispatch(context, search_page, "https://img.alicdn.com/a.jpg", "image") == "continue"
+    assert dispatch(context, detail_page, "https://img.alicdn.com/a.jpg", "image") == "abort"
+    assert page_stats["blocked"] == 1
+    detail_page.close()
+    assert dispatch(context, detail_page, "https://img.alicdn.com/a.jpg", "image") == "continue"
+
+
+def test_sampling_never_fetches_analytics_or_third_party_hosts():
+    blocker, context = make_blocker(sample_every=2)
+    page = FakePage()
+    asyncio.run(blocker.attach(page))
+    images, others = [], []
+    for _ in range(4):
+        assert dispatch(context, page, "https://img.alicdn.com/a.jpg", "image", images) == "abort"
+        assert dispatch(context, page, "https://log.mmstat.com/v.gif", "image", others) == "abort"
+        assert dispatch(context, page, "https://cdn.example.com/a.jpg", "media", others) == "abort"
+    assert [route.fetched for route in images] == [False, True, False, True]
+    assert not any(route.fetched for route in others)
+    # 被采样的 2 张图片实际下载过，不计入节省的字节数；其余按采样均值 (1000 字节) 估算
+    assert blocker.stats()["blocked"] == {"image": 4, "analytics": 4, "media": 4}
+    assert blocker.stats()["bytes_saved"] == 2 * 1000 + 4 * 5 * 1024 + 4 * 500 * 1024
+
+
+def test_disabled_blocker_installs_nothing():
+    blocker, context = make_blocker(enabled=False)
+    assert context.handler is None
+    assert asyncio.run(blocker.attach(FakePage())) == {"blocked": 0, "bytes_saved": 0}
@@ -0,0 +1,164 @@
+import glob
+import heapq
+import json
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+# 每个商品处理完成后写入一行 JSON 追踪记录，文件按大小轮转
+TRACE_FILE = os.getenv("TRACE_FILE", os.path.join("logs", "traces.jsonl"))
+
+
+class ItemTrace:
+    """
+    单个商品在流水线中的追踪记录：一个根 span（从入队到离开流水线）加上每个阶段的子 span。
+
+    所有数据只保存在内存中的小字典里，商品处理结束时由 Tracer.finish 一次性写出。
+    """
+
+    __slots__ = ("trace_id", "task", "item_id", "title", "started_at", "spans", "attrs")
+
+    def __init__(self, task: str, item_id: str, title: str = ""):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.task = task
+        self.item_id = item_id
+        self.title = title
+        self.started_at = time.time()
+        self.spans = []
+        self.attrs = {}
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        记录一个子 span。代码块抛出异常时结果记为 error；调用方可以修改 yield 出的字典中的 outcome 或追加属性。
+        """
+        record = {"name": name, "start": time.time(), "outcome": "ok"}
+        try:
+            yield record
+        except Exception as e:
+            record["outcome"] = "error"
+            record["error"] = f"{type(e).__name__}: {e}"[:200]
+            raise
+        finally:
+            record["end"] = time.time()
+            self.spans.append(record)
+
+    def set(self, **attrs):
+        """给整个商品的追踪记录附加属性（如卖家ID、图片数、AI推荐结果）。"""
+        self.attrs.update(attrs)
+
+    def to_dict(self, outcome: str, ended_at: float) -> dict:
+        spans = []
+        previous_end = self.started_at
+        for span in self.spans:
+            start, end = span["start"], span["end"]
+            spans.append({
+                **{k: v for k, v in span.items() if k not in ("start", "end")},
+                "start": round(start, 3),
+                "duration_ms": round((end - start) * 1000, 1),
+                # 与上一个阶段结束之间的间隔，即在阶段队列中等待的时间
+                "queued_ms": round(max(0.0, start - previous_end) * 1000, 1),
+            })
+            previous_end = end
+        return {
+            "trace_id": self.trace_id,
+            "task": self.task,
+            "item_id": self.item_id,
+            "title": self.title,
+            "start": round(self.started_at, 3),
+            "duration_ms": round((ended_at - self.started_at) * 1000, 1),
+            "outcome": outcome,
+            "attrs": self.attrs,
+            "spans": spans,
+        }
+
+
+class Tracer:
+    """
+    把商品追踪记录以 JSON Lines 写入按大小轮转的文件。
+
+    每个商品只在处理结束时写一行，开销很小，可以在生产环境中常开；设置 TRACE_ENABLED=false 可关闭写入。
+    """
+
+    def __init__(self, path: str = TRACE_FILE, max_bytes: int = None, backup_count: int = None,
+                 enabled: bool = None):
+        """
+        Args:
+            path: 追踪文件路径，默认读取环境变量 TRACE_FILE (logs/traces.jsonl)
+            max_bytes: 单个文件的大小上限，默认读取 TRACE_MAX_BYTES (10MB)
+            backup_count: 保留的轮转文件数，默认读取 TRACE_BACKUP_COUNT (3)
+            enabled: 是否写入追踪记录，默认读取 TRACE_ENABLED (true)
+        """
+        self.path = path
+        self.enabled = enabled if enabled is not None else os.getenv("TRACE_ENABLED", "true").lower() != "false"
+        self.max_bytes = max_bytes or int(os.getenv("TRACE_MAX_BYTES", 10 * 1024 * 1024))
+        self.backup_count = backup_count or int(os.getenv("TRACE_BACKUP_COUNT", 3))
+        self._logger = None
+
+    def _get_logger(self) -> logging.Logger:
+        if self._logger is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            logger = logging.getLogger(f"goofish.trace.{id(self)}")
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            handler = RotatingFileHandler(self.path, maxBytes=self.max_bytes, backupCount=self.backup_count,
+                                          encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            self._logger = logger
+        return self._logger
+
+    def start(self, task: str, item_id, title: str = "") -> ItemTrace:
+        return ItemTrace(task, str(item_id), title[:60])
+
+    def finish(self, trace: ItemTrace, outcome: str):
+        """商品离开流水线时调用，写出完整的追踪记录。"""
+        if not self.enabled:
+            return
+        try:
+            self._get_logger().info(json.dumps(trace.to_dict(outcome, time.time()), ensure_ascii=False))
+        except Exception as e:
+            print(f"   [警告] 写入追踪记录失败: {e}")
+
+
+def read_slowest_traces(path: str = TRACE_FILE, task: str = None, limit: int = 20, since: float = 0) -> dict:
+    """
+    读取追踪文件（含轮转出的旧文件），按任务分组返回耗时最长的 limit 个商品。
+
+    Args:
+        path: 追踪文件路径
+        task: 只返回该任务的记录，默认返回所有任务
+        limit: 每个任务返回的记录数
+        since: 只统计开始时间晚于该 Unix 时间戳的记录
+
+    Returns:
+        {任务名: [追踪记录, ...]}，每个任务内按耗时从长到短排序。
+    """
+    slowest = {}
+    for file_path in sorted(glob.glob(f"{glob.escape(path)}*")):
+        if not (file_path == path or file_path[len(path):].lstrip(".").isdigit()):
+            continue
+        try:
+            with open(file_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if (task and record.get("task") != task) or record.get("start", 0) < since:
+                        continue
+                    heap = slowest.setdefault(record.get("task", ""), [])
+                    entry = (record.get("duration_ms", 0), record.get("trace_id", ""), record)
+                    if len(heap) < limit:
+                        heapq.heappush(heap, entry)
+                    elif entry[:2] > heap[0][:2]:
+                        heapq.heapreplace(heap, entry)
+        except IOError:
+            continue
+    return {name: [entry[2] for entry in sorted(heap, key=lambda e: e[0], reverse=True)]
+            for name, heap in slowest.items()}
@@ -3,16 +3,20 @@ import json
 import aiofiles
 import os
 import glob
+import time
 import asyncio
 import sys
 from dotenv import dotenv_values
 from fastapi import FastAPI, Request, HTTPException
 from prompt_generator import generate_criteria, update_config_with_new_task
-from fastapi.responses import HTMLResponse, JSONResponse
+from result_index import ResultOffsetIndex
+from metrics import METRICS_FILE
+from tracing import TRACE_FILE, read_slowest_traces
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 
 class Task(BaseModel):
@@ -24,13 +28,34 @@ class Task(BaseModel):
     personal_only: bool
     min_price: Optional[str] = None
     max_price: Optional[str] = None
+    # 筛选方式："url"（默认）直接构建带筛选条件的搜索请求，"click" 逐个点击页面上的筛选控件
+    search_filter_mode: Optional[str] = None
     ai_prompt_base_file: Optional[str] = None
     ai_prompt_criteria_file: Optional[str] = None
+    # 商品处理流水线配置，如 {"images": 2}（AI分析并发由 AI_MAX_CONCURRENCY 统一控制）
+    pipeline_workers: Optional[Dict[str, int]] = None
+    pipeline_queue_size: Optional[int] = None
+    # 发送给AI前的图片预处理配置
+    ai_image_max_edge: Optional[int] = None
+    ai_image_format: Optional[str] = None  # "jpeg" 或 "webp"
+    ai_image_quality: Optional[int] = None
+    # 批量文本初筛：多个商品合并为一次纯文本请求，只有通过初筛的商品才进行带图片的完整分析
+    ai_prescreen: Optional[bool] = None
+    ai_prescreen_batch_size: Optional[int] = None
     # 新品监控专用字段
     monitor_interval: Optional[int] = None
+    # 自适应轮询：根据新品到达速率在上下限之间调整间隔，平均频率不超过 monitor_interval
+    adaptive_interval: Optional[bool] = None
+    monitor_min_interval: Optional[int] = None
+    monitor_max_interval: Optional[int] = None
+    # 温页面模式：保留已筛选的搜索页，每轮只重放搜索请求（整个监控期间占用一个浏览器上下文）
+    warm_search: Optional[bool] = None
     new_product_window: Optional[int] = None
     notification_types: Optional[List[str]] = None
     dingtalk_webhook: Optional[str] = None
+    # 钉钉摘要合并：每条消息最多包含的商品数、合并窗口（秒）
+    digest_max_items: Optional[int] = None
+    digest_window: Optional[int] = None
 
 
 class TaskUpdate(BaseModel):
@@ -42,13 +67,34 @@ class TaskUpdate(BaseModel):
     personal_only: Optional[bool] = None
     min_price: Optional[str] = None
     max_price: Optional[str] = None
+    # 筛选方式："url"（默认）直接构建带筛选条件的搜索请求，"click" 逐个点击页面上的筛选控件
+    search_filter_mode: Optional[str] = None
     ai_prompt_base_file: Optional[str] = None
     ai_prompt_criteria_file: Optional[str] = None
+    # 商品处理流水线配置，如 {"images": 2}（AI分析并发由 AI_MAX_CONCURRENCY 统一控制）
+    pipeline_workers: Optional[Dict[str, int]] = None
+    pipeline_queue_size: Optional[int] = None
+    # 发送给AI前的图片预处理配置
+    ai_image_max_edge: Optional[int] = None
+    ai_image_format: Optional[str] = None  # "jpeg" 或 "webp"
+    ai_image_quality: Optional[int] = None
+    # 批量文本初筛：多个商品合并为一次纯文本请求，只有通过初筛的商品才进行带图片的完整分析
+    ai_prescreen: Optional[bool] = None
+    ai_prescreen_batch_size: Optional[int] = None
     # 新品监控专用字段
     monitor_interval: Optional[int] = None
+    # 自适应轮询：根据新品到达速率在上下限之间调整间隔，平均频率不超过 monitor_interval
+    adaptive_interval: Optional[bool] = None
+    monitor_min_interval: Optional[int] = None
+    monitor_max_interval: Optional[int] = None
+    # 温页面模式：保留已筛选的搜索页，每轮只重放搜索请求（整个监控期间占用一个浏览器上下文）
+    warm_search: Optional[bool] = None
     new_product_window: Optional[int] = None
     notification_types: Optional[List[str]] = None
     dingtalk_webhook: Optional[str] = None
+    # 钉钉摘要合并：每条消息最多包含的商品数、合并窗口（秒）
+    digest_max_items: Optional[int] = None
+    digest_window: Optional[int] = None
 
 
 class TaskGenerateRequest(BaseModel):
@@ -356,6 +402,136 @@ async def get_logs():
         raise HTTPException(status_code=500, detail=f"读取日志文件时出错: {e}")
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    以 Prometheus 文本格式暴露爬虫各阶段的耗时、结果和反爬拦截次数。
+    指标由爬虫子进程定期写入 logs/spider_metrics.prom，这里附加爬虫进程是否在运行。
+    """
+    content = ""
+    if os.path.exists(METRICS_FILE):
+        async with aiofiles.open(METRICS_FILE, 'r', encoding='utf-8') as f:
+            content = await f.read()
+    is_running = bool(scraper_process and scraper_process.returncode is None)
+    content += (
+        "# HELP goofish_spider_running Whether the spider subprocess is running.\n"
+        "# TYPE goofish_spider_running gauge\n"
+        f"goofish_spider_running {int(is_running)}\n"
+    )
+    return PlainTextResponse(content, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/api/traces")
+async def get_slowest_traces(task: Optional[str] = None, limit: int = 20, hours: float = 24):
+    """
+    按任务列出最近 hours 小时内处理耗时最长的商品，以及每个商品在各阶段（详情、卖家信息、图片、AI、通知、保存）的耗时。
+    """
+    limit = max(1, min(limit, 200))
+    since = time.time() - hours * 3600 if hours > 0 else 0
+    loop = asyncio.get_running_loop()
+    # 追踪文件可能有数十MB，放到线程池中读取
+    traces = await loop.run_in_executor(None, read_slowest_traces, TRACE_FILE, task, limit, since)
+    return {"tasks": traces}
+
+
+LOG_FILE_PATH = os.path.join("logs", "scraper.log")
+# 未指定游标时，从日志末尾往前读取的字节数
+LOG_TAIL_INITIAL_BYTES = 64 * 1024
+# 单次最多返回的日志字节数
+LOG_TAIL_MAX_BYTES = 256 * 1024
+
+
+def _decode_log_bytes(data: bytes) -> str:
+    """先尝试用 utf-8 解码，失败时退回 gbk。"""
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('gbk', errors='replace')
+
+
+def _read_log_chunk(offset: Optional[int], max_bytes: int = LOG_TAIL_MAX_BYTES) -> dict:
+    """
+    从指定字节偏移读取日志的新增内容，只返回完整的行。
+
+    offset 为空时返回日志末尾的一段内容；日志被截断（偏移超过文件大小）时从头开始读取。
+    返回值中的 offset 是下一次读取应使用的游标。
+    """
+    size = os.path.getsize(LOG_FILE_PATH)
+    from_tail = offset is None
+    if from_tail:
+        offset = max(size - LOG_TAIL_INITIAL_BYTES, 0)
+    elif offset > size:
+        offset = 0
+
+    with open(LOG_FILE_PATH, 'rb') as f:
+        f.seek(offset)
+        data = f.read(min(size - offset, max_bytes))
+
+    # 从末尾开始读取时，丢弃第一行可能不完整的内容
+    if from_tail and offset > 0:
+        newline = data.find(b"\n")
+        skipped = newline + 1 if newline != -1 else len(data)
+        data = data[skipped:]
+        offset += skipped
+    # 只返回到最后一个换行符为止，正在写入的半行留到下次读取，避免截断多字节字符
+    if not data.endswith(b"\n"):
+        newline = data.rfind(b"\n")
+        if newline != -1:
+            data = data[:newline + 1]
+        elif len(data) < max_bytes:
+            data = b""
+
+    return {"content": _decode_log_bytes(data), "offset": offset + len(data), "file_size": size}
+
+
+@app.get("/api/logs/tail")
+async def tail_logs(offset: Optional[int] = None):
+    """
+    按字节游标增量读取日志：返回 offset 之后新增的内容以及下一次请求使用的游标。
+    不传 offset 时返回日志末尾的一段内容。
+    """
+    if not os.path.exists(LOG_FILE_PATH):
+        return {"content": "", "offset": 0, "file_size": 0}
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, _read_log_chunk, offset)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"读取日志文件时出错: {e}")
+
+
+@app.get("/api/logs/stream")
+async def stream_logs(request: Request, offset: Optional[int] = None):
+    """
+    以 Server-Sent Events 的方式推送日志新增内容，每条事件的 data 为 {"content", "offset"} JSON，id 为日志游标。
+    浏览器自动重连时会带上 Last-Event-ID 请求头，此时从该游标继续推送，优先于建立连接时的 offset 参数，避免重复推送。
+    """
+    last_event_id = request.headers.get("last-event-id", "").strip()
+    if last_event_id.isdigit():
+        offset = int(last_event_id)
+
+    async def event_generator():
+        cursor = offset
+        idle_rounds = 0
+        loop = asyncio.get_running_loop()
+        while not await request.is_disconnected():
+            chunk = None
+            if os.path.exists(LOG_FILE_PATH):
+                chunk = await loop.run_in_executor(None, _read_log_chunk, cursor)
+                cursor = chunk["offset"]
+            if chunk and chunk["content"]:
+                idle_rounds = 0
+                payload = json.dumps({"content": chunk["content"], "offset": cursor}, ensure_ascii=False)
+                yield f"id: {cursor}\ndata: {payload}\n\n"
+                continue
+            idle_rounds += 1
+            if idle_rounds % 15 == 0:
+                # 心跳，防止代理因长时间无数据而断开连接
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(1)
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
 @app.delete("/api/tasks/{task_id}", response_model=dict)
 async def delete_task(task_id: int):
     """
@@ -390,6 +566,10 @@ async def list_result_files():
     return {"files": files}
 
 
+# 每个结果文件的字节偏移索引，随文件增长增量更新
+result_indexes = {}
+
+
 @app.get("/api/results/{filename}")
 async def get_result_file_content(filename: str, page: int = 1, limit: int = 20, recommended_only: bool = False):
     """
@@ -401,29 +581,19 @@ async def get_result_file_content(filename: str, page: int = 1, limit: int = 20,
     if not os.path.exists(filename):
         raise HTTPException(status_code=404, detail="结果文件未找到。")
 
-    results = []
+    index = result_indexes.get(filename)
+    if index is None:
+        index = result_indexes[filename] = ResultOffsetIndex(filename)
+
     try:
-        async with aiofiles.open(filename, 'r', encoding='utf-8') as f:
-            async for line in f:
-                try:
-                    record = json.loads(line)
-                    if recommended_only:
-                        if record.get("ai_analysis", {}).get("is_recommended") is True:
-                            results.append(record)
-                    else:
-                        results.append(record)
-                except json.JSONDecodeError:
-                    continue
+        # 通过字节偏移索引只读取并解码当页记录，文件读取放到线程池中执行，避免阻塞事件循环
+        loop = asyncio.get_running_loop()
+        total_items, paginated_results = await loop.run_in_executor(
+            None, index.read_page, page, limit, recommended_only
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"读取结果文件时出错: {e}")
 
-    results.reverse()
-    
-    total_items = len(results)
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_results = results[start:end]
-
     return {
         "total_items": total_items,
         "page": page,